@@ -0,0 +1,23 @@
+"""add problems.cpu_time_limit
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("problems", sa.Column("cpu_time_limit", sa.Integer(), nullable=False, server_default="2000"))
+
+
+def downgrade() -> None:
+    op.drop_column("problems", "cpu_time_limit")
@@ -0,0 +1,23 @@
+"""add problems.comparator
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("problems", sa.Column("comparator", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("problems", "comparator")
@@ -0,0 +1,22 @@
+"""index user_ranks.total_score
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_user_ranks_total_score", "user_ranks", ["total_score"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_ranks_total_score", table_name="user_ranks")
@@ -0,0 +1,77 @@
+"""Event-loop latency while N submissions execute at once.
+
+Run from leetduel-backend:
+
+    python -m benchmarks.bench_event_loop --submissions 50
+
+"blocking" replays the old path (subprocess.run on the event loop), "async"
+goes through run_local behind the per-node execution slots.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from src.submit import run_local, scheduler
+
+
+CODE = """
+import sys
+import json
+total = 0
+for i in range(300000):
+    total += i
+print(len(json.loads(sys.stdin.read())))
+"""
+STDINPUT = json.dumps(["[1, 2]"] * 20)
+
+
+async def measure_lag(stop: asyncio.Event, interval: float = 0.01) -> list[float]:
+    lags = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - start - interval) * 1000)
+    return lags
+
+
+async def blocking_submission() -> None:
+    subprocess.run(["python3", "-c", CODE], input=STDINPUT, capture_output=True, text=True, timeout=10)
+
+
+async def async_submission() -> None:
+    await scheduler.submit(lambda: run_local(CODE, STDINPUT, 10))
+
+
+async def run(mode: str, submissions: int) -> None:
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(measure_lag(stop))
+    await asyncio.sleep(0.05)
+
+    submit = blocking_submission if mode == "blocking" else async_submission
+    start = time.perf_counter()
+    await asyncio.gather(*(submit() for _ in range(submissions)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    lags = sorted(await monitor)
+    p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))]
+    print(f"{mode:>8}: {submissions} submissions in {elapsed:.2f}s | loop lag p50 {statistics.median(lags):.1f}ms p99 {p99:.1f}ms max {lags[-1]:.1f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--submissions", type=int, default=50)
+    args = parser.parse_args()
+
+    for mode in ("blocking", "async"):
+        asyncio.run(run(mode, args.submissions))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Throughput of the execution service, in submissions per second per core.
+
+Run from leetduel-backend:
+
+    python -m benchmarks.bench_executor --submissions 200 --batch 20
+
+The service runs in-process behind httpx.ASGITransport with one sandbox worker per
+core, so the numbers are the pool's and not the network's. "single" sends one
+/execute request per submission, "batch" sends them --batch at a time to /batch.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from src import executor_service
+from src.harness import HARNESS_PRELUDE
+
+
+CODE = HARNESS_PRELUDE + """
+import sys
+import json
+nums = json.loads(sys.stdin.read())
+seen = {}
+for i, n in enumerate(nums):
+    if 100 - n in seen:
+        print(seen[100 - n], i)
+    seen[n] = i
+"""
+STDINPUT = "[" + ", ".join(str(i % 97) for i in range(2000)) + "]"
+
+
+async def single(client: httpx.AsyncClient, submissions: int) -> None:
+    job = {"code": CODE, "timeout": 10, "stdinput": STDINPUT}
+    responses = await asyncio.gather(*(client.post("/execute", json=job) for _ in range(submissions)))
+    assert all(response.json()["stderr"] == "" for response in responses)
+
+
+async def batch(client: httpx.AsyncClient, submissions: int, size: int) -> None:
+    async def send(count: int) -> None:
+        jobs = [{"code": CODE, "timeout": 10, "stdinput": STDINPUT}] * count
+        async with client.stream("POST", "/batch", json={"jobs": jobs}) as response:
+            lines = [line async for line in response.aiter_lines() if line]
+        assert len(lines) == count
+
+    await asyncio.gather(*(send(min(size, submissions - start)) for start in range(0, submissions, size)))
+
+
+async def run(submissions: int, size: int) -> None:
+    cores = os.cpu_count() or 1
+    await executor_service.pool.start()
+    transport = httpx.ASGITransport(app=executor_service.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://executor", timeout=60) as client:
+            for mode in ("single", "batch"):
+                start = time.perf_counter()
+                if mode == "single":
+                    await single(client, submissions)
+                else:
+                    await batch(client, submissions, size)
+                elapsed = time.perf_counter() - start
+                rate = submissions / elapsed
+                print(f"{mode:>7}: {submissions} submissions in {elapsed:.2f}s | {rate:.0f}/s | {rate / cores:.0f}/s per core ({cores} cores)")
+    finally:
+        await executor_service.pool.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--submissions", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.submissions, args.batch))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Cost of one matchmaking tick and the resulting waits with many players queued.
+
+Run from leetduel-backend:
+
+    python -m benchmarks.bench_matchmaking --players 10000
+
+Players arrive uniformly over --spread seconds with exponentially distributed ratings,
+and the queue is ticked once per simulated second, as the server's matchmaking loop does.
+The "fifo" line is the old pairing (first two players, whatever their ratings).
+"""
+import argparse
+import random
+import statistics
+import time
+
+from src.matchmaking import MatchmakingQueue, QueueEntry
+
+
+def run(players: int, spread: float, ticks: int) -> None:
+    rng = random.Random(players)
+    arrivals = [
+        QueueEntry(f"sid-{i}", f"uid-{i}", f"user-{i}", "", round(rng.expovariate(1 / 400), 2), rng.random() * spread)
+        for i in range(players)
+    ]
+    arrivals.sort(key=lambda entry: entry.joined)
+
+    queue = MatchmakingQueue()
+    tick_ms: list[float] = []
+    gaps: list[float] = []
+    pending = 0
+    for tick in range(ticks):
+        now = float(tick)
+        while pending < len(arrivals) and arrivals[pending].joined <= now:
+            queue.add(arrivals[pending])
+            pending += 1
+        start = time.perf_counter()
+        pairs = queue.match(now)
+        tick_ms.append((time.perf_counter() - start) * 1000)
+        gaps.extend(abs(a.rating - b.rating) for a, b in pairs)
+
+    # Everyone queued at once: the worst single tick
+    burst = MatchmakingQueue()
+    for entry in arrivals:
+        burst.add(QueueEntry(entry.sid, entry.uid, entry.username, "", entry.rating, 0.0))
+    start = time.perf_counter()
+    burst_pairs = burst.match(0.0)
+    burst_ms = (time.perf_counter() - start) * 1000
+
+    fifo = [abs(a.rating - b.rating) for a, b in zip(arrivals[::2], arrivals[1::2])]
+    stats = queue.stats(float(ticks))
+    waits = stats["matched_wait_seconds"]
+
+    print(f"{players:>7} players | tick p50 {statistics.median(tick_ms):6.2f}ms max {max(tick_ms):7.2f}ms | "
+          f"burst tick {burst_ms:7.1f}ms ({len(burst_pairs)} pairs) | left {stats['depth']}")
+    print(f"        rating gap p50 {statistics.median(gaps):6.1f} p90 {statistics.quantiles(gaps, n=10)[-1]:6.1f} | "
+          f"fifo gap p50 {statistics.median(fifo):6.1f} p90 {statistics.quantiles(fifo, n=10)[-1]:6.1f} | "
+          f"wait p50 {waits['p50']:.1f}s p90 {waits['p90']:.1f}s p99 {waits['p99']:.1f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, nargs="+", default=[10_000])
+    parser.add_argument("--spread", type=float, default=600)
+    parser.add_argument("--ticks", type=int, default=900)
+    args = parser.parse_args()
+
+    for players in args.players:
+        run(players, args.spread, args.ticks)
+
+
+if __name__ == "__main__":
+    main()
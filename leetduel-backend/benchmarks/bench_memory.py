@@ -0,0 +1,88 @@
+"""Bytes per party of in-memory game state at many concurrent parties.
+
+Run from leetduel-backend:
+
+    python -m benchmarks.bench_memory --parties 10000
+
+Each party has two players mid-round with some code in their editors. "shared" is
+what the problem catalog does, one ProblemData per problem for every party playing
+it; "per-party" builds a ProblemData for each party, as loading straight from the
+database did. Measured with tracemalloc, so only Python allocations are counted.
+"""
+import argparse
+import gc
+import json
+import random
+import tracemalloc
+
+from src.dataclass import Party, Player, ProblemData
+
+
+def problem_rows(count: int, test_cases: int, rng: random.Random) -> list[dict]:
+    rows = []
+    for i in range(count):
+        cases = []
+        for _ in range(test_cases):
+            nums = [rng.randrange(-1000, 1000) for _ in range(rng.randrange(5, 60))]
+            cases.append({"input": repr([nums, rng.randrange(1000)]), "output": repr(rng.sample(range(len(nums)), 2))})
+        rows.append({
+            "name": f"Problem {i}",
+            "description": "<p>" + " ".join("lorem" for _ in range(200)) + "</p>",
+            "function_signature": "def solve(self, nums: List[int], target: int) -> List[int]",
+            "difficulty": "Easy",
+            "test_cases": cases
+        })
+    return rows
+
+
+def as_problem(row: dict, problem_id: int) -> ProblemData:
+    return ProblemData(row["name"], row["description"], row["function_signature"], row["difficulty"], row["test_cases"], False, 0, problem_id=problem_id)
+
+
+def build(parties: int, rows: list[dict], shared: bool, rng: random.Random) -> dict[str, Party]:
+    catalog: dict[int, ProblemData] = {}
+    state: dict[str, Party] = {}
+    for i in range(parties):
+        problem_id = rng.randrange(len(rows))
+        if shared:
+            problem = catalog.get(problem_id) or catalog.setdefault(problem_id, as_problem(rows[problem_id], problem_id))
+        else:
+            # A fresh load from the database gets its own copies of every string
+            problem = as_problem(json.loads(json.dumps(rows[problem_id])), problem_id)
+        players = {}
+        for j in range(2):
+            code = f"{problem.function_signature}:\n    seen = {{}}\n    for i, n in enumerate(nums):\n        pass  # {i}-{j}\n"
+            players[f"sid-{i}-{j}"] = Player(f"user-{i}-{j}", False, code, "Test case output", 0, 0, None)
+        state[f"P{i:05d}"] = Party(f"sid-{i}-0", players, problem, "in_progress", 1, 1, 0, [True, True, True], 15, 0.0)
+    return state
+
+
+def measure(parties: int, rows: list[dict], shared: bool, seed: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    state = build(parties, rows, shared, random.Random(seed))
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del state
+    return (after - before) / parties
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--parties", type=int, nargs="+", default=[10_000])
+    parser.add_argument("--problems", type=int, default=300)
+    parser.add_argument("--test-cases", type=int, default=40)
+    args = parser.parse_args()
+
+    rows = problem_rows(args.problems, args.test_cases, random.Random(0))
+    for parties in args.parties:
+        shared = measure(parties, rows, True, parties)
+        per_party = measure(parties, rows, False, parties)
+        print(f"{parties:>7} parties | shared {shared:10.0f} B/party ({shared * parties / 2**20:7.1f} MiB) | "
+              f"per-party {per_party:10.0f} B/party ({per_party * parties / 2**20:7.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
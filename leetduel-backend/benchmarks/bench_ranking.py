@@ -0,0 +1,60 @@
+"""Rank-of-user, top-k and update cost of RankIndex at ladder scale.
+
+Run from leetduel-backend:
+
+    python -m benchmarks.bench_ranking --users 100000 1000000
+
+The "scan" column is the old approach (count every score above the user's),
+measured on a sample of queries only.
+"""
+import argparse
+import random
+import time
+
+from src.ranking import RankIndex
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def run(users: int, queries: int) -> None:
+    rng = random.Random(users)
+    entries = [(f"user-{i}", round(rng.expovariate(1 / 400), 2)) for i in range(users)]
+    uids = [uid for uid, _ in entries]
+
+    index = RankIndex()
+    start = time.perf_counter()
+    index.load(entries)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    rank_us = timed(lambda: index.rank(rng.choice(uids)), queries)
+    top_us = timed(lambda: index.top(100), queries // 10)
+    page_us = timed(lambda: index.top(50, rng.randrange(users)), queries // 10)
+    update_us = timed(lambda: index.update(rng.choice(uids), round(rng.expovariate(1 / 400), 2)), queries)
+
+    scores = list(index.scores.values())
+    def scan() -> int:
+        score = index.scores[rng.choice(uids)]
+        return sum(1 for s in scores if s > score) + 1
+    scan_us = timed(scan, 5)
+
+    print(f"{users:>9} users | load {load_ms:8.1f}ms | rank {rank_us:6.1f}us | top-100 {top_us:7.1f}us | "
+          f"page@random {page_us:7.1f}us | update {update_us:6.1f}us | scan rank {scan_us / 1000:8.1f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=20_000)
+    args = parser.parse_args()
+
+    for users in args.users:
+        run(users, args.queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Bytes on the wire and encode time per socket event, before and after src.serialization.
+
+Run from leetduel-backend:
+
+    python -m benchmarks.bench_serialization --test-cases 50 200
+
+"before" is what every emit used to do: dataclasses.asdict() and the stdlib json
+module python-socketio defaults to. "after" is payload() (cached, test cases stripped
+for problems) encoded with orjson. Problems are synthetic but LeetCode-sized.
+"""
+import argparse
+import json
+import random
+import time
+from dataclasses import asdict
+
+from src import serialization
+from src.dataclass import GameData, LeaderboardData, MessageData, ProblemData, Score, SubmissionData, TimeData
+
+
+def make_problem(test_cases: int, rng: random.Random) -> ProblemData:
+    cases = []
+    for _ in range(test_cases):
+        nums = [rng.randrange(-10**6, 10**6) for _ in range(rng.randrange(10, 400))]
+        cases.append({"input": repr([nums, rng.randrange(10**6)]), "output": repr(sorted(rng.sample(range(len(nums)), 2)))})
+    description = "<p>" + " ".join("lorem" for _ in range(500)) + "</p>"
+    return ProblemData("Two Sum", description, "def twoSum(self, nums: List[int], target: int) -> List[int]", "Easy", cases, False, 0)
+
+
+def measure(message, repeat: int) -> tuple[int, float, int, float]:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        before = json.dumps(asdict(message), separators=(",", ":"))
+    before_us = (time.perf_counter() - start) / repeat * 1e6
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        after = serialization.dumps(serialization.payload(message))
+    after_us = (time.perf_counter() - start) / repeat * 1e6
+
+    return len(before.encode()), before_us, len(after.encode()), after_us
+
+
+def run(test_cases: int, repeat: int) -> None:
+    rng = random.Random(test_cases)
+    problem = make_problem(test_cases, rng)
+    events = {
+        "game_started": GameData(problem, "ABC123", 15, 1, 1),
+        "final_leaderboard": LeaderboardData([Score(f"player{i}", rng.random() * 100) for i in range(10)]),
+        "code_submitted": SubmissionData(False, None, "12.5", test_cases, test_cases - 1, "Input: [[1, 2], 3]\nExpected [0, 1], got [1, 0]", "", [rng.random() for _ in range(test_cases)]),
+        "message_received": MessageData("player1 has passed all test cases!", True, "green"),
+        "update_time": TimeData(812.5),
+    }
+
+    print(f"{test_cases} test cases per problem")
+    for name, message in events.items():
+        before_bytes, before_us, after_bytes, after_us = measure(message, repeat)
+        print(f"  {name:<18} {before_bytes:>9} B {before_us:9.1f}us  ->  {after_bytes:>7} B {after_us:7.1f}us")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--test-cases", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    for test_cases in args.test_cases:
+        run(test_cases, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
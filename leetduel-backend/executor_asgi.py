@@ -0,0 +1 @@
+from src.executor_service import app  # Code-execution service, deployed separately from the game server
@@ -0,0 +1,100 @@
+import random
+import threading
+import weakref
+from collections import OrderedDict
+
+from sqlalchemy.orm import Session
+
+from .config import problem_cache_size
+from .dataclass import ProblemData
+from .models import Problem
+
+
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+
+
+class ProblemCatalog:
+    """Problem ids indexed by difficulty, plus an LRU of full ProblemData shared by every party.
+
+    Problems evicted from the LRU stay reachable through `live` for as long as a party
+    still holds them, so reloading one reuses that instance instead of duplicating it.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.ids_by_difficulty: dict[str, list[int]] | None = None
+        self.problems: OrderedDict[int, ProblemData] = OrderedDict()
+        self.live: weakref.WeakValueDictionary[int, ProblemData] = weakref.WeakValueDictionary()
+        self.lock = threading.Lock()
+
+
+    def load(self, db: Session) -> dict[str, list[int]]:
+        with self.lock:
+            if self.ids_by_difficulty is None:
+                ids_by_difficulty: dict[str, list[int]] = {difficulty: [] for difficulty in DIFFICULTIES}
+                for problem_id, difficulty in db.query(Problem.problem_id, Problem.problem_difficulty).all():
+                    ids_by_difficulty.setdefault(difficulty, []).append(problem_id)
+                self.ids_by_difficulty = ids_by_difficulty
+            return self.ids_by_difficulty
+
+
+    def random_id(self, db: Session, difficulties: list[bool]) -> int | None:
+        ids_by_difficulty = self.load(db)
+        pools = [ids_by_difficulty[difficulty] for difficulty, enabled in zip(DIFFICULTIES, difficulties) if enabled]
+        total = sum(len(pool) for pool in pools)
+        if total == 0:
+            return None
+
+        index = random.randrange(total)
+        for pool in pools:
+            if index < len(pool):
+                return pool[index]
+            index -= len(pool)
+        return None
+
+
+    def get(self, db: Session, problem_id: int) -> ProblemData | None:
+        with self.lock:
+            problem = self.problems.get(problem_id)
+            if problem is not None:
+                self.problems.move_to_end(problem_id)
+                return problem
+
+        row = db.query(Problem).filter(Problem.problem_id == problem_id).first()
+        if not row:
+            return None
+
+        loaded = row.asdata()
+        with self.lock:
+            live = self.live.get(problem_id)
+            if live is not None and live == loaded:
+                loaded = live
+            # Another caller may have raced us here; keep the first instance so it stays shared.
+            problem = self.problems.setdefault(problem_id, loaded)
+            self.live[problem_id] = problem
+            self.problems.move_to_end(problem_id)
+            while len(self.problems) > self.size:
+                self.problems.popitem(last=False)
+        return problem
+
+
+    def random_problem(self, db: Session, difficulties: list[bool]) -> ProblemData | None:
+        problem_id = self.random_id(db, difficulties)
+        if problem_id is None:
+            return None
+        return self.get(db, problem_id)
+
+
+    def invalidate(self) -> None:
+        with self.lock:
+            self.ids_by_difficulty = None
+
+
+    def evict(self, name: str) -> None:
+        with self.lock:
+            for problem_id, problem in list(self.problems.items()):
+                if problem.name == name:
+                    del self.problems[problem_id]
+
+
+catalog = ProblemCatalog(problem_cache_size)
@@ -0,0 +1,147 @@
+import ast
+import json
+import math
+from collections import Counter
+from typing import Any
+
+from src.dataclass import ProblemData
+
+
+def literal(text: str) -> Any:
+    """Parses a stored output with ast.literal_eval and JSON-normalizes it (tuples become lists)."""
+    try:
+        return json.loads(json.dumps(ast.literal_eval(text)))
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return None
+
+
+def freeze(value: Any) -> Any:
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, dict):
+        return frozenset((k, freeze(v)) for k, v in value.items())
+    return value
+
+
+class Comparator:
+    """Exact comparison of the printed result, as the judge has always done."""
+
+    name = "exact"
+    # Whether the harness can apply this comparator itself for first-fail judging.
+    in_sandbox = True
+
+
+    def parse(self, expected: str) -> Any:
+        return expected
+
+
+    def sandbox_expected(self, expected: str) -> dict:
+        return {"output": expected, "sorted": None}
+
+
+    def matches(self, record: dict, expected: str, parsed: Any) -> bool:
+        return record["output"] == expected
+
+
+class AnyOrderComparator(Comparator):
+    """Top-level list elements may come back in any order; compared as multisets."""
+
+    name = "any_order"
+
+
+    def parse(self, expected: str) -> Counter | None:
+        value = literal(expected)
+        if not isinstance(value, list):
+            return None
+        return Counter(freeze(v) for v in value)
+
+
+    def sandbox_expected(self, expected: str) -> dict:
+        value = literal(expected)
+        try:
+            return {"output": expected, "sorted": sorted(value) if isinstance(value, list) else None}
+        except TypeError:
+            # e.g. a list of dicts: the sandbox can't sort it, so it leaves the verdict to matches()
+            return {"output": expected, "sorted": None, "host": True}
+
+
+    def matches(self, record: dict, expected: str, parsed: Counter | None) -> bool:
+        if record["output"] == expected:
+            return True
+
+        value = record.get("value")
+        if parsed is None or not isinstance(value, list):
+            return False
+
+        return Counter(freeze(v) for v in value) == parsed
+
+
+class FloatComparator(Comparator):
+    """Numbers, possibly nested in lists, must agree within a relative or absolute tolerance."""
+
+    name = "float"
+    in_sandbox = False
+
+
+    def __init__(self, tolerance: float = 1e-5):
+        self.tolerance = tolerance
+
+
+    def parse(self, expected: str) -> Any:
+        return literal(expected)
+
+
+    def close(self, actual: Any, expected: Any) -> bool:
+        if isinstance(expected, list):
+            return isinstance(actual, list) and len(actual) == len(expected) and all(self.close(a, e) for a, e in zip(actual, expected))
+        if isinstance(expected, (int, float)) and not isinstance(expected, bool):
+            if not isinstance(actual, (int, float)) or isinstance(actual, bool):
+                return False
+            return math.isclose(actual, expected, rel_tol=self.tolerance, abs_tol=self.tolerance)
+        return actual == expected
+
+
+    def matches(self, record: dict, expected: str, parsed: Any) -> bool:
+        if record["output"] == expected:
+            return True
+        if parsed is None:
+            return False
+        value = record["value"] if record.get("value") is not None else literal(record["output"])
+        return self.close(value, parsed)
+
+
+class LinkedListComparator(Comparator):
+    """ListNode results print as lists; an empty list and None are the same linked list."""
+
+    name = "linked_list"
+    in_sandbox = False
+
+
+    def parse(self, expected: str) -> Any:
+        return [] if expected == "None" else literal(expected)
+
+
+    def matches(self, record: dict, expected: str, parsed: Any) -> bool:
+        if record["output"] == expected:
+            return True
+        value = self.parse(record["output"])
+        return value is not None and value == parsed
+
+
+COMPARATORS: dict[str, Comparator] = {
+    comparator.name: comparator
+    for comparator in (Comparator(), AnyOrderComparator(), FloatComparator(), LinkedListComparator())
+}
+
+
+def get_comparator(problem: ProblemData) -> Comparator:
+    name = problem.comparator or ("any_order" if problem.any_order else "exact")
+    return COMPARATORS.get(name, COMPARATORS["exact"])
+
+
+def parsed_outputs(problem: ProblemData) -> list[Any]:
+    """Expected outputs parsed once per problem and cached on the ProblemData."""
+    if problem.parsed_outputs is None:
+        comparator = get_comparator(problem)
+        problem.parsed_outputs = [comparator.parse(test_case.output) for test_case in problem.test_cases]
+    return problem.parsed_outputs
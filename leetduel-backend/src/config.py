@@ -1,4 +1,5 @@
 import os
+import socket
 from dotenv import load_dotenv
 
 basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -10,4 +11,61 @@ if not database_url:
 
 port = os.getenv("PORT") or 8000
 
-code_execution_url = os.getenv("CODE_EXECUTION_URL") or ""
\ No newline at end of file
+code_execution_url = os.getenv("CODE_EXECUTION_URL") or ""
+# A comma-separated list runs submissions on several executors, least loaded first
+code_execution_urls = [url.strip() for url in code_execution_url.split(",") if url.strip()]
+executor_retries = int(os.getenv("EXECUTOR_RETRIES") or 2)
+# Send a run still unanswered after this many seconds to a second executor too; 0 disables
+executor_hedge_after = float(os.getenv("EXECUTOR_HEDGE_AFTER") or 0)
+executor_health_path = os.getenv("EXECUTOR_HEALTH_PATH") or "/health"
+executor_health_interval = float(os.getenv("EXECUTOR_HEALTH_INTERVAL") or 10)
+executor_token = os.getenv("EXECUTOR_TOKEN") or ""
+max_concurrent_submissions = int(os.getenv("MAX_CONCURRENT_SUBMISSIONS") or os.cpu_count() or 4)
+sandbox_pool_size = int(os.getenv("SANDBOX_POOL_SIZE") or max_concurrent_submissions)
+sandbox_memory_limit = int(os.getenv("SANDBOX_MEMORY_LIMIT_MB") or 512)
+
+# Each player may submit `burst` times back to back, then once every 1/rate seconds;
+# past max_queued waiting submissions new ones are turned away instead of queued.
+submission_rate = float(os.getenv("SUBMISSION_RATE") or 0.5)
+submission_burst = float(os.getenv("SUBMISSION_BURST") or 5)
+max_queued_submissions = int(os.getenv("MAX_QUEUED_SUBMISSIONS") or 64)
+
+# "full" runs every test case so partial scores can be awarded; "first_fail"
+# stops a submission at its first wrong answer to free the sandbox sooner.
+judge_mode = os.getenv("JUDGE_MODE") or "full"
+
+harness_cache_size = int(os.getenv("HARNESS_CACHE_SIZE") or 256)
+submission_cache_size = int(os.getenv("SUBMISSION_CACHE_SIZE") or 1024)
+submission_cache_ttl = float(os.getenv("SUBMISSION_CACHE_TTL") or 600)
+problem_cache_size = int(os.getenv("PROBLEM_CACHE_SIZE") or 512)
+
+# Ladder reads check the database for other workers' rating changes at most once per
+# interval, then re-read everything updated since the newest change seen, less a margin
+# for clocks that disagree between workers. This worker's own changes show up at once.
+ladder_sync_interval = float(os.getenv("LADDER_SYNC_INTERVAL_SECONDS") or 2)
+ladder_sync_lookback = float(os.getenv("LADDER_SYNC_LOOKBACK_SECONDS") or 5)
+
+db_pool_size = int(os.getenv("DB_POOL_SIZE") or 10)
+db_max_overflow = int(os.getenv("DB_MAX_OVERFLOW") or 5)
+
+# Ranked matchmaking: players are bucketed by ladder score and accept opponents within
+# a window that widens the longer they wait; the queue is paired once per tick.
+matchmaking_tick = float(os.getenv("MATCHMAKING_TICK_SECONDS") or 1)
+matchmaking_bucket_width = float(os.getenv("MATCHMAKING_BUCKET_WIDTH") or 100)
+matchmaking_base_window = float(os.getenv("MATCHMAKING_BASE_WINDOW") or 100)
+matchmaking_window_growth = float(os.getenv("MATCHMAKING_WINDOW_GROWTH") or 25)
+
+# Set to share parties and socket rooms between workers/nodes through Redis
+redis_url = os.getenv("REDIS_URL") or ""
+# Parties live on the worker that created them, and sockets joining one elsewhere are
+# sent back with this id, so with more than one worker it must be the address the load
+# balancer routes ?node=<NODE_ID> to (see the README). The default is unique, not routable.
+node_id = os.getenv("NODE_ID") or f"{socket.gethostname()}:{os.getpid()}"
+party_lease_seconds = float(os.getenv("PARTY_LEASE_SECONDS") or 30)
+
+# Spectators get a player's code/console at most once per interval, whatever the keystroke rate
+spectate_update_interval = float(os.getenv("SPECTATE_UPDATE_INTERVAL") or 0.25)
+max_editor_length = int(os.getenv("MAX_EDITOR_LENGTH") or 100_000)
+
+# How often every in-progress party is sent its remaining time
+timer_tick_interval = float(os.getenv("TIMER_TICK_SECONDS") or 10)
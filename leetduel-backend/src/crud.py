@@ -1,11 +1,20 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, func
+from sqlalchemy.dialects.postgresql import insert
 from .models import Problem
 from .database import UserRank
-from typing import List, Optional
+from .catalog import catalog
+from .dataclass import RatingUpdate
+from .ranking import rank_index
+from .metrics import db_seconds, timed
+from .config import ladder_sync_interval, ladder_sync_lookback
+from typing import Any, List, Optional
+from datetime import datetime, timedelta
 import random
+import time
 
 
+@timed(db_seconds)
 def get_problem(db: Session, difficulties: list[bool], problem_id: int | None = None) -> Problem | None:
     if problem_id is not None:
         return db.query(Problem).filter(Problem.problem_id == problem_id).first()
@@ -22,37 +31,113 @@ def get_problem(db: Session, difficulties: list[bool], problem_id: int | None =
     return random.choice(problems)
 
 
+@timed(db_seconds)
 def get_count(db: Session):
     return db.query(Problem).count()
 
 
+@timed(db_seconds)
 def create_problem(db: Session, title: str, description: str, difficulty: str, test_cases: list, function_signature: str, any_order: bool):
     db_problem = Problem(problem_name=title, problem_description=description, problem_difficulty=difficulty, test_cases=test_cases, function_signature=function_signature, any_order=any_order, reports=0)  
     db.add(db_problem)
     db.commit()
     db.refresh(db_problem)
+    catalog.invalidate()
     return db_problem
 
 
+@timed(db_seconds)
 def check_problem_exists(db: Session, title: str) -> bool:
     return db.query(Problem).filter(Problem.problem_name == title).first() is not None
 
+@timed(db_seconds)
 def check_problem_reports(db: Session, title: str) -> int:
     reports = db.query(Problem.reports).filter(Problem.problem_name == title).scalar()
     return reports if reports is not None else 0
 
+@timed(db_seconds)
 def increment_reports(db: Session, title: str) -> None:
     reports = db.query(Problem.reports).filter(Problem.problem_name == title).scalar()
     if reports is not None:
         db.query(Problem).filter(Problem.problem_name == title).update({"reports": reports + 1})
         db.commit()
+        catalog.evict(title)
 
+@timed(db_seconds)
 def get_user_rank(db: Session, uid: str) -> Optional[UserRank]:
     return db.query(UserRank).filter(UserRank.uid == uid).first()
 
-def get_top_players(db: Session, limit: int = 100) -> List[UserRank]:
-    return db.query(UserRank).order_by(UserRank.total_score.desc()).limit(limit).all()
+@timed(db_seconds)
+def get_user_score(db: Session, uid: str) -> float:
+    score = db.query(UserRank.total_score).filter(UserRank.uid == uid).scalar()
+    return float(score or 0)
 
+@timed(db_seconds)
+def load_rank_index(db: Session) -> None:
+    rank_index.ensure_loaded(lambda: db.query(UserRank.uid, UserRank.total_score).all())
+
+@timed(db_seconds)
+def get_ladder_version(db: Session) -> tuple[int, Any]:
+    count, updated_at = db.query(func.count(UserRank.id), func.max(UserRank.updated_at)).one()
+    return count, updated_at
+
+@timed(db_seconds)
+def sync_rank_index(db: Session) -> tuple[Any, int]:
+    """Bring the index up to the database, including other workers' writes; returns the ladder version
+
+    The database is asked at most once per `ladder_sync_interval`, so polling clients
+    cost no queries between checks.
+    """
+    now = time.monotonic()
+    with rank_index.lock:
+        if rank_index.loaded and now < rank_index.synced_at + ladder_sync_interval:
+            return rank_index.synced, rank_index.version
+        # Claimed before querying so concurrent requests don't all check at once
+        rank_index.synced_at = now
+        previous = rank_index.synced
+
+    version = get_ladder_version(db)
+    if previous == version and rank_index.loaded:
+        return rank_index.synced, rank_index.version
+
+    count, updated_at = version
+    if previous is None or previous[1] is None or updated_at is None:
+        rows = None
+    else:
+        since = previous[1] - timedelta(seconds=ladder_sync_lookback)
+        rows = db.query(UserRank.uid, UserRank.total_score).filter(UserRank.updated_at >= since).all()
+
+    with rank_index.lock:
+        for uid, total_score in rows or []:
+            rank_index.update(uid, total_score)
+        if rows is None or len(rank_index) != count:
+            # Nothing to catch up from, or a row changed without moving updated_at forward
+            rank_index.load(db.query(UserRank.uid, UserRank.total_score).all())
+        rank_index.synced = version
+        # Rows may have changed in ways the scores don't show (names, games played)
+        rank_index.version += 1
+        return rank_index.synced, rank_index.version
+
+@timed(db_seconds)
+def get_users_in_order(db: Session, uids: List[str]) -> List[UserRank]:
+    if not uids:
+        return []
+    users = {user.uid: user for user in db.query(UserRank).filter(UserRank.uid.in_(uids)).all()}
+    return [users[uid] for uid in uids if uid in users]
+
+@timed(db_seconds)
+def get_top_players(db: Session, limit: int = 100, skip: int = 0) -> List[UserRank]:
+    load_rank_index(db)
+    return get_users_in_order(db, [uid for uid, _ in rank_index.top(limit, skip)])
+
+@timed(db_seconds)
+def get_ladder_page(db: Session, limit: int, after: Optional[tuple[float, str]] = None) -> tuple[int, List[UserRank]]:
+    """Keyset page of the ladder after the (total_score, uid) of the previous page's last entry; returns its starting offset"""
+    load_rank_index(db)
+    offset = rank_index.offset_after(*after) if after else 0
+    return offset, get_users_in_order(db, [uid for uid, _ in rank_index.top(limit, offset)])
+
+@timed(db_seconds)
 def create_or_update_user_rank(db: Session, uid: str, username: str, email: str, score_delta: float = 0, won: bool = False) -> UserRank:
     user_rank = get_user_rank(db, uid)
     
@@ -75,16 +160,61 @@ def create_or_update_user_rank(db: Session, uid: str, username: str, email: str,
     
     db.commit()
     db.refresh(user_rank)
+    rank_index.update(uid, user_rank.total_score)
     return user_rank
 
+@timed(db_seconds)
+def apply_rating_updates(db: Session, updates: List[RatingUpdate]) -> dict[str, float]:
+    # One upsert for the whole party; the database adds the deltas, so concurrent updates can't be lost
+    rows: dict[str, dict] = {}
+    for update in updates:
+        row = rows.setdefault(update.uid, {
+            "uid": update.uid,
+            "username": update.username,
+            "email": update.email,
+            "total_score": 0,
+            "games_played": 0,
+            "games_won": 0
+        })
+        row["total_score"] += update.score_delta
+        row["games_played"] += 1
+        row["games_won"] += 1 if update.won else 0
+
+    if not rows:
+        return {}
+
+    stmt = insert(UserRank).values(list(rows.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserRank.uid],
+        set_={
+            "total_score": UserRank.total_score + stmt.excluded.total_score,
+            "games_played": UserRank.games_played + stmt.excluded.games_played,
+            "games_won": UserRank.games_won + stmt.excluded.games_won,
+            "username": stmt.excluded.username,  # Update username in case it changed
+            "updated_at": datetime.utcnow()
+        }
+    ).returning(UserRank.uid, UserRank.total_score)
+
+    totals = {uid: total_score for uid, total_score in db.execute(stmt)}
+    db.commit()
+    for uid, total_score in totals.items():
+        rank_index.update(uid, total_score)
+    return totals
+
+@timed(db_seconds)
 def get_user_rank_position(db: Session, uid: str) -> Optional[int]:
+    load_rank_index(db)
+    position = rank_index.rank(uid)
+    if position is not None:
+        return position
+
+    # Not seen by this process yet (e.g. created elsewhere); index it from the row
     user_rank = get_user_rank(db, uid)
     if not user_rank:
         return None
-    
-    # Count how many users have a higher score
-    position = db.query(UserRank).filter(UserRank.total_score > user_rank.total_score).count()
-    return position + 1  # Add 1 to make it 1-based indexing
+    rank_index.update(uid, user_rank.total_score)
+    return rank_index.rank(uid)
 
+@timed(db_seconds)
 def get_all_user_ranks(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(UserRank).order_by(desc(UserRank.total_score)).offset(skip).limit(limit).all()
\ No newline at end of file
+    return get_top_players(db, limit, skip)
\ No newline at end of file
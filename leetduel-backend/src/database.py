@@ -1,8 +1,13 @@
 from sqlalchemy import create_engine, MetaData, Column, Integer, String, Boolean, Float, ForeignKey, DateTime, Text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
-from .config import database_url
+from sqlalchemy.orm import Session, sessionmaker, relationship
+from .config import database_url, db_pool_size, db_max_overflow
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+import asyncio
+
+T = TypeVar("T")
 
 Base = declarative_base()
 
@@ -13,13 +18,19 @@ class UserRank(Base):
     uid = Column(String, unique=True, index=True)  # Firebase UID
     username = Column(String)
     email = Column(String)
-    total_score = Column(Float, default=0)
+    total_score = Column(Float, default=0, index=True)
     games_played = Column(Integer, default=0)
     games_won = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-engine = create_engine(database_url)
+engine = create_engine(
+    database_url,
+    pool_size=db_pool_size,
+    max_overflow=db_max_overflow,
+    pool_pre_ping=True,
+    pool_recycle=1800
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 metadata = MetaData()
 
@@ -31,4 +42,19 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Socket handlers run their queries here so DB round-trips never block the event loop.
+# One thread per pooled connection: queries queue for a thread rather than for a connection.
+db_executor = ThreadPoolExecutor(max_workers=db_pool_size + db_max_overflow, thread_name_prefix="db")
+
+async def run_db(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Run fn(db, *args, **kwargs) with its own session on the DB thread pool"""
+    def call() -> T:
+        db = SessionLocal()
+        try:
+            return fn(db, *args, **kwargs)
+        finally:
+            db.close()
+
+    return await asyncio.get_running_loop().run_in_executor(db_executor, call)
@@ -1,8 +1,8 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class TestCase:
     input: str
     output: str
@@ -12,7 +12,7 @@ class TestCase:
         self.output = output
 
 
-@dataclass
+@dataclass(slots=True, weakref_slot=True)
 class ProblemData:
     name: str
     description: str
@@ -21,8 +21,15 @@ class ProblemData:
     test_cases: List[TestCase]
     any_order: bool
     reports: int
-
-    def __init__(self, name: str, description: str, function_signature: str, difficulty: str, test_cases: List[dict[str, str]], any_order: bool, reports: int):
+    cpu_time_limit: int = 2000
+    comparator: str = ""
+    problem_id: int | None = None
+    # Caches filled in by src.comparators, src.harness and src.serialization; never sent to clients
+    parsed_outputs: Optional[list] = field(default=None, init=False, repr=False, compare=False)
+    revision: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    payload: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+
+    def __init__(self, name: str, description: str, function_signature: str, difficulty: str, test_cases: List[dict[str, str]], any_order: bool, reports: int, cpu_time_limit: int = 2000, comparator: str = "", problem_id: int | None = None):
         self.name = name
         self.description = description
         self.function_signature = function_signature
@@ -30,9 +37,15 @@ class ProblemData:
         self.test_cases = [TestCase(t["input"], t["output"]) for t in test_cases]
         self.any_order = any_order
         self.reports = reports
+        self.cpu_time_limit = cpu_time_limit
+        self.comparator = comparator
+        self.problem_id = problem_id
+        self.parsed_outputs = None
+        self.revision = None
+        self.payload = None
 
 
-@dataclass
+@dataclass(slots=True)
 class PlayerData:
     username: str
     party_code: str
@@ -44,7 +57,7 @@ class PlayerData:
         self.players = players
 
 
-@dataclass
+@dataclass(slots=True)
 class Player:
     username: str
     passed: bool
@@ -64,7 +77,7 @@ class Player:
         self.finish_order = finish_order
 
 
-@dataclass
+@dataclass(slots=True)
 class Party:
     host: str
     players: dict[str, Player]
@@ -76,8 +89,9 @@ class Party:
     difficulties: List[bool]
     time_limit: int
     end_time: float
+    ranked: bool = False
 
-    def __init__(self, host: str, players: dict[str, Player], problem: ProblemData | None, status: str, total_rounds: int, current_round: int, finish_count: int, difficulties: List[bool], time_limit: int, end_time: float):
+    def __init__(self, host: str, players: dict[str, Player], problem: ProblemData | None, status: str, total_rounds: int, current_round: int, finish_count: int, difficulties: List[bool], time_limit: int, end_time: float, ranked: bool = False):
         self.host = host
         self.players = players
         self.problem = problem
@@ -88,9 +102,10 @@ class Party:
         self.difficulties = difficulties
         self.time_limit = time_limit
         self.end_time = end_time
+        self.ranked = ranked
 
 
-@dataclass
+@dataclass(slots=True)
 class GameData:
     problem: ProblemData
     party_code: str
@@ -106,7 +121,7 @@ class GameData:
         self.total_rounds = total_rounds
 
 
-@dataclass
+@dataclass(slots=True)
 class TextData:
     message: str
 
@@ -114,7 +129,7 @@ class TextData:
         self.message = message
 
 
-@dataclass
+@dataclass(slots=True)
 class MessageData:
     message: str
     bold: bool
@@ -128,7 +143,7 @@ class MessageData:
         self.username = username
 
 
-@dataclass
+@dataclass(slots=True)
 class TimeData:
     time_left: float
 
@@ -136,7 +151,7 @@ class TimeData:
         self.time_left = time_left
 
 
-@dataclass
+@dataclass(slots=True)
 class Score:
     username: str
     score: float
@@ -146,7 +161,7 @@ class Score:
         self.score = score
 
 
-@dataclass
+@dataclass(slots=True)
 class LeaderboardData:
     leaderboard: List[Score]
 
@@ -154,7 +169,7 @@ class LeaderboardData:
         self.leaderboard = leaderboard
 
 
-@dataclass
+@dataclass(slots=True)
 class RoundInfo:
     current: int
     total: int
@@ -164,7 +179,23 @@ class RoundInfo:
         self.total = total
 
 
-@dataclass
+@dataclass(slots=True)
+class TestCaseResultData:
+    index: int
+    passed: bool
+    time: float
+    passed_test_cases: int
+    total_test_cases: int
+
+    def __init__(self, index: int, passed: bool, time: float, passed_test_cases: int, total_test_cases: int):
+        self.index = index
+        self.passed = passed
+        self.time = time
+        self.passed_test_cases = passed_test_cases
+        self.total_test_cases = total_test_cases
+
+
+@dataclass(slots=True)
 class SubmissionData:
     accepted: bool
     message: str | None = None
@@ -173,8 +204,9 @@ class SubmissionData:
     passed_test_cases: int = 0
     failed_test: str = ""
     stdout: str = ""
+    test_case_times: List[float] = field(default_factory=list)
 
-    def __init__(self, accepted: bool, message: str | None = None, time: str = "", total_test_cases: int = 0, passed_test_cases: int = 0, failed_test: str = "", stdout: str = ""):
+    def __init__(self, accepted: bool, message: str | None = None, time: str = "", total_test_cases: int = 0, passed_test_cases: int = 0, failed_test: str = "", stdout: str = "", test_case_times: Optional[List[float]] = None):
         self.accepted = accepted
         self.message = message
         self.time = time
@@ -182,6 +214,23 @@ class SubmissionData:
         self.passed_test_cases = passed_test_cases
         self.failed_test = failed_test
         self.stdout = stdout
+        self.test_case_times = test_case_times or []
+
+
+@dataclass
+class RatingUpdate:
+    uid: str
+    username: str
+    email: str
+    score_delta: float
+    won: bool
+
+    def __init__(self, uid: str, username: str, email: str, score_delta: float, won: bool):
+        self.uid = uid
+        self.username = username
+        self.email = email
+        self.score_delta = score_delta
+        self.won = won
 
 
 @dataclass
@@ -195,4 +244,5 @@ class LadderEntry:
 
 @dataclass
 class LadderResponse:
-    entries: List[LadderEntry]
\ No newline at end of file
+    entries: List[LadderEntry]
+    next_cursor: Optional[str] = None
\ No newline at end of file
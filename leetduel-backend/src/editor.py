@@ -0,0 +1,114 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Hashable
+
+from src.log import logger
+
+
+class StaleEdit(Exception):
+    """Ops were computed against an older buffer; the client has to resend the full text."""
+
+    def __init__(self, version: int):
+        super().__init__(f"buffer is at version {version}")
+        self.version = version
+
+
+def apply_ops(text: str, ops: list[dict], max_length: int) -> str:
+    """Apply {"offset", "delete", "insert"} ops in order, each against the result of the previous one."""
+    if not isinstance(ops, list):
+        raise ValueError("Malformed edit")
+    for op in ops:
+        if not isinstance(op, dict):
+            raise ValueError("Malformed edit")
+        offset = op.get("offset", 0)
+        delete = op.get("delete", 0)
+        insert = op.get("insert", "")
+        if not isinstance(offset, int) or not isinstance(delete, int) or not isinstance(insert, str):
+            raise ValueError("Malformed edit")
+        if offset < 0 or delete < 0 or offset + delete > len(text):
+            raise ValueError("Edit out of range")
+        text = text[:offset] + insert + text[offset + delete:]
+
+    if len(text) > max_length:
+        raise ValueError("Buffer too large")
+    return text
+
+
+class EditorSync:
+    """Version numbers of every player's code and console buffers.
+
+    An update is either {"version": n, "ops": [...]}, applied only if the buffer is still
+    at version n, or a full buffer under `field` that resets it (to "version" if given).
+    """
+
+    def __init__(self, max_length: int):
+        self.max_length = max_length
+        self.versions: dict[tuple[str, str], int] = {}
+
+
+    def version(self, sid: str, buffer: str) -> int:
+        return self.versions.get((sid, buffer), 0)
+
+
+    def apply(self, sid: str, buffer: str, text: str, data: dict, field: str) -> str:
+        key = (sid, buffer)
+        version = self.versions.get(key, 0)
+        requested = data.get("version", None if "ops" in data else version + 1)
+        if not isinstance(requested, int) or isinstance(requested, bool) or requested < 0:
+            raise ValueError("Malformed version")
+
+        if "ops" in data:
+            if requested != version:
+                raise StaleEdit(version)
+            text = apply_ops(text, data["ops"], self.max_length)
+            self.versions[key] = version + 1
+            return text
+
+        text = data[field]
+        if not isinstance(text, str) or len(text) > self.max_length:
+            raise ValueError("Malformed buffer")
+        self.versions[key] = requested
+        return text
+
+
+    def forget(self, sid: str) -> None:
+        for buffer in ("code", "console"):
+            self.versions.pop((sid, buffer), None)
+
+
+class Coalescer:
+    """Calls `send(key)` at most once per `interval` per key, after the latest change.
+
+    Changes that arrive while a send is pending are folded into it, so a burst of
+    keystrokes costs one fan-out carrying the final text.
+    """
+
+    def __init__(self, interval: float, send: Callable[[Hashable], Awaitable[None]]):
+        self.interval = interval
+        self.send = send
+        self.last_sent: dict[Hashable, float] = {}
+        self.pending: dict[Hashable, asyncio.Task] = {}
+
+
+    def mark(self, key: Hashable) -> None:
+        if key in self.pending:
+            return
+        delay = max(0.0, self.last_sent.get(key, 0.0) + self.interval - time.monotonic())
+        self.pending[key] = asyncio.create_task(self.flush(key, delay))
+
+
+    async def flush(self, key: Hashable, delay: float) -> None:
+        await asyncio.sleep(delay)
+        del self.pending[key]
+        self.last_sent[key] = time.monotonic()
+        try:
+            await self.send(key)
+        except Exception as e:
+            logger.warning("Failed to send update for %s: %s", key, e)
+
+
+    def forget(self, key: Hashable) -> None:
+        task = self.pending.pop(key, None)
+        if task:
+            task.cancel()
+        self.last_sent.pop(key, None)
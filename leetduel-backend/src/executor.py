@@ -0,0 +1,200 @@
+import asyncio
+import time
+from typing import Optional
+
+import httpx
+
+from src.log import logger
+
+
+class ExecutorUnavailable(Exception):
+    """The executor could not take the run (connection failure or 5xx); safe to retry elsewhere."""
+
+
+class Endpoint:
+
+    def __init__(self, url: str):
+        self.url = url
+        self.in_flight = 0
+        self.healthy = True
+        self.failures = 0
+        # Exponentially weighted average of successful run latency
+        self.latency = 0.0
+        self.requests = 0
+        self.errors = 0
+
+
+    def succeeded(self, elapsed: float) -> None:
+        self.failures = 0
+        self.healthy = True
+        self.latency = elapsed if self.latency == 0 else 0.8 * self.latency + 0.2 * elapsed
+
+
+    def finished(self) -> None:
+        self.in_flight -= 1
+
+
+    def failed(self, max_failures: int) -> None:
+        self.errors += 1
+        self.failures += 1
+        if self.failures >= max_failures:
+            self.healthy = False
+
+
+class ExecutorClient:
+    """Runs submissions on a set of remote executors over one pooled keep-alive session.
+
+    Each run goes to the healthy endpoint with the fewest runs in flight. Runs have no
+    side effects, so one that fails to reach an executor is retried on another, and one
+    that is still going after `hedge_after` seconds is also sent to a second executor,
+    keeping whichever answers first. Endpoints that keep failing are skipped until the
+    health check sees them answer again.
+    """
+
+    def __init__(self, urls: list[str], max_connections: int, retries: int = 2, hedge_after: float = 0, health_path: str = "/health", health_interval: float = 10, max_failures: int = 3, token: str = "", transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.retries = retries
+        self.hedge_after = hedge_after
+        self.health_path = health_path
+        self.health_interval = health_interval
+        self.max_failures = max_failures
+        self.hedges = 0
+        self.health_task: asyncio.Task | None = None
+
+        pool_limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        # HTTP/2 multiplexes concurrent runs over one connection per executor when it is served over TLS
+        headers = {"Authorization": f"Bearer {token}"} if token else None
+        self.client = httpx.AsyncClient(http2=transport is None, limits=pool_limits, headers=headers, transport=transport)
+
+
+    def pick(self, exclude: set[str] = frozenset()) -> Optional[Endpoint]:
+        candidates = [endpoint for endpoint in self.endpoints if endpoint.url not in exclude]
+        # If everything looks down, still try rather than fail without asking
+        healthy = [endpoint for endpoint in candidates if endpoint.healthy] or candidates
+        if not healthy:
+            return None
+        return min(healthy, key=lambda endpoint: (endpoint.in_flight, endpoint.latency))
+
+
+    def dispatch(self, endpoint: Endpoint, body: dict, timeout: float) -> asyncio.Task:
+        # Counted before the task runs so runs picked in the same tick see each other
+        endpoint.in_flight += 1
+        endpoint.requests += 1
+        task = asyncio.create_task(self.send(endpoint, body, timeout))
+        task.add_done_callback(lambda _: endpoint.finished())
+        return task
+
+
+    async def send(self, endpoint: Endpoint, body: dict, timeout: float) -> dict[str, str]:
+        start = time.perf_counter()
+        try:
+            response = await self.client.post(endpoint.url, json=body, timeout=timeout + 5)
+            if response.status_code >= 500:
+                raise ExecutorUnavailable(f"{endpoint.url} answered {response.status_code}")
+            response.raise_for_status()
+            result = response.json()
+        except (httpx.ReadTimeout, httpx.WriteTimeout):
+            # The executor has the run; it is slow, not gone, and running it again won't be faster
+            raise
+        except (httpx.TransportError, ExecutorUnavailable) as e:
+            endpoint.failed(self.max_failures)
+            raise ExecutorUnavailable(str(e) or type(e).__name__) from e
+
+        endpoint.succeeded(time.perf_counter() - start)
+        return result
+
+
+    async def hedged(self, body: dict, timeout: float, tried: set[str]) -> dict[str, str]:
+        primary = self.pick(tried) or self.pick()
+        tried.add(primary.url)
+        tasks = {self.dispatch(primary, body, timeout)}
+        try:
+            if self.hedge_after > 0:
+                done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+                secondary = None if done else self.pick(tried)
+                if secondary is not None:
+                    self.hedges += 1
+                    tried.add(secondary.url)
+                    tasks.add(self.dispatch(secondary, body, timeout))
+
+            error: BaseException | None = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+    async def run(self, code: str, stdinput: str, timeout: int) -> dict[str, str]:
+        body = {"code": code, "timeout": timeout, "stdinput": stdinput}
+        tried: set[str] = set()
+        for attempt in range(self.retries + 1):
+            try:
+                return await self.hedged(body, timeout, tried)
+            except ExecutorUnavailable as e:
+                if attempt == self.retries:
+                    raise
+                logger.warning("Executor run failed, retrying: %s", e)
+                if len(tried) >= len(self.endpoints):
+                    tried.clear()
+                    await asyncio.sleep(0.05 * 2 ** attempt)
+
+
+    async def check_health(self) -> None:
+        async def check(endpoint: Endpoint) -> None:
+            url = httpx.URL(endpoint.url).copy_with(path=self.health_path, query=None)
+            try:
+                response = await self.client.get(url, timeout=5)
+                # Anything short of a 5xx means the server is up and answering
+                healthy = response.status_code < 500
+            except httpx.HTTPError:
+                healthy = False
+            if healthy and not endpoint.healthy:
+                logger.info("Executor %s is back", endpoint.url)
+                endpoint.failures = 0
+            elif not healthy and endpoint.healthy:
+                logger.warning("Executor %s failed its health check", endpoint.url)
+            endpoint.healthy = healthy
+
+        await asyncio.gather(*(check(endpoint) for endpoint in self.endpoints))
+
+
+    async def watch_health(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await self.check_health()
+
+
+    def start(self) -> None:
+        if self.health_task is None:
+            self.health_task = asyncio.create_task(self.watch_health())
+
+
+    async def close(self) -> None:
+        if self.health_task:
+            self.health_task.cancel()
+            self.health_task = None
+        await self.client.aclose()
+
+
+    def stats(self) -> dict:
+        return {
+            "hedges": self.hedges,
+            "endpoints": [
+                {
+                    "url": endpoint.url,
+                    "healthy": endpoint.healthy,
+                    "in_flight": endpoint.in_flight,
+                    "latency": round(endpoint.latency, 4),
+                    "requests": endpoint.requests,
+                    "errors": endpoint.errors,
+                }
+                for endpoint in self.endpoints
+            ],
+        }
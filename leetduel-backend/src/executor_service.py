@@ -0,0 +1,109 @@
+"""Code-execution service the backend can point CODE_EXECUTION_URL at.
+
+POST /execute takes {"code", "timeout", "stdinput"} and answers {"stdout", "stderr"},
+the contract run_remote speaks. POST /batch takes {"jobs": [...]} of the same shape and
+streams one NDJSON line per job, tagged with its index, as each finishes. Jobs run on a
+SandboxPool: warm workers that fork a child per job under CPU and memory rlimits.
+
+Settings come straight from the environment because src.config requires a database.
+"""
+import asyncio
+import hmac
+import json
+import os
+from typing import AsyncIterator
+
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+from src.sandbox import SandboxPool
+
+
+workers = int(os.getenv("EXECUTOR_WORKERS") or os.cpu_count() or 4)
+memory_limit = int(os.getenv("SANDBOX_MEMORY_LIMIT_MB") or 512)
+max_timeout = int(os.getenv("EXECUTOR_MAX_TIMEOUT") or 30)
+max_batch = int(os.getenv("EXECUTOR_MAX_BATCH") or 64)
+max_code_length = int(os.getenv("EXECUTOR_MAX_CODE_LENGTH") or 200_000)
+# When set, requests must carry "Authorization: Bearer <token>"
+token = os.getenv("EXECUTOR_TOKEN") or ""
+
+
+class Job(BaseModel):
+    code: str
+    timeout: int = 10
+    stdinput: str = ""
+
+
+class Batch(BaseModel):
+    jobs: list[Job]
+
+
+app = FastAPI()
+pool = SandboxPool(workers, memory_limit)
+
+
+def authorize(authorization: str | None) -> None:
+    if token and not hmac.compare_digest(authorization or "", f"Bearer {token}"):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+
+def validate(job: Job) -> None:
+    if len(job.code) > max_code_length:
+        raise HTTPException(status_code=413, detail="Code too large")
+    if not 0 < job.timeout <= max_timeout:
+        raise HTTPException(status_code=422, detail=f"timeout must be between 1 and {max_timeout}")
+
+
+async def run(job: Job) -> dict:
+    try:
+        return await pool.run(job.code, job.stdinput, job.timeout)
+    except asyncio.TimeoutError:
+        return {"stdout": "", "stderr": "Time limit exceeded", "timed_out": True}
+
+
+@app.on_event("startup")
+async def start_pool() -> None:
+    await pool.start()
+
+
+@app.on_event("shutdown")
+async def stop_pool() -> None:
+    await pool.close()
+
+
+@app.get("/health")
+async def health():
+    return JSONResponse({"status": "ok", "workers": pool.size, "idle": pool.idle.qsize()})
+
+
+@app.post("/")
+@app.post("/execute")
+async def execute(job: Job, authorization: str | None = Header(default=None)):
+    authorize(authorization)
+    validate(job)
+    return JSONResponse(await run(job))
+
+
+@app.post("/batch")
+async def batch(body: Batch, authorization: str | None = Header(default=None)):
+    authorize(authorization)
+    if len(body.jobs) > max_batch:
+        raise HTTPException(status_code=413, detail=f"At most {max_batch} jobs per batch")
+    for job in body.jobs:
+        validate(job)
+
+    async def indexed(index: int, job: Job) -> dict:
+        return {"index": index, **await run(job)}
+
+    async def stream() -> AsyncIterator[bytes]:
+        tasks = [asyncio.create_task(indexed(index, job)) for index, job in enumerate(body.jobs)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield (json.dumps(await finished) + "\n").encode()
+        finally:
+            # The client went away; don't keep its remaining jobs on the pool
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -0,0 +1,255 @@
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from src.comparators import Comparator, get_comparator, parsed_outputs
+from src.config import harness_cache_size
+from src.dataclass import ProblemData
+
+
+HARNESS_PRELUDE = """
+class ListNode(object):
+    def __init__(self, x=0, next=None):
+        self.val = x
+        self.next = next
+
+    def __repr__(self):
+        r = []
+        copy = self
+        while copy:
+            r.append(copy.val)
+            copy = copy.next
+
+        return str(r)
+
+
+def linkedList(a):
+    if not a:
+        return None
+    
+    head = curr = ListNode(a[0])
+    for i in a[1:]:
+        curr.next = ListNode(i)
+        curr = curr.next
+
+    return head
+"""
+
+
+
+
+# User prints are captured per test case, so the real stdout only carries
+# result records framed as "<length>:<json>\n".
+HARNESS_HEADER = """
+import sys
+import io
+import json
+import time
+import signal
+
+_leetduel_results = sys.stdout
+sys.stdout = io.StringIO()
+
+"""
+
+HARNESS_DRIVER = """
+
+def _leetduel_emit(record, value):
+    try:
+        body = json.dumps(dict(record, value=value))
+    except (TypeError, ValueError):
+        body = json.dumps(record)
+    _leetduel_results.write(f"{len(body)}:{body}\\n")
+    _leetduel_results.flush()
+
+
+def _leetduel_passed(output, result, expected):
+    if output == expected["output"] or expected.get("host"):
+        return True
+    if expected["sorted"] is None or not isinstance(result, (list, tuple)):
+        return False
+    try:
+        return sorted(json.loads(json.dumps(result))) == expected["sorted"]
+    except (TypeError, ValueError):
+        # Can't tell here; the judge on the host decides.
+        return True
+
+
+class _LeetduelTimeLimit(BaseException):
+    pass
+
+
+def _leetduel_time_up(signum, frame):
+    raise _LeetduelTimeLimit()
+
+
+def _leetduel_arm(seconds):
+    # ITIMER_PROF counts this process's CPU time; the interval re-fires if user code swallows the first signal.
+    if hasattr(signal, "setitimer"):
+        signal.setitimer(signal.ITIMER_PROF, seconds, 0.05 if seconds else 0)
+
+
+if hasattr(signal, "SIGPROF"):
+    signal.signal(signal.SIGPROF, _leetduel_time_up)
+
+_leetduel_job = json.loads(sys.stdin.read().strip())
+_leetduel_expected = _leetduel_job.get("expected")
+_leetduel_budget = _leetduel_job["cpu_limit"] * 1000000
+_leetduel_used = 0
+
+for _leetduel_index, _leetduel_args in enumerate(_leetduel_job["inputs"]):
+    sys.stdout = io.StringIO()
+    _leetduel_args = eval(_leetduel_args)
+    _leetduel_start = time.perf_counter_ns()
+    _leetduel_cpu_start = time.process_time_ns()
+    try:
+        _leetduel_arm(max(_leetduel_budget - _leetduel_used, 1000) / 1e9)
+        _leetduel_result = {function_name}(*_leetduel_args)
+        _leetduel_arm(0)
+    except _LeetduelTimeLimit:
+        _leetduel_arm(0)
+        _leetduel_result = None
+        _leetduel_used = _leetduel_budget + 1
+    _leetduel_cpu = time.process_time_ns() - _leetduel_cpu_start
+    _leetduel_elapsed = time.perf_counter_ns() - _leetduel_start
+    _leetduel_used += _leetduel_cpu
+    if _leetduel_used > _leetduel_budget:
+        _leetduel_emit({"output": "", "time": _leetduel_elapsed, "cpu": _leetduel_cpu, "stdout": sys.stdout.getvalue(), "time_limit_exceeded": True}, None)
+        break
+    _leetduel_output = str(_leetduel_result)
+    _leetduel_emit({"output": _leetduel_output, "time": _leetduel_elapsed, "cpu": _leetduel_cpu, "stdout": sys.stdout.getvalue()}, _leetduel_result)
+    if _leetduel_expected is not None and not _leetduel_passed(_leetduel_output, _leetduel_result, _leetduel_expected[_leetduel_index]):
+        break
+"""
+
+
+class ResultStream:
+    """Decodes result records from runner output that arrives in pieces.
+
+    Stops for good at anything that isn't a well-formed frame; decode_results on
+    the full output is what the judge goes by.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.broken = False
+
+
+    def feed(self, chunk: str) -> list[dict]:
+        if self.broken:
+            return []
+        self.buffer += chunk
+        records = []
+        while True:
+            separator = self.buffer.find(":")
+            if separator == -1:
+                self.broken = bool(self.buffer) and not self.buffer.isdigit()
+                break
+            if not self.buffer[:separator].isdigit():
+                self.broken = True
+                break
+            start = separator + 1
+            end = start + int(self.buffer[:separator])
+            if len(self.buffer) <= end:
+                break
+            try:
+                records.append(json.loads(self.buffer[start:end]))
+            except ValueError:
+                self.broken = True
+                break
+            self.buffer = self.buffer[end + 1:]
+        return records
+
+
+def decode_results(stream: str) -> list[dict]:
+    records = []
+    position = 0
+    while position < len(stream):
+        separator = stream.find(":", position)
+        if separator == -1 or not stream[position:separator].isdigit():
+            raise ValueError("Malformed output from code runner")
+        start = separator + 1
+        end = start + int(stream[position:separator])
+        records.append(json.loads(stream[start:end]))
+        position = end + 1
+    return records
+
+
+@dataclass
+class CompiledHarness:
+    function_name: str
+    driver: str
+    stdinput: str
+    judged_stdinput: str
+    comparator: Comparator
+    expected: list[Any]
+
+    def program(self, code: str) -> str:
+        return HARNESS_HEADER + code + self.driver
+
+
+def problem_revision(problem: ProblemData) -> str:
+    """Content hash of everything the harness is built from, so edited problems get a fresh entry."""
+    content = json.dumps([
+        problem.function_signature,
+        [[test_case.input, test_case.output] for test_case in problem.test_cases],
+        problem.any_order,
+        problem.comparator,
+        problem.cpu_time_limit
+    ])
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+def compile_harness(problem: ProblemData) -> CompiledHarness:
+    function_name = problem.function_signature.split("(")[0][4:]
+    comparator = get_comparator(problem)
+    inputs = [test_case.input for test_case in problem.test_cases]
+
+    stdinput = json.dumps({"inputs": inputs, "cpu_limit": problem.cpu_time_limit})
+    judged_stdinput = stdinput
+    if comparator.in_sandbox:
+        # Normalized expected outputs let the harness stop at the first failing case.
+        expected = [comparator.sandbox_expected(test_case.output) for test_case in problem.test_cases]
+        judged_stdinput = json.dumps({"inputs": inputs, "cpu_limit": problem.cpu_time_limit, "expected": expected})
+
+    return CompiledHarness(
+        function_name,
+        HARNESS_DRIVER.replace("{function_name}", function_name),
+        stdinput,
+        judged_stdinput,
+        comparator,
+        parsed_outputs(problem)
+    )
+
+
+class HarnessCache:
+    """LRU of compiled harnesses keyed by problem id and revision, shared by every submission."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.entries: OrderedDict[tuple, CompiledHarness] = OrderedDict()
+
+
+    def key(self, problem: ProblemData) -> tuple:
+        if problem.revision is None:
+            problem.revision = problem_revision(problem)
+        return (problem.problem_id, problem.revision)
+
+
+    def get(self, problem: ProblemData) -> CompiledHarness:
+        key = self.key(problem)
+        harness = self.entries.get(key)
+        if harness is not None:
+            self.entries.move_to_end(key)
+            return harness
+
+        harness = compile_harness(problem)
+        self.entries[key] = harness
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+        return harness
+
+
+harness_cache = HarnessCache(harness_cache_size)
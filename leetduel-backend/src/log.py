@@ -0,0 +1,24 @@
+"""Application logger whose records are written to stdout by a background thread.
+
+Handlers only put the record on a queue, so logging never blocks the event loop on I/O.
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+
+logger = logging.getLogger("leetduel")
+logger.setLevel(os.getenv("LOG_LEVEL") or "INFO")
+logger.propagate = False
+
+records: queue.SimpleQueue = queue.SimpleQueue()
+logger.addHandler(logging.handlers.QueueHandler(records))
+
+stream = logging.StreamHandler(sys.stdout)
+stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+listener = logging.handlers.QueueListener(records, stream)
+listener.start()
+atexit.register(listener.stop)
@@ -2,8 +2,8 @@ import random
 import string
 import time
 import math
-from dataclasses import asdict
-from typing import List, Dict, Optional
+import inspect
+from typing import List, Dict, Optional, Callable
 
 import socketio
 import asyncio
@@ -11,17 +11,30 @@ import uvicorn
 
 from ratelimit import limits, RateLimitException
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from .submit import Problem
-from .database import SessionLocal, UserRank
-from .crud import get_problem, increment_reports, create_or_update_user_rank, get_user_rank, get_all_user_ranks
-from .config import port
+from .submit import Problem, sandbox_pool, scheduler, executor
+from .scheduler import SubmissionRejected, Submitter
+from .harness import harness_cache
+from .result_cache import submission_cache
+from .database import run_db
+from .catalog import catalog
+from .crud import increment_reports, apply_rating_updates, create_or_update_user_rank, get_user_score
+from .matchmaking import MatchmakingQueue, QueueEntry
+from .state import create_backend
+from .editor import EditorSync, Coalescer, StaleEdit
+from .timers import DeadlineScheduler
+from . import serialization
+from .serialization import payload
+from .config import port, code_execution_url, redis_url, node_id, party_lease_seconds, spectate_update_interval, max_editor_length, timer_tick_interval, matchmaking_tick, matchmaking_bucket_width, matchmaking_base_window, matchmaking_window_growth
 
 from src.routes.problems import router as problems_router
 from src.routes.ladder import router as ladder_router
 from src.dataclass import *
+from src.sessions import SessionRegistry
+from src.log import logger
+from src.metrics import registry, event_seconds, watch_loop_lag
 
 import sqlite3
 import json
@@ -70,36 +83,120 @@ def init_db():
 
 init_db()
 
-sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*")
+# With Redis, emits to a room reach its members on every worker and node
+client_manager = socketio.AsyncRedisManager(redis_url) if redis_url else None
+sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*", client_manager=client_manager, json=serialization)
 socket_app = socketio.ASGIApp(sio, app)
 
+
+def event(handler: Callable) -> Callable:
+    """Register a handler like @sio.event, recording its latency per event."""
+    name = handler.__name__
+    # socketio may pass more arguments than a handler takes (disconnect gets a reason)
+    accepts = len(inspect.signature(handler).parameters)
+
+    async def timed(*args):
+        with event_seconds.time(name):
+            return await handler(*args[:accepts])
+
+    sio.on(name, timed)
+    return handler
+
+
 parties: dict[str, Party] = {}
 language_id = 100
-matchmaking_queue = {}  # Dictionary to store players in matchmaking queue
-matchmaking_lock = asyncio.Lock()  # Lock for thread-safe operations on matchmaking queue
-active_users = {}  # Dictionary to track active users by uid
+matchmaking = MatchmakingQueue(matchmaking_bucket_width, matchmaking_base_window, matchmaking_window_growth)
+matchmaking_task: asyncio.Task | None = None
+sessions = SessionRegistry()  # Active users and party membership, indexed by sid, uid and party
+state = create_backend(redis_url)  # Party and user leases shared with other nodes
+lease_task: asyncio.Task | None = None
+editors = EditorSync(max_editor_length)  # Versions of each player's code and console buffers
 user_lock = asyncio.Lock()  # Lock for thread-safe operations on active users
+loop_lag_task: asyncio.Task | None = None
+
+registry.gauge("leetduel_parties", "Parties hosted by this node", lambda: len(parties))
+registry.gauge("leetduel_parties_in_progress", "Parties with a round in progress", lambda: sum(1 for party in parties.values() if party.status == "in_progress"))
+registry.gauge("leetduel_players", "Players in parties on this node", lambda: sum(len(party.players) for party in parties.values()))
+registry.gauge("leetduel_active_users", "Users searching for or playing a ranked match", lambda: len(sessions.users))
+registry.gauge("leetduel_matchmaking_queue_depth", "Players waiting for a ranked match", lambda: len(matchmaking))
+registry.gauge("leetduel_submissions_running", "Submissions executing on this node", lambda: scheduler.running)
+registry.gauge("leetduel_submissions_queued", "Submissions waiting for an execution slot", lambda: scheduler.queued)
 
 
 # <----------------- Helper functions ----------------->
 
-def get_random_problem(difficulty: List[bool], problem_id: int | None = None) -> ProblemData | None:
-    db = SessionLocal()
+def load_problem(db: Session, difficulty: List[bool], problem_id: int | None = None) -> ProblemData | None:
+    if problem_id is not None:
+        return catalog.get(db, problem_id)
+    return catalog.random_problem(db, difficulty)
 
-    try:
-        problem = get_problem(db, difficulty, problem_id)
-        if not problem:
-            return None
-        return problem.asdata()
-    
-    finally:
-        db.close()
+
+async def get_random_problem(difficulty: List[bool], problem_id: int | None = None) -> ProblemData | None:
+    return await run_db(load_problem, difficulty, problem_id)
+
+
+def party_uids(party: Party) -> dict[str, str]:
+    """Map each player's sid to their uid"""
+    uids = {sid: sessions.uid_for_sid(sid) for sid in party.players}
+    return {sid: uid for sid, uid in uids.items() if uid is not None}
+
+
+def rating_updates(party: Party, uids: dict[str, str], remaining_sid: str | None = None) -> List[RatingUpdate]:
+    updates = []
+    for player_sid, uid in uids.items():
+        player = party.players[player_sid]
+        user_data = sessions.user(uid)
+        won = (player_sid == remaining_sid) if remaining_sid else player.passed
+        updates.append(RatingUpdate(uid, user_data["username"], user_data["email"], player.total_score, won))
+    return updates
+
+
+def forget_editors(sid: str) -> None:
+    """Drop a player's buffer versions and any spectator update still pending for them"""
+    editors.forget(sid)
+    spectate_updates.forget((sid, "code"))
+    spectate_updates.forget((sid, "console"))
+
+
+async def remove_party(party_code: str) -> None:
+    party = parties.pop(party_code, None)
+    timers.cancel(party_code)
+    scheduler.cancel_party(party_code)
+    if party:
+        for sid in party.players:
+            if sessions.party_for_sid(sid) == party_code:
+                sessions.leave_party(sid)
+                forget_editors(sid)
+        await state.release(f"party:{party_code}", node_id)
 
 
 def generate_party_code() -> str:
     return "".join(random.choices(string.ascii_uppercase + string.digits, k=6))
 
 
+async def allocate_party_code() -> str:
+    """A code no node is using, leased to this node so its timers run here and only here."""
+    while True:
+        party_code = generate_party_code()
+        if party_code not in parties and await state.claim(f"party:{party_code}", node_id, party_lease_seconds):
+            return party_code
+
+
+async def owns_party(party_code: str) -> bool:
+    return party_code in parties and await state.owner(f"party:{party_code}") == node_id
+
+
+async def renew_leases() -> None:
+    """Keep this node's parties and active users leased; leases of a dead node expire."""
+    while True:
+        await asyncio.sleep(party_lease_seconds / 3)
+        for party_code in list(parties):
+            if not await state.renew(f"party:{party_code}", node_id, party_lease_seconds):
+                logger.warning("Lost lease on party %s", party_code)
+        for uid, user in list(sessions.users.items()):
+            await state.renew(f"user:{uid}", user["sid"], party_lease_seconds)
+
+
 def all_players_passed(party_code: str) -> bool:
     return all([player.passed for player in parties[party_code].players.values()])
 
@@ -113,21 +210,31 @@ def get_score(submission: SubmissionData, finish_order: int = 10) -> float:
     return 100 * submission.passed_test_cases / (math.log10(max(2, float(submission.time))) * finish_order * submission.total_test_cases)
 
 
-async def game_timeout(party_code: str, time_limit: int, problem_name: str) -> None:
-    await asyncio.sleep(time_limit * 60)
-    if party_code not in parties:
+async def round_timeout(party_code: str) -> None:
+    """Called by the timer service when a round's end_time passes."""
+    if not await owns_party(party_code):
         return
     
     party = parties[party_code]
 
-    if party.status == "in_progress" and party.problem != None and party.problem.name == problem_name:
-        party.status = "waiting"
+    if party.status == "in_progress" and party.problem != None:
         reset_players_passed(party_code)
 
         message = MessageData("Time is up!", True, "")
-        await sio.emit("message_received", asdict(message), room=party_code)
-        await asyncio.sleep(3)
-        await finish_round(party_code)
+        await sio.emit("message_received", payload(message), room=party_code)
+        await finish_round(party_code, delay=3)
+
+
+async def send_time_updates(party_codes: list[str]) -> None:
+    """Periodic update_time for every round in progress, one emit per party room."""
+    now = time.time()
+    for party_code in party_codes:
+        party = parties.get(party_code)
+        if party and party.status == "in_progress":
+            await sio.emit("update_time", payload(TimeData(max(0, party.end_time - now))), room=party_code)
+
+
+timers = DeadlineScheduler(round_timeout, send_time_updates, timer_tick_interval)
 
 
 @limits(calls=20, period=5)
@@ -142,10 +249,11 @@ async def start_new_round(party_code: str) -> None:
     difficulty = party.difficulties
     time_limit = party.time_limit
 
-    problem = get_random_problem(difficulty)
+    problem = await get_random_problem(difficulty)
     if not problem:
         return
     
+    harness_cache.get(problem)  # Compile once so the round's submissions share it
     party.problem = problem
     party.status = "in_progress"
     party.finish_count = 0
@@ -161,18 +269,25 @@ async def start_new_round(party_code: str) -> None:
         player.console_output = "Test case output"
     
     game_data = GameData(problem, party_code, time_limit, party.current_round, party.total_rounds)
-    await sio.emit("game_started", asdict(game_data), room=party_code)
+    await sio.emit("game_started", payload(game_data), room=party_code)
     time_data = TimeData(time_limit * 60)
-    await sio.emit("update_time", asdict(time_data), to=party.host)
-    asyncio.create_task(game_timeout(party_code, time_limit, problem.name))
+    await sio.emit("update_time", payload(time_data), to=party.host)
+    timers.schedule(party_code, end_time)
 
 
-async def finish_round(party_code: str) -> None:
-    if party_code not in parties:
+async def finish_round(party_code: str, delay: float = 0) -> None:
+    party = parties.get(party_code)
+    # Only the first caller ends the round; later ones (a second solver, the timer) return here
+    if party is None or party.status != "in_progress":
         return
     
-    party = parties[party_code]
     party.status = "waiting"
+    timers.cancel(party_code)
+    scheduler.cancel_party(party_code)
+    if delay:
+        await asyncio.sleep(delay)
+        if parties.get(party_code) is not party:
+            return
     # Find if any player has passed (solved the problem)
     solver_sid = None
     for sid, player in party.players.items():
@@ -191,35 +306,17 @@ async def finish_round(party_code: str) -> None:
         leaderboard_players = sorted(list(party.players.values()), key=lambda p: p.total_score, reverse=True)
         leaderboard = [Score(p.username, p.total_score) for p in leaderboard_players]
         leaderboard_data = LeaderboardData(leaderboard)
-        await sio.emit("final_leaderboard", asdict(leaderboard_data), room=party_code)
+        await sio.emit("final_leaderboard", payload(leaderboard_data), room=party_code)
         # Update leaderboard in DB and clean up
-        db = SessionLocal()
-        try:
-            for player_sid, player in party.players.items():
-                for uid, user_data in active_users.items():
-                    if user_data["sid"] == player_sid:
-                        create_or_update_user_rank(
-                            db=db,
-                            uid=uid,
-                            username=user_data["username"],
-                            email=user_data["email"],
-                            score_delta=player.total_score,
-                            won=player.passed
-                        )
-                        break
-        finally:
-            db.close()
+        uids = party_uids(party)
+        await run_db(apply_rating_updates, rating_updates(party, uids))
         # Clean up users after game ends
         async with user_lock:
-            for player_sid in party.players:
-                for uid, user_data in list(active_users.items()):
-                    if user_data["sid"] == player_sid:
-                        remove_active_user(uid)
-                        break
+            for uid in uids.values():
+                await remove_active_user(uid)
         # Remove the party after a short delay
         await asyncio.sleep(5)
-        if party_code in parties:
-            del parties[party_code]
+        await remove_party(party_code)
     else:
         # If no one solved, just show leaderboard as before
         for player in party.players.values():
@@ -227,83 +324,89 @@ async def finish_round(party_code: str) -> None:
         leaderboard_players = sorted(list(party.players.values()), key=lambda p: p.total_score, reverse=True)
         leaderboard = [Score(p.username, p.total_score) for p in leaderboard_players]
         leaderboard_data = LeaderboardData(leaderboard)
-        await sio.emit("final_leaderboard", asdict(leaderboard_data), room=party_code)
+        await sio.emit("final_leaderboard", payload(leaderboard_data), room=party_code)
         # Clean up users after game ends
         async with user_lock:
-            for player_sid in party.players:
-                for uid, user_data in list(active_users.items()):
-                    if user_data["sid"] == player_sid:
-                        remove_active_user(uid)
-                        break
+            for uid in party_uids(party).values():
+                await remove_active_user(uid)
         await asyncio.sleep(5)
-        if party_code in parties:
-            del parties[party_code]
+        await remove_party(party_code)
 
 
 # <----------------- Socket events ----------------->
 
-@sio.event
+@event
 async def create_party(sid: str, data: dict) -> None:
-    print(f"create_party event received from {sid}: {data}")
-    party_code = generate_party_code()
+    logger.debug("create_party event received from %s: %s", sid, data)
+    party_code = await allocate_party_code()
     player = Player(data["username"], False, "", "", 0, 0, None)
     party = Party(sid, {sid: player}, None, "waiting", 0, 0, 0, [True, True, True], 0, 0)
     parties[party_code] = party
+    sessions.join_party(sid, party_code)
 
     player_data = PlayerData(data["username"], party_code)
-    await sio.emit("party_created", asdict(player_data), to=sid)
+    await sio.emit("party_created", payload(player_data), to=sid)
     await sio.enter_room(sid, party_code)
 
 
-@sio.event
+@event
 async def start_next_round(sid: str, data: dict) -> None:
-    print(f"start_next_round event received from {sid}")
+    logger.debug("start_next_round event received from %s", sid)
     party_code = data["party_code"]
     if party_code not in parties or sid != parties[party_code].host:
         return
     await start_new_round(party_code)
 
 
-@sio.event
+@event
 async def join_party(sid: str, data: dict) -> None:
-    print(f"join_party event received from {sid}: {data}")
+    logger.debug("join_party event received from %s: %s", sid, data)
     party_code = data["party_code"]
     username = data["username"]
 
     if party_code == "":
-        if not parties:
+        # Any node's party will do; joining one hosted elsewhere redirects below
+        party_codes = [key.removeprefix("party:") for key in await state.keys("party:")]
+        if not party_codes:
             e = TextData("No parties to join")
-            await sio.emit("error", asdict(e), to=sid)
+            await sio.emit("error", payload(e), to=sid)
             return
 
-        party_code = random.choice(list(parties.keys()))
+        party_code = random.choice(party_codes)
         await sio.emit("set_party_code", {"party_code": party_code}, to=sid)
 
     if party_code not in parties:
+        # Parties live on the node that created them; the client reconnects with ?node=<owner>
+        # for the load balancer to route it there, then joins again
+        owner = await state.owner(f"party:{party_code}")
+        if owner and owner != node_id:
+            await sio.emit("party_elsewhere", {"party_code": party_code, "username": username, "node": owner}, to=sid)
+            return
         e = TextData("Party not found")
-        await sio.emit("error", asdict(e), to=sid)
+        await sio.emit("error", payload(e), to=sid)
         return
-    
+
     party = parties[party_code]
 
     if len(party.players) >= 10:
         e = TextData("Party is full!")
-        await sio.emit("error", asdict(e), to=sid)
+        await sio.emit("error", payload(e), to=sid)
         return
     
     if username in [d.username for d in party.players.values()]:
         e = TextData("Username taken!")
-        await sio.emit("error", asdict(e), to=sid)
+        await sio.emit("error", payload(e), to=sid)
         return
     
     player = Player(username, False, "", "", 0, 0, None)
     party.players[sid] = player
+    sessions.join_party(sid, party_code)
     player_usernames = [d.username for d in party.players.values()]
 
     await sio.enter_room(sid, party_code)
     player_data = PlayerData(username, party_code, player_usernames)
 
-    await sio.emit("player_joined", asdict(player_data), room=party_code)
+    await sio.emit("player_joined", payload(player_data), room=party_code)
 
     if party.status == "in_progress":
         problem = party.problem
@@ -314,15 +417,15 @@ async def join_party(sid: str, data: dict) -> None:
         player.console_output = "Test case output"
         game_data = GameData(problem, party_code, party.time_limit, party.current_round, party.total_rounds)
 
-        await sio.emit("game_started", asdict(game_data), to=sid)
+        await sio.emit("game_started", payload(game_data), to=sid)
         
         message = MessageData(f"{username} has joined the game!", True, "")
-        await sio.emit("message_received", asdict(message), room=party_code)
+        await sio.emit("message_received", payload(message), room=party_code)
 
 
-@sio.event
+@event
 async def start_game(sid: str, data: dict, difficulties: List[bool] = []) -> None:
-    print(f"start_game event received from {sid}: {data}")
+    logger.debug("start_game event received from %s: %s", sid, data)
     party_code = data["party_code"]
     difficulty = difficulties or [data["easy"], data["medium"], data["hard"]]
     time_limit = int(data["time_limit"] or "15")
@@ -330,14 +433,14 @@ async def start_game(sid: str, data: dict, difficulties: List[bool] = []) -> Non
 
     if party_code not in parties:
         e = TextData("Party not found")
-        await sio.emit("error", asdict(e), to=sid)
+        await sio.emit("error", payload(e), to=sid)
         return
     
     party = parties[party_code]
 
     if party.host != sid:
         e = TextData("You are not the host")
-        await sio.emit("error", asdict(e), to=sid)
+        await sio.emit("error", payload(e), to=sid)
         return
 
     try:
@@ -346,11 +449,12 @@ async def start_game(sid: str, data: dict, difficulties: List[bool] = []) -> Non
         party.finish_count = 0
 
         end_time = time.time() + (time_limit * 60)
-        problem = get_random_problem(difficulty)
+        problem = await get_random_problem(difficulty)
 
         if not problem:
             return
         
+        harness_cache.get(problem)  # Compile once so the round's submissions share it
         party.problem = problem
         party.status = "in_progress"
         party.difficulties = difficulty
@@ -366,24 +470,24 @@ async def start_game(sid: str, data: dict, difficulties: List[bool] = []) -> Non
             player.finish_order = None
 
         game_data = GameData(problem, party_code, time_limit, 1, 1)  # Force 1 round
-        await sio.emit("game_started", asdict(game_data), room=party_code)
+        await sio.emit("game_started", payload(game_data), room=party_code)
 
         time_data = TimeData(time_limit * 60)
-        await sio.emit("update_time", asdict(time_data), to=sid)
+        await sio.emit("update_time", payload(time_data), to=sid)
 
         round_info = RoundInfo(1, 1)  # Force 1 round
-        await sio.emit("update_round_info", asdict(round_info), to=sid)
-        asyncio.create_task(game_timeout(party_code, time_limit, problem.name))
+        await sio.emit("update_round_info", payload(round_info), to=sid)
+        timers.schedule(party_code, end_time)
 
     except Exception as e:
-        print(f"Error in start_game:\n{e}")
+        logger.exception("Error in start_game")
         error = TextData("An internal error occurred while retrieving problems.")
-        await sio.emit("error", asdict(error), to=sid)
+        await sio.emit("error", payload(error), to=sid)
 
 
-@sio.event
+@event
 async def submit_code(sid: str, data: dict) -> None:
-    print(f"submit_code event received from {sid}")
+    logger.debug("submit_code event received from %s", sid)
     party_code = data["party_code"]
 
     if party_code not in parties:
@@ -393,15 +497,40 @@ async def submit_code(sid: str, data: dict) -> None:
     party = parties[party_code]
     if sid not in party.players.keys() or not party.problem:
         return
-    
+
+    if party.status != "in_progress":
+        # The client holds Run disabled until it hears back
+        await sio.emit("code_submitted", payload(TextData("Failed, the round is over.")), to=sid)
+        return
+
     player = party.players[sid]
 
     code = data["code"]
     problem_obj = party.problem
+    # end_time is set afresh every round, so it tells this round apart from a later one
+    round_end = party.end_time
     problem = Problem(language_id, problem_obj)
     color = "#EF5350"
 
-    submission = problem.submit_code(code)
+    async def on_queued(position: int) -> None:
+        await sio.emit("submission_queued", payload(TextData(f"Queued, position {position}")), to=sid)
+
+    async def on_progress(result: TestCaseResultData) -> None:
+        await sio.emit("test_case_result", payload(result), to=sid)
+
+    try:
+        submitter = Submitter(sessions.uid_for_sid(sid) or f"{party_code}:{player.username}", party_code, party.ranked, on_queued)
+        submission = await problem.submit_code(code, submitter=submitter, on_progress=on_progress)
+    except SubmissionRejected as e:
+        # Never ran, so there is nothing to tell the room
+        await sio.emit("code_submitted", payload(TextData(f"Failed, {e}")), to=sid)
+        return
+
+    # The round may have ended, moved on or been torn down while the code ran
+    if parties.get(party_code) is not party or party.status != "in_progress" or party.end_time != round_end or party.problem is not problem_obj or party.players.get(sid) is not player:
+        await sio.emit("code_submitted", payload(TextData("Failed, the round ended before your submission was judged.")), to=sid)
+        return
+
     status = "Accepted" if submission.accepted else "Failed"
 
     if submission.message:
@@ -432,19 +561,18 @@ async def submit_code(sid: str, data: dict) -> None:
         await finish_round(party_code)
 
     client_message = TextData(message_to_client)
-    await sio.emit("code_submitted", asdict(client_message), to=sid)
+    await sio.emit("code_submitted", payload(client_message), to=sid)
 
-    if submission.message == None or submission.message != "Rate limited! Please wait 5 seconds and try again.":
-        room_message = MessageData(message_to_room, True, color)
-        await sio.emit("message_received", asdict(room_message), room=party_code)
+    room_message = MessageData(message_to_room, True, color)
+    await sio.emit("message_received", payload(room_message), room=party_code)
 
-    if all_players_passed(party_code):
+    if party_code in parties and all_players_passed(party_code):
         await finish_round(party_code)
 
 
-@sio.event
+@event
 async def player_opened(sid: str, data: dict) -> None:
-    print(f"player_opened event received from {sid}: {data}")
+    logger.debug("player_opened event received from %s: %s", sid, data)
     party_code = data["party_code"]
     if party_code not in parties:
         return
@@ -456,24 +584,24 @@ async def player_opened(sid: str, data: dict) -> None:
     player_usernames = [d.username for d in party.players.values()]
     player_data = PlayerData("", party_code, player_usernames)
 
-    await sio.emit("players_update", asdict(player_data), room=party_code)
+    await sio.emit("players_update", payload(player_data), room=party_code)
 
 
-@sio.event
+@event
 async def chat_message(sid: str, data: dict) -> None:
     try:
         rate_limiter()
     except RateLimitException:
         return
     
-    print(f"chat_message event received from {sid}: {data}")
+    logger.debug("chat_message event received from %s: %s", sid, data)
     party_code = data["party_code"]
     message = data["message"]
     username = data["username"]
 
     message_data = MessageData(f"{username}: {message}", False, "")
 
-    await sio.emit("message_received", asdict(message_data), room=party_code)
+    await sio.emit("message_received", payload(message_data), room=party_code)
 
 
 async def end_game(party_code: str, message: str = "Game ended due to player leaving.", remaining_sid: str = None) -> None:
@@ -493,57 +621,36 @@ async def end_game(party_code: str, message: str = "Game ended due to player lea
                     player.total_score = 0
 
         # Update ladder rankings for all players
-        db = SessionLocal()
-        try:
-            for player_sid, player in party.players.items():
-                for uid, user_data in active_users.items():
-                    if user_data["sid"] == player_sid:
-                        create_or_update_user_rank(
-                            db=db,
-                            uid=uid,
-                            username=user_data["username"],
-                            email=user_data["email"],
-                            score_delta=player.total_score,
-                            won=(player_sid == remaining_sid) if remaining_sid else player.passed
-                        )
-                        break
-        finally:
-            db.close()
+        await run_db(apply_rating_updates, rating_updates(party, party_uids(party), remaining_sid))
         
         leaderboard_players = sorted(list(party.players.values()), key=lambda p: p.total_score, reverse=True)
         leaderboard = [Score(p.username, p.total_score) for p in leaderboard_players]
         leaderboard_data = LeaderboardData(leaderboard)
-        await sio.emit("final_leaderboard", asdict(leaderboard_data), room=party_code)
+        await sio.emit("final_leaderboard", payload(leaderboard_data), room=party_code)
     
     # Notify all players
-    await sio.emit("message_received", asdict(MessageData(message, True, "")), room=party_code)
+    await sio.emit("message_received", payload(MessageData(message, True, "")), room=party_code)
     
     # Clean up users
     async with user_lock:
-        for player_sid in party.players:
-            for uid, user_data in list(active_users.items()):
-                if user_data["sid"] == player_sid:
-                    remove_active_user(uid)
-                    break
+        for uid in party_uids(party).values():
+            await remove_active_user(uid)
     
     # Remove party after a short delay
     await asyncio.sleep(3)
-    if party_code in parties:
-        del parties[party_code]
+    await remove_party(party_code)
 
-@sio.event
+@event
 async def leave_party(sid: str, data: dict) -> None:
-    print(f"leave_party event received from {sid}: {data}")
+    logger.debug("leave_party event received from %s: %s", sid, data)
     party_code = data["party_code"]
     username = data["username"]
     
     # Remove user from active users
     async with user_lock:
-        # Find and remove the user by their sid
-        for uid, user_data in list(active_users.items()):
-            if user_data["sid"] == sid:
-                remove_active_user(uid)
-                break
+        uid = sessions.uid_for_sid(sid)
+        if uid:
+            await remove_active_user(uid)
     
     await sio.emit("leave_party", to=sid)
 
@@ -565,25 +672,27 @@ async def leave_party(sid: str, data: dict) -> None:
         await end_game(party_code, "Host left the party. Game ended.", remaining_sid)
     else:
         del party.players[sid]
+        sessions.leave_party(sid)
+        forget_editors(sid)
         message = MessageData(f"{username} has left the party.", True, "")
-        await sio.emit("message_received", asdict(message), room=party_code)
+        await sio.emit("message_received", payload(message), room=party_code)
         await sio.leave_room(sid, party_code)
         # Check if party is now empty
         await cleanup_empty_party(party_code)
 
 
-# @sio.event
+# @event
 # async def restart_game(sid: str, data: dict) -> None:
 #     party_code = data["party_code"]
 #     if party_code not in parties:
 #         e = TextData("Party not found")
-#         await sio.emit("error", asdict(e), to=sid)
+#         await sio.emit("error", payload(e), to=sid)
 #         return
 
 #     party = parties[party_code]
 #     if party.host != sid:
 #         e = TextData("Only the host can restart the game.")
-#         await sio.emit("error", asdict(e), to=sid)
+#         await sio.emit("error", payload(e), to=sid)
 #         return
 
 #     party.current_round = 1
@@ -605,48 +714,48 @@ async def leave_party(sid: str, data: dict) -> None:
 #     await start_game(sid, config, party.get("difficulties", [True, True, True]))
 
 
-@sio.event
+@event
 async def disconnect(sid: str) -> None:
-    print(f"disconnect event received from {sid}")
+    logger.debug("disconnect event received from %s", sid)
+    forget_editors(sid)
     # Remove from matchmaking queue if present
-    async with matchmaking_lock:
-        if sid in matchmaking_queue:
-            uid = matchmaking_queue[sid]["uid"]
-            del matchmaking_queue[sid]
-            async with user_lock:
-                remove_active_user(uid)
+    entry = matchmaking.remove(sid)
+    if entry:
+        async with user_lock:
+            await remove_active_user(entry.uid)
     
     # Handle existing party disconnection logic
-    for party_code, party in list(parties.items()):
-        if sid not in party.players:
-            continue
+    party_code = sessions.party_for_sid(sid)
+    party = parties.get(party_code) if party_code else None
+    if not party_code or not party or sid not in party.players:
+        sessions.leave_party(sid)
+        return
 
-        player = party.players[sid]
-        async with user_lock:
-            # Find and remove the user by their sid
-            for uid, user_data in list(active_users.items()):
-                if user_data["sid"] == sid:
-                    remove_active_user(uid)
-                    break
-            
-        # If game is in progress, end it
-        if party.status == "in_progress":
-            # Find the remaining player's sid
-            remaining_sid = next((player_sid for player_sid in party.players if player_sid != sid), None)
-            await end_game(party_code, f"{player.username} disconnected. Game ended.", remaining_sid)
-            continue
-
-        message = MessageData(f"{player.username} has disconnected.", True, "")
-        await sio.emit("message_received", asdict(message), room=party_code)
-        await sio.emit("player_left", {"username": player.username}, room=party_code)
+    player = party.players[sid]
+    async with user_lock:
+        uid = sessions.uid_for_sid(sid)
+        if uid:
+            await remove_active_user(uid)
+        
+    # If game is in progress, end it
+    if party.status == "in_progress":
+        # Find the remaining player's sid
+        remaining_sid = next((player_sid for player_sid in party.players if player_sid != sid), None)
+        await end_game(party_code, f"{player.username} disconnected. Game ended.", remaining_sid)
+        return
 
-        del party.players[sid]
-        await sio.leave_room(sid, party_code)
-        # Check if party is now empty
-        await cleanup_empty_party(party_code)
+    message = MessageData(f"{player.username} has disconnected.", True, "")
+    await sio.emit("message_received", payload(message), room=party_code)
+    await sio.emit("player_left", {"username": player.username}, room=party_code)
+
+    del party.players[sid]
+    sessions.leave_party(sid)
+    await sio.leave_room(sid, party_code)
+    # Check if party is now empty
+    await cleanup_empty_party(party_code)
 
 
-@sio.event
+@event
 async def retrieve_players(sid: str, data: dict) -> None:
     party_code = data["party_code"]
     if party_code not in parties:
@@ -655,14 +764,14 @@ async def retrieve_players(sid: str, data: dict) -> None:
     players = parties[party_code].players.values()
     player_usernames = [d.username for d in players]
 
-    print(f"retrieve_players event received from {sid}, players: {player_usernames}")
+    logger.debug("retrieve_players event received from %s, players: %s", sid, player_usernames)
     player_data = PlayerData("", party_code, player_usernames)
-    await sio.emit("send_players", asdict(player_data), to=sid)
+    await sio.emit("send_players", payload(player_data), to=sid)
 
 
-@sio.event
+@event
 async def retrieve_code(sid: str, data: dict) -> None:
-    print(f"retrieve_code event received from {sid}")
+    logger.debug("retrieve_code event received from %s", sid)
     party_code = data["party_code"]
     username = data["username"]
     spectate_sid = ""
@@ -687,157 +796,270 @@ async def retrieve_code(sid: str, data: dict) -> None:
     text_data = TextData(new_text)
     code_data = TextData(new_code)
 
-    await sio.emit("updated_console", asdict(text_data), room=f"{spectate_sid}:spectate")
-    await sio.emit("updated_code", asdict(code_data), room=f"{spectate_sid}:spectate")
+    await sio.emit("updated_console", payload(text_data), room=f"{spectate_sid}:spectate")
+    await sio.emit("updated_code", payload(code_data), room=f"{spectate_sid}:spectate")
+
+
+async def send_spectate_update(key: tuple[str, str]) -> None:
+    player_sid, buffer = key
+    party = parties.get(sessions.party_for_sid(player_sid) or "")
+    player = party.players.get(player_sid) if party else None
+    if not player:
+        return
+    if buffer == "code":
+        await sio.emit("updated_code", payload(TextData(player.code)), room=f"{player_sid}:spectate")
+    else:
+        await sio.emit("updated_console", payload(TextData(player.console_output)), room=f"{player_sid}:spectate")
+
+
+spectate_updates = Coalescer(spectate_update_interval, send_spectate_update)
 
 
-@sio.event
+async def apply_editor_update(sid: str, data: dict, buffer: str, field: str) -> None:
+    """Apply a delta or full update to the Player attribute `field` and schedule the spectator fan-out."""
+    party = parties.get(data.get("party_code", ""))
+    player = party.players.get(sid) if party else None
+    if not player:
+        return
+
+    try:
+        setattr(player, field, editors.apply(sid, buffer, getattr(player, field), data, field))
+    except StaleEdit as e:
+        await sio.emit(f"resync_{buffer}", {"version": e.version}, to=sid)
+        return
+    except (ValueError, KeyError):
+        return
+    spectate_updates.mark((sid, buffer))
+
+
+@event
+async def code_update(sid: str, data: dict) -> None:
+    await apply_editor_update(sid, data, "code", "code")
+
+
+@event
+async def console_update(sid: str, data: dict) -> None:
+    await apply_editor_update(sid, data, "console", "console_output")
+
+
+@event
+async def retrieve_time(sid: str, data: dict) -> None:
+    party = parties.get(data["party_code"])
+    if not party:
+        return
+    time_left = timers.remaining(data["party_code"]) if party.status == "in_progress" else None
+    await sio.emit("update_time", payload(TimeData(time_left or 0)), to=sid)
+
+
+@event
+async def retrieve_round_info(sid: str, data: dict) -> None:
+    party = parties.get(data["party_code"])
+    if not party:
+        return
+    await sio.emit("update_round_info", payload(RoundInfo(party.current_round, party.total_rounds)), to=sid)
+
+
+@event
 async def leave_spectate_rooms(sid: str, data: dict) -> None:
     party_code = data["party_code"]
     for player_sid in parties[party_code].players:
         await sio.leave_room(sid, f"{player_sid}:spectate")
 
 
-@sio.event
+@event
 async def report_problem(sid: str, data: dict) -> None:
-    print(f"Report problem event received from {sid}")
+    logger.debug("Report problem event received from %s", sid)
     party_code = data["party_code"]
     if party_code not in parties:
         return
     party = parties[party_code]
-    db = SessionLocal()
-    try:
-        if party.problem:
-            increment_reports(db, party.problem.name)
-    finally:
-        db.close()
+    if party.problem:
+        await run_db(increment_reports, party.problem.name)
 
 
 def is_user_active(uid: str) -> bool:
     """Check if a user is currently active"""
-    return uid in active_users
+    return sessions.is_active(uid)
 
-def add_active_user(uid: str, sid: str, username: str, email: str) -> None:
+async def add_active_user(uid: str, sid: str, username: str, email: str) -> bool:
     """Add a user to the active set"""
-    print(f"Adding user to active set: {username} ({uid})")
-    active_users[uid] = {
-        "sid": sid,
-        "username": username,
-        "email": email
-    }
-
-def remove_active_user(uid: str) -> None:
+    logger.info("Adding user to active set: %s (%s)", username, uid)
+    if not await state.claim(f"user:{uid}", sid, party_lease_seconds):
+        # Searching or playing through another node
+        return False
+    sessions.add_user(uid, sid, username, email)
+    return True
+
+async def remove_active_user(uid: str) -> None:
     """Remove a user from the active set"""
-    if uid in active_users:
-        print(f"Removing user from active set: {active_users[uid]['username']} ({uid})")
-        del active_users[uid]
+    user = sessions.remove_user(uid)
+    if user:
+        logger.info("Removing user from active set: %s (%s)", user['username'], uid)
+        await state.release(f"user:{uid}", user["sid"])
 
-def create_user_if_not_exists(uid: str, username: str) -> None:
+async def create_user_if_not_exists(uid: str, username: str) -> None:
     """Create a user record if it doesn't exist"""
-    db = SessionLocal()
-    try:
-        create_or_update_user_rank(
-            db=db,
-            uid=uid,
-            username=username,
-            email="",  # Email will be updated when user starts matchmaking
-            score_delta=0,
-            won=False
-        )
-    finally:
-        db.close()
-
-@sio.event
+    await run_db(
+        create_or_update_user_rank,
+        uid=uid,
+        username=username,
+        email="",  # Email will be updated when user starts matchmaking
+        score_delta=0,
+        won=False
+    )
+
+@event
 async def start_matchmaking(sid: str, data: dict) -> None:
-    print(f"start_matchmaking event received from {sid}: {data}")
+    logger.debug("start_matchmaking event received from %s: %s", sid, data)
     username = data["username"]
     email = data["email"]
     uid = data["uid"]
-    difficulties = [True, True, True]  # Fixed difficulties - all enabled
     
     # Create user record if it doesn't exist
-    create_user_if_not_exists(uid, username)
-    
+    await create_user_if_not_exists(uid, username)
+    # Read before claiming the user, so no await separates the claim from queueing
+    rating = await run_db(get_user_score, uid)
+
     # Check if user is already active
     async with user_lock:
-        if is_user_active(uid):
+        if is_user_active(uid) or not await add_active_user(uid, sid, username, email):
             error = TextData("You are already in a game or searching for a match.")
-            await sio.emit("error", asdict(error), to=sid)
+            await sio.emit("error", payload(error), to=sid)
+            return
+
+        # The claim may have waited on the backend; a sid that disconnected meanwhile
+        # found nothing to clean up, so its claim is rolled back here instead.
+        if not sio.manager.is_connected(sid, "/"):
+            await remove_active_user(uid)
             return
-        add_active_user(uid, sid, username, email)
-    
-    try:
-        # Create a matchmaking entry
-        matchmaking_entry = {
-            "username": username,
-            "email": email,
-            "uid": uid,
-            "time_limit": 15,  # Fixed 15 minutes
-            "rounds": 1,  # Fixed 1 round
-            "difficulties": difficulties,
-            "timestamp": time.time()
-        }
-        
-        async with matchmaking_lock:
-            # Add player to matchmaking queue
-            matchmaking_queue[sid] = matchmaking_entry
-            
-            # Check if there are at least 2 players in queue
-            if len(matchmaking_queue) >= 2:
-                # Get the first two players
-                players = list(matchmaking_queue.items())[:2]
-                player1_sid, player1_data = players[0]
-                player2_sid, player2_data = players[1]
-                
-                # Remove these players from queue
-                del matchmaking_queue[player1_sid]
-                del matchmaking_queue[player2_sid]
-                
-                # Create a new party
-                party_code = generate_party_code()
-                player1 = Player(player1_data["username"], False, "", "", 0, 0, None)
-                player2 = Player(player2_data["username"], False, "", "", 0, 0, None)
-                
-                party = Party(
-                    player1_sid,
-                    {player1_sid: player1, player2_sid: player2},
-                    None,
-                    "waiting",
-                    15,  # Fixed 15 minutes
-                    1,  # Fixed 1 round
-                    0,
-                    difficulties,  # Fixed difficulties
-                    0,
-                    0
-                )
-                parties[party_code] = party
-                
-                # Add both players to the party room
-                await sio.enter_room(player1_sid, party_code)
-                await sio.enter_room(player2_sid, party_code)
-                
-                # Notify both players with correct player list
-                player_usernames = [player1_data["username"], player2_data["username"]]
-                player_data1 = PlayerData(player1_data["username"], party_code, player_usernames)
-                player_data2 = PlayerData(player2_data["username"], party_code, player_usernames)
-                
-                await sio.emit("player_joined", asdict(player_data1), to=player1_sid)
-                await sio.emit("player_joined", asdict(player_data2), to=player2_sid)
-                
-                # Start the game
-                await start_game(player1_sid, {
-                    "party_code": party_code,
-                    "time_limit": 15,  # Fixed 15 minutes
-                    "rounds": 1,  # Fixed 1 round
-                    "easy": True,
-                    "medium": True,
-                    "hard": True
-                }, difficulties)
-    except Exception as e:
-        # If anything goes wrong, remove the user from active set
-        async with user_lock:
-            remove_active_user(uid)
-        raise e
+
+        # Paired by the matchmaking loop on its next tick
+        matchmaking.add(QueueEntry(sid, uid, username, email, rating, time.monotonic()))
+
+
+async def start_match(player1_data: QueueEntry, player2_data: QueueEntry) -> None:
+    difficulties = [True, True, True]  # Fixed difficulties - all enabled
+    player1_sid, player2_sid = player1_data.sid, player2_data.sid
+
+    # Create a new party
+    party_code = await allocate_party_code()
+    player1 = Player(player1_data.username, False, "", "", 0, 0, None)
+    player2 = Player(player2_data.username, False, "", "", 0, 0, None)
+
+    party = Party(
+        player1_sid,
+        {player1_sid: player1, player2_sid: player2},
+        None,
+        "waiting",
+        15,  # Fixed 15 minutes
+        1,  # Fixed 1 round
+        0,
+        difficulties,  # Fixed difficulties
+        0,
+        0,
+        ranked=True
+    )
+    parties[party_code] = party
+    sessions.join_party(player1_sid, party_code)
+    sessions.join_party(player2_sid, party_code)
+
+    # Add both players to the party room
+    await sio.enter_room(player1_sid, party_code)
+    await sio.enter_room(player2_sid, party_code)
+
+    # Notify both players with correct player list
+    player_usernames = [player1_data.username, player2_data.username]
+    player_data1 = PlayerData(player1_data.username, party_code, player_usernames)
+    player_data2 = PlayerData(player2_data.username, party_code, player_usernames)
+
+    await sio.emit("player_joined", payload(player_data1), to=player1_sid)
+    await sio.emit("player_joined", payload(player_data2), to=player2_sid)
+
+    # Start the game
+    await start_game(player1_sid, {
+        "party_code": party_code,
+        "time_limit": 15,  # Fixed 15 minutes
+        "rounds": 1,  # Fixed 1 round
+        "easy": True,
+        "medium": True,
+        "hard": True
+    }, difficulties)
+
+
+async def run_matchmaking() -> None:
+    """Pair the whole queue once per tick instead of on every join."""
+    while True:
+        await asyncio.sleep(matchmaking_tick)
+        for player1_data, player2_data in matchmaking.match(time.monotonic()):
+            try:
+                await start_match(player1_data, player2_data)
+            except Exception as e:
+                logger.warning("Failed to start match for %s and %s: %s", player1_data.uid, player2_data.uid, e)
+                async with user_lock:
+                    await remove_active_user(player1_data.uid)
+                    await remove_active_user(player2_data.uid)
+
+
+@app.on_event("startup")
+async def start_sandbox_pool() -> None:
+    if code_execution_url == "":
+        await sandbox_pool.start()
+    else:
+        executor.start()
+
+
+@app.on_event("startup")
+async def start_matchmaking_loop() -> None:
+    global matchmaking_task
+    matchmaking_task = asyncio.create_task(run_matchmaking())
+
+
+@app.on_event("shutdown")
+async def stop_sandbox_pool() -> None:
+    await sandbox_pool.close()
+    if executor:
+        await executor.close()
+
+
+@app.on_event("shutdown")
+async def stop_matchmaking_loop() -> None:
+    if matchmaking_task:
+        matchmaking_task.cancel()
+
+
+@app.on_event("startup")
+async def start_timers() -> None:
+    timers.start()
+
+
+@app.on_event("startup")
+async def start_loop_lag_watch() -> None:
+    global loop_lag_task
+    loop_lag_task = asyncio.create_task(watch_loop_lag())
+
+
+@app.on_event("shutdown")
+async def stop_timers() -> None:
+    timers.stop()
+    if loop_lag_task:
+        loop_lag_task.cancel()
+
+
+@app.on_event("startup")
+async def start_lease_renewal() -> None:
+    global lease_task
+    lease_task = asyncio.create_task(renew_leases())
+
+
+@app.on_event("shutdown")
+async def release_leases() -> None:
+    if lease_task:
+        lease_task.cancel()
+    for party_code in list(parties):
+        await state.release(f"party:{party_code}", node_id)
+    for uid, user in list(sessions.users.items()):
+        await state.release(f"user:{uid}", user["sid"])
+    await state.close()
 
 
 @app.get("/")
@@ -845,74 +1067,40 @@ async def read_root():
     return JSONResponse({"message": "Server is running"})
 
 
+@app.get("/stats/submission-cache")
+async def submission_cache_stats():
+    return JSONResponse(submission_cache.stats())
+
+
+@app.get("/stats/executors")
+async def executor_stats():
+    return JSONResponse(executor.stats() if executor else {"endpoints": []})
+
+
+@app.get("/parties/{party_code}/node")
+async def party_node(party_code: str):
+    owner = await state.owner(f"party:{party_code}")
+    if owner is None:
+        raise HTTPException(status_code=404, detail="Party not found")
+    return JSONResponse({"node": owner})
+
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/stats/matchmaking")
+async def matchmaking_stats():
+    return JSONResponse(matchmaking.stats(time.monotonic()))
+
+
 async def cleanup_empty_party(party_code: str) -> None:
     """Clean up a party and its users if it's empty"""
     if party_code in parties and not parties[party_code].players:
-        print(f"Cleaning up empty party: {party_code}")
-        del parties[party_code]
-
-
-# Ladder endpoints
-@app.get("/ladder")
-async def get_ladder():
-    try:
-        db = SessionLocal()
-        try:
-            # Get all users ordered by total score
-            users = get_all_user_ranks(db)
-            
-            entries = []
-            for i, user in enumerate(users, 1):
-                entries.append({
-                    "rank": i,
-                    "username": user.username,
-                    "total_score": user.total_score,
-                    "games_played": user.games_played,
-                    "games_won": user.games_won
-                })
-            
-            return {"entries": entries}
-        finally:
-            db.close()
-    except Exception as e:
-        print(f"Error in get_ladder: {str(e)}")
-        raise HTTPException(status_code=500, detail="Internal server error")
+        logger.info("Cleaning up empty party: %s", party_code)
+        await remove_party(party_code)
 
-@app.get("/ladder/user/{user_id}")
-async def get_user_ladder_info(user_id: str):
-    try:
-        db = SessionLocal()
-        try:
-            # Get user info
-            user = get_user_rank(db, user_id)
-            
-            if not user:
-                # If user doesn't exist, create them
-                if user_id in active_users:
-                    username = active_users[user_id]["username"]
-                    create_user_if_not_exists(user_id, username)
-                    # Fetch the newly created user
-                    user = get_user_rank(db, user_id)
-                else:
-                    raise HTTPException(status_code=404, detail="User not found")
-            
-            # Get user's rank
-            rank = db.query(UserRank).filter(UserRank.total_score > user.total_score).count() + 1
-            
-            return {
-                "rank": rank,
-                "username": user.username,
-                "total_score": user.total_score,
-                "games_played": user.games_played,
-                "games_won": user.games_won
-            }
-        finally:
-            db.close()
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"Error in get_user_ladder_info: {str(e)}")
-        raise HTTPException(status_code=500, detail="Internal server error")
 
 if __name__ == "__main__":
     uvicorn.run("src.main:socket_app", host="0.0.0.0", port=int(port))
@@ -0,0 +1,125 @@
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class QueueEntry:
+    sid: str
+    uid: str
+    username: str
+    email: str
+    rating: float
+    joined: float  # time.monotonic() when the player queued
+    bucket: int = field(default=0, compare=False)
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class MatchmakingQueue:
+    """Players waiting for a ranked match, bucketed by rating.
+
+    A player only accepts opponents within a rating window that starts at `base_window`
+    and widens by `window_growth` per second waited, up to `max_window`. `match` is called
+    from a periodic tick and pairs everyone it can in one pass, oldest players first.
+    Every method runs without awaiting, so on the event loop each call is atomic.
+    """
+
+    def __init__(self, bucket_width: float = 100, base_window: float = 100, window_growth: float = 25, max_window: float = math.inf, history: int = 1024):
+        self.bucket_width = bucket_width
+        self.base_window = base_window
+        self.window_growth = window_growth
+        self.max_window = max_window
+        # sid -> entry, in join order; each bucket is also a join-ordered dict
+        self.entries: dict[str, QueueEntry] = {}
+        self.buckets: dict[int, dict[str, QueueEntry]] = {}
+        # Wait times of recently matched players, for percentiles
+        self.waits: deque[float] = deque(maxlen=history)
+        self.matched = 0
+
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+    def __contains__(self, sid: str) -> bool:
+        return sid in self.entries
+
+
+    def bucket(self, rating: float) -> int:
+        return int(rating // self.bucket_width)
+
+
+    def add(self, entry: QueueEntry) -> None:
+        self.remove(entry.sid)
+        entry.bucket = self.bucket(entry.rating)
+        self.entries[entry.sid] = entry
+        self.buckets.setdefault(entry.bucket, {})[entry.sid] = entry
+
+
+    def remove(self, sid: str) -> Optional[QueueEntry]:
+        entry = self.entries.pop(sid, None)
+        if entry is None:
+            return None
+        bucket = self.buckets[entry.bucket]
+        del bucket[sid]
+        if not bucket:
+            del self.buckets[entry.bucket]
+        return entry
+
+
+    def window(self, entry: QueueEntry, now: float) -> float:
+        return min(self.max_window, self.base_window + self.window_growth * (now - entry.joined))
+
+
+    def find_opponent(self, entry: QueueEntry, now: float) -> Optional[QueueEntry]:
+        """Longest-waiting acceptable player in the nearest bucket, searching outward.
+
+        Bucket granularity bounds how far from the closest rating this can land, and
+        taking the oldest player in a bucket keeps each search close to O(1).
+        """
+        window = self.window(entry, now)
+        reach = math.ceil(window / self.bucket_width)
+        for distance in range(reach + 1):
+            for index in (entry.bucket - distance, entry.bucket + distance) if distance else (entry.bucket,):
+                for other in self.buckets.get(index, {}).values():
+                    if other.uid == entry.uid:
+                        continue
+                    gap = abs(other.rating - entry.rating)
+                    if gap <= window and gap <= self.window(other, now):
+                        return other
+        return None
+
+
+    def match(self, now: float) -> list[tuple[QueueEntry, QueueEntry]]:
+        pairs: list[tuple[QueueEntry, QueueEntry]] = []
+        for entry in list(self.entries.values()):
+            if entry.sid not in self.entries:
+                continue
+            opponent = self.find_opponent(entry, now)
+            if opponent is None:
+                continue
+            self.remove(entry.sid)
+            self.remove(opponent.sid)
+            self.waits.append(now - entry.joined)
+            self.waits.append(now - opponent.joined)
+            self.matched += 2
+            pairs.append((entry, opponent))
+        return pairs
+
+
+    def stats(self, now: float) -> dict:
+        waiting = sorted(now - entry.joined for entry in self.entries.values())
+        matched = sorted(self.waits)
+        return {
+            "depth": len(self.entries),
+            "buckets": {str(index * self.bucket_width): len(bucket) for index, bucket in sorted(self.buckets.items())},
+            "matched": self.matched,
+            "waiting_seconds": {"p50": percentile(waiting, 0.5), "p90": percentile(waiting, 0.9), "max": waiting[-1] if waiting else 0.0},
+            "matched_wait_seconds": {"p50": percentile(matched, 0.5), "p90": percentile(matched, 0.9), "p99": percentile(matched, 0.99)}
+        }
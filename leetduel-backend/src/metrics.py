@@ -0,0 +1,151 @@
+"""In-process metrics rendered in the Prometheus text format for /metrics.
+
+Every update is a few dict/list operations with no awaits, so the socket handlers
+can record on the event loop and the DB threads can record under a lock.
+"""
+import asyncio
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [per-bucket counts..., +Inf count], sum
+        self.counts: dict[tuple[str, ...], list[int]] = {}
+        self.sums: dict[tuple[str, ...], float] = {}
+        self.lock = threading.Lock()
+
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self.lock:
+            counts = self.counts.get(labels)
+            if counts is None:
+                counts = self.counts[labels] = [0] * (len(self.buckets) + 1)
+                self.sums[labels] = 0.0
+            counts[bisect_left(self.buckets, value)] += 1
+            self.sums[labels] += value
+
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = [(labels, list(counts), self.sums[labels]) for labels, counts in sorted(self.counts.items())]
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                bucket_labels = format_labels(self.labels, labels, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, labels)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, labels)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Read from a callback at scrape time, so nothing has to keep it up to date."""
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.read = read
+
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {self.read()}"]
+
+
+class Registry:
+
+    def __init__(self):
+        self.metrics: list[Histogram | Gauge] = []
+
+
+    def histogram(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+
+    def gauge(self, name: str, help: str, read: Callable[[], float]) -> Gauge:
+        metric = Gauge(name, help, read)
+        self.metrics.append(metric)
+        return metric
+
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+event_seconds = registry.histogram("leetduel_event_seconds", "Socket.IO event handler latency", ("event",))
+sandbox_wait_seconds = registry.histogram("leetduel_sandbox_wait_seconds", "Time a submission waited for an execution slot")
+sandbox_run_seconds = registry.histogram("leetduel_sandbox_run_seconds", "Time a submission spent executing", ("backend",))
+judge_seconds = registry.histogram("leetduel_check_test_cases_seconds", "Time spent judging sandbox output")
+db_seconds = registry.histogram("leetduel_db_seconds", "Time spent in each crud query", ("query",))
+loop_lag_seconds = registry.histogram("leetduel_event_loop_lag_seconds", "How late the event loop woke a sleeping task", buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5))
+
+
+# Histograms a timed function is already recording into on this thread
+timing = threading.local()
+
+
+def timed(histogram: Histogram) -> Callable:
+    """Decorator recording each call of a sync function under its name.
+
+    Calls made from inside another function timed into the same histogram are left to
+    the outer one, so a crud function built on other crud functions is counted once.
+    """
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            active = timing.__dict__.setdefault("histograms", set())
+            if histogram in active:
+                return fn(*args, **kwargs)
+            active.add(histogram)
+            try:
+                with histogram.time(fn.__name__):
+                    return fn(*args, **kwargs)
+            finally:
+                active.discard(histogram)
+        return wrapper
+    return decorate
+
+
+async def watch_loop_lag(interval: float = 0.5) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        loop_lag_seconds.observe(max(0.0, loop.time() - start - interval))
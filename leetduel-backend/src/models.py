@@ -18,6 +18,8 @@ class Problem(Base):
     function_signature = Column(String)
     any_order = Column(Boolean)
     reports = Column(Integer)
+    cpu_time_limit = Column(Integer, nullable=False, default=2000, server_default="2000")  # CPU milliseconds across all test cases
+    comparator = Column(String, nullable=True)  # exact, any_order, float or linked_list; derived from any_order when unset
 
     def asdata(self) -> ProblemData:
         return ProblemData(
@@ -27,7 +29,10 @@ class Problem(Base):
             cast(str, self.problem_difficulty),
             cast(List[dict[str, str]], self.test_cases),
             cast(bool, self.any_order),
-            cast(int, self.reports)
+            cast(int, self.reports),
+            cast(int, self.cpu_time_limit),
+            cast(str, self.comparator or ""),
+            cast(int, self.problem_id)
         )
 
 
@@ -0,0 +1,202 @@
+import threading
+from bisect import bisect_left, insort
+from typing import Any, Callable, Iterable
+
+
+# Sorts after every real uid, so (score, MAX_UID) bounds all entries with that score.
+MAX_UID = "\U0010ffff"
+
+
+class FenwickTree:
+    """Counts per block with O(log n) prefix sums and order-statistic search."""
+
+    def __init__(self, counts: list[int]):
+        self.size = len(counts)
+        self.tree = [0] + list(counts)
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[i]
+
+
+    def add(self, index: int, delta: int) -> None:
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+
+    def prefix(self, index: int) -> int:
+        """Number of entries in blocks 0..index."""
+        total = 0
+        i = index + 1
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+
+    def find(self, k: int) -> int:
+        """Block holding the k-th smallest entry (1-based)."""
+        position = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            nxt = position + step
+            if nxt <= self.size and self.tree[nxt] < k:
+                position = nxt
+                k -= self.tree[nxt]
+            step >>= 1
+        return position
+
+
+class RankIndex:
+    """Order-statistics over ladder scores: rank of a user and top-k pages in O(log n).
+
+    Every (score, uid) pair sits in one ascending list cut into blocks of about
+    `block_size`; a Fenwick tree over the block lengths finds the block holding the k-th
+    entry and counts the entries before a block. Memory and rebuilds scale with the number
+    of players, whatever the scores are, and ties resolve by bisection on uid.
+    """
+
+    def __init__(self, block_size: int = 512):
+        self.block_size = block_size
+        self.scores: dict[str, float] = {}
+        self.blocks: list[list[tuple[float, str]]] = []
+        # Last (largest) entry of each block, for locating an entry's block by bisection
+        self.maxes: list[tuple[float, str]] = []
+        self.counts = FenwickTree([])
+        self.loaded = False
+        # Bumped on every write so cached ladder pages know when they are stale.
+        self.version = 0
+        # Database (row count, newest updated_at) the index was last brought up to, and when it was checked
+        self.synced: tuple[int, Any] | None = None
+        self.synced_at = 0.0
+        self.lock = threading.RLock()
+
+
+    def reindex(self) -> None:
+        self.maxes = [block[-1] for block in self.blocks]
+        self.counts = FenwickTree([len(block) for block in self.blocks])
+
+
+    def load(self, entries: Iterable[tuple[str, float]]) -> None:
+        with self.lock:
+            self.scores = {uid: float(score or 0) for uid, score in entries}
+            ordered = sorted((score, uid) for uid, score in self.scores.items())
+            self.blocks = [ordered[i:i + self.block_size] for i in range(0, len(ordered), self.block_size)]
+            self.reindex()
+            self.loaded = True
+            self.version += 1
+
+
+    def insert(self, entry: tuple[float, str]) -> None:
+        if not self.blocks:
+            self.blocks = [[entry]]
+            self.reindex()
+            return
+        index = min(bisect_left(self.maxes, entry), len(self.blocks) - 1)
+        block = self.blocks[index]
+        insort(block, entry)
+        self.maxes[index] = block[-1]
+        if len(block) > 2 * self.block_size:
+            # Splits are rare enough that rebuilding the tree over blocks is cheap
+            self.blocks[index:index + 1] = [block[:self.block_size], block[self.block_size:]]
+            self.reindex()
+        else:
+            self.counts.add(index, 1)
+
+
+    def delete(self, entry: tuple[float, str]) -> None:
+        index = bisect_left(self.maxes, entry)
+        block = self.blocks[index]
+        del block[bisect_left(block, entry)]
+        if block:
+            self.maxes[index] = block[-1]
+            self.counts.add(index, -1)
+        else:
+            del self.blocks[index]
+            self.reindex()
+
+
+    def remove(self, uid: str) -> None:
+        with self.lock:
+            score = self.scores.pop(uid, None)
+            if score is not None:
+                self.delete((score, uid))
+
+
+    def update(self, uid: str, score: float) -> None:
+        with self.lock:
+            self.version += 1
+            score = float(score or 0)
+            if self.scores.get(uid) == score:
+                return
+            self.remove(uid)
+            self.insert((score, uid))
+            self.scores[uid] = score
+
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+
+    def position(self, entry: tuple[float, str]) -> int:
+        """Number of entries ordered before `entry`."""
+        index = bisect_left(self.maxes, entry)
+        if index == len(self.blocks):
+            return len(self.scores)
+        before = self.counts.prefix(index - 1) if index > 0 else 0
+        return before + bisect_left(self.blocks[index], entry)
+
+
+    def count_above(self, score: float) -> int:
+        return len(self.scores) - self.position((score, MAX_UID))
+
+
+    def rank(self, uid: str) -> int | None:
+        """1-based position, counting only strictly higher scores like the ladder always has."""
+        with self.lock:
+            score = self.scores.get(uid)
+            if score is None:
+                return None
+            return self.count_above(score) + 1
+
+
+    def top(self, limit: int, offset: int = 0) -> list[tuple[str, float]]:
+        """Highest scores first, ties broken by uid descending."""
+        with self.lock:
+            total = len(self.scores)
+            if offset >= total or limit <= 0:
+                return []
+
+            page: list[tuple[str, float]] = []
+            # The (offset + 1)-th largest entry is the (total - offset)-th smallest.
+            k = total - offset
+            index = self.counts.find(k)
+            position = k - (self.counts.prefix(index - 1) if index > 0 else 0) - 1
+            while index >= 0:
+                block = self.blocks[index]
+                for score, uid in reversed(block[:position + 1]):
+                    page.append((uid, score))
+                    if len(page) == limit:
+                        return page
+                index -= 1
+                position = len(self.blocks[index]) - 1 if index >= 0 else 0
+            return page
+
+
+    def offset_after(self, score: float, uid: str) -> int:
+        """Number of entries ranked at or above (score, uid), i.e. where a keyset page after it starts."""
+        with self.lock:
+            return len(self.scores) - self.position((score, uid))
+
+
+    def ensure_loaded(self, fetch: Callable[[], Iterable[tuple[str, float]]]) -> None:
+        if self.loaded:
+            return
+        with self.lock:
+            if not self.loaded:
+                self.load(fetch())
+
+
+rank_index = RankIndex()
@@ -0,0 +1,111 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable
+
+from src.config import submission_cache_size, submission_cache_ttl
+from src.dataclass import SubmissionData
+from src.scheduler import RoundEnded
+
+
+def normalize_code(code: str) -> str:
+    return "\n".join(line.rstrip() for line in code.strip().splitlines())
+
+
+class SubmissionCache:
+    """Content-addressed cache of judged submissions, keyed by problem and normalized code."""
+
+    def __init__(self, size: int, ttl: float):
+        self.size = size
+        self.ttl = ttl
+        self.entries: OrderedDict[tuple, tuple[float, float, SubmissionData]] = OrderedDict()
+        self.in_flight: dict[tuple, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+
+    def key(self, problem_key: tuple, code: str, stop_on_failure: bool) -> tuple:
+        digest = hashlib.sha256(normalize_code(code).encode()).hexdigest()
+        return (problem_key, stop_on_failure, digest)
+
+
+    def get(self, key: tuple) -> SubmissionData | None:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        expires, run_time, submission = entry
+        if expires < time.monotonic():
+            del self.entries[key]
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        self.saved_seconds += run_time
+        return submission
+
+
+    def put(self, key: tuple, submission: SubmissionData, run_time: float) -> None:
+        self.entries[key] = (time.monotonic() + self.ttl, run_time, submission)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+
+    async def get_or_run(self, key: tuple, run: Callable[[], Awaitable[SubmissionData]], owner: Hashable = None) -> SubmissionData:
+        """Cached result for `key`, or `run()`'s.
+
+        A double-click from the same `owner` waits on the run already in flight. Only a
+        judged result is shared with it: a rejection, timeout or error belonged to the
+        other run, so the waiter then runs its own, unless the round ended, which ends
+        the waiter's turn too.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        flight = (key, owner)
+        task = self.in_flight.get(flight)
+        if task is not None:
+            try:
+                submission = await asyncio.shield(task)
+            except RoundEnded:
+                raise
+            except Exception:
+                submission = None
+            if submission is not None and submission.message is None:
+                self.hits += 1
+                return submission
+            return await self.get_or_run(key, run, owner)
+
+        self.misses += 1
+        task = asyncio.ensure_future(self.run_and_store(key, flight, run))
+        self.in_flight[flight] = task
+        return await asyncio.shield(task)
+
+
+    async def run_and_store(self, key: tuple, flight: tuple, run: Callable[[], Awaitable[SubmissionData]]) -> SubmissionData:
+        start = time.perf_counter()
+        try:
+            submission = await run()
+        finally:
+            self.in_flight.pop(flight, None)
+
+        # Only judged results are deterministic; errors like rate limits or timeouts are retried.
+        if submission.message is None:
+            self.put(key, submission, time.perf_counter() - start)
+        return submission
+
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.entries),
+            "saved_sandbox_seconds": round(self.saved_seconds, 3)
+        }
+
+
+submission_cache = SubmissionCache(submission_cache_size, submission_cache_ttl)
@@ -1,12 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Optional
+import base64
+import hashlib
+import json
+import threading
 from ..database import SessionLocal
-from ..crud import get_top_players, get_user_rank, get_user_rank_position
+from ..crud import get_ladder_page, sync_rank_index, get_user_rank, get_user_rank_position
 from ..dataclass import LadderEntry, LadderResponse
 
 router = APIRouter()
 
+MAX_PAGE_SIZE = 100
+SNAPSHOT_CACHE_SIZE = 256
+
+# Rendered pages for the current ladder version; a rating change made here drops them at
+# once, one made by another worker once sync_rank_index next checks the database.
+snapshot_version: Optional[tuple] = None
+snapshots: dict[tuple[Optional[str], int], tuple[str, dict]] = {}
+snapshot_lock = threading.Lock()
+
 def get_db():
     db = SessionLocal()
     try:
@@ -14,12 +29,30 @@ def get_db():
     finally:
         db.close()
 
-@router.get("/ladder", response_model=LadderResponse)
-def get_ladder(limit: int = 100, db: Session = Depends(get_db)):
-    players = get_top_players(db, limit)
+def encode_cursor(score: float, uid: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([score, uid]).encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[float, str]:
+    try:
+        score, uid = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(score), str(uid)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match holds "*" or a comma-separated list of tags, compared weakly"""
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+def build_page(db: Session, cursor: Optional[str], limit: int) -> dict:
+    after = decode_cursor(cursor) if cursor else None
+    offset, players = get_ladder_page(db, limit, after)
     entries = [
         LadderEntry(
-            rank=i+1,
+            rank=offset + i + 1,
             username=player.username,
             total_score=player.total_score,
             games_played=player.games_played,
@@ -27,14 +60,45 @@ def get_ladder(limit: int = 100, db: Session = Depends(get_db)):
         )
         for i, player in enumerate(players)
     ]
-    return LadderResponse(entries=entries)
+    next_cursor = encode_cursor(players[-1].total_score, players[-1].uid) if len(players) == limit else None
+    return jsonable_encoder(LadderResponse(entries=entries, next_cursor=next_cursor))
+
+@router.get("/ladder", response_model=LadderResponse)
+def get_ladder(request: Request, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    global snapshot_version
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    key = (cursor, limit)
+
+    version = sync_rank_index(db)
+
+    with snapshot_lock:
+        if version != snapshot_version:
+            snapshots.clear()
+            snapshot_version = version
+        snapshot = snapshots.get(key)
+
+    if snapshot is None:
+        body = build_page(db, cursor, limit)
+        etag = '"' + hashlib.sha1(json.dumps(body, sort_keys=True).encode()).hexdigest() + '"'
+        snapshot = (etag, body)
+        with snapshot_lock:
+            if version == snapshot_version:
+                if len(snapshots) >= SNAPSHOT_CACHE_SIZE:
+                    snapshots.clear()
+                snapshots[key] = snapshot
+
+    etag, body = snapshot
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(body, headers=headers)
 
 @router.get("/ladder/user/{uid}")
 def get_user_ladder_info(uid: str, db: Session = Depends(get_db)):
     user_rank = get_user_rank(db, uid)
     if not user_rank:
         raise HTTPException(status_code=404, detail="User not found")
-    
+
     position = get_user_rank_position(db, uid)
     return {
         "rank": position,
@@ -42,4 +106,4 @@ def get_user_ladder_info(uid: str, db: Session = Depends(get_db)):
         "total_score": user_rank.total_score,
         "games_played": user_rank.games_played,
         "games_won": user_rank.games_won
-    } 
\ No newline at end of file
+    }
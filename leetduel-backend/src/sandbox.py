@@ -0,0 +1,116 @@
+import asyncio
+import json
+import os
+import signal
+import sys
+from typing import Awaitable, Callable, Optional
+
+from src.sandbox_worker import HEADER, encode_frame
+
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+class SandboxWorker:
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        # Process group of the job's child while one is running
+        self.child: int | None = None
+
+
+    @classmethod
+    async def spawn(cls) -> "SandboxWorker":
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "src.sandbox_worker",
+            cwd=backend_dir,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE
+        )
+        return cls(process)
+
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+
+    async def run(self, job: dict, on_output: Optional[Callable[[str], Awaitable[None]]] = None) -> dict:
+        assert self.process.stdin and self.process.stdout
+        self.process.stdin.write(encode_frame(dict(job, stream=on_output is not None)))
+        await self.process.stdin.drain()
+
+        while True:
+            header = await self.process.stdout.readexactly(HEADER.size)
+            (size,) = HEADER.unpack(header)
+            frame = json.loads(await self.process.stdout.readexactly(size))
+            if "pid" in frame:
+                self.child = frame["pid"]
+            elif "chunk" in frame:
+                await on_output(frame["chunk"])
+            else:
+                self.child = None
+                return frame
+
+
+    async def close(self) -> None:
+        # The child runs in its own process group, so killing the worker alone would orphan it
+        if self.child is not None:
+            try:
+                os.killpg(self.child, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+            self.child = None
+        if self.alive:
+            self.process.kill()
+        await self.process.wait()
+
+
+class SandboxPool:
+    """Pool of pre-started worker interpreters that fork one child per job."""
+
+    def __init__(self, size: int, memory_limit: int):
+        self.size = size
+        self.memory_limit = memory_limit
+        self.idle: asyncio.Queue[SandboxWorker] = asyncio.Queue()
+        self.started = False
+        self.start_lock = asyncio.Lock()
+
+
+    async def start(self) -> None:
+        async with self.start_lock:
+            if self.started:
+                return
+            workers = await asyncio.gather(*(SandboxWorker.spawn() for _ in range(self.size)))
+            for worker in workers:
+                self.idle.put_nowait(worker)
+            self.started = True
+
+
+    async def run(self, code: str, stdinput: str, timeout: int, on_output: Optional[Callable[[str], Awaitable[None]]] = None) -> dict[str, str]:
+        """Run `code`; `on_output` is awaited with its stdout piece by piece while it runs."""
+        await self.start()
+        worker = await self.idle.get()
+        healthy = False
+        try:
+            job = {"code": code, "stdinput": stdinput, "timeout": timeout, "memory_limit": self.memory_limit}
+            # The worker kills the child at the deadline itself; this only guards against a wedged worker.
+            result = await asyncio.wait_for(worker.run(job, on_output), timeout + 5)
+            healthy = True
+        finally:
+            if healthy and worker.alive:
+                self.idle.put_nowait(worker)
+            else:
+                await worker.close()
+                self.idle.put_nowait(await SandboxWorker.spawn())
+
+        if result["timed_out"]:
+            raise asyncio.TimeoutError()
+
+        return {"stderr": result["stderr"], "stdout": result["stdout"]}
+
+
+    async def close(self) -> None:
+        while not self.idle.empty():
+            await self.idle.get_nowait().close()
+        self.started = False
@@ -0,0 +1,183 @@
+"""Warm sandbox worker, started by src.sandbox.SandboxPool.
+
+The worker imports the harness modules and the ListNode prelude once, then
+forks a fresh child per job so user code never sees state from a previous
+submission. Jobs and results are length-prefixed JSON frames on stdin/stdout.
+Every job is first answered with {"pid": ...} naming the child, whose process
+group the pool kills if it gives up on the job; a job with "stream" set also
+gets {"chunk": ...} frames carrying the child's stdout as it is written,
+ahead of the result frame.
+"""
+import builtins
+import codecs
+import ctypes
+import io
+import json
+import os
+import resource
+import selectors
+import signal
+import struct
+import sys
+import time
+import traceback
+
+# Pre-imported so the forked children get them for free.
+import collections
+import functools
+import heapq
+import itertools
+import math
+import typing
+
+from src.classes.ListNode import ListNode, linkedList
+
+
+HEADER = struct.Struct(">I")
+PR_SET_PDEATHSIG = 1
+
+
+def encode_frame(payload: dict) -> bytes:
+    body = json.dumps(payload).encode()
+    return HEADER.pack(len(body)) + body
+
+
+def read_frame(stream: typing.BinaryIO) -> dict | None:
+    header = stream.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+    (size,) = HEADER.unpack(header)
+    return json.loads(stream.read(size))
+
+
+def set_limits(cpu_seconds: int, memory_mb: int) -> None:
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    if memory_mb > 0:
+        memory = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+
+
+def die_with_parent(parent: int) -> None:
+    # Covers the worker dying without the pool killing the child's group first
+    if sys.platform.startswith("linux"):
+        ctypes.CDLL(None).prctl(PR_SET_PDEATHSIG, signal.SIGKILL)
+    if os.getppid() != parent:
+        os._exit(1)
+
+
+def kill_group(pgid: int) -> None:
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def run_child(job: dict, out_w: int, err_w: int, parent: int) -> None:
+    os.setpgid(0, 0)
+    die_with_parent(parent)
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(out_w, 1)
+    os.dup2(err_w, 2)
+
+    sys.stdin = io.StringIO(job["stdinput"])
+    sys.stdout = io.TextIOWrapper(os.fdopen(1, "wb", closefd=False), write_through=True)
+    sys.stderr = io.TextIOWrapper(os.fdopen(2, "wb", closefd=False), write_through=True)
+
+    exit_code = 0
+    try:
+        set_limits(job["timeout"], job["memory_limit"])
+        namespace = {"__name__": "__main__", "__builtins__": builtins, "ListNode": ListNode, "linkedList": linkedList}
+        exec(compile(job["code"], "<string>", "exec"), namespace)
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else 1
+    except BaseException as e:
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        exit_code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(exit_code)
+
+
+def run_job(job: dict, on_stdout: typing.Callable[[str], None] | None = None, on_start: typing.Callable[[int], None] | None = None) -> dict:
+    out_r, out_w = os.pipe()
+    err_r, err_w = os.pipe()
+
+    parent = os.getpid()
+    pid = os.fork()
+    if pid == 0:
+        os.close(out_r)
+        os.close(err_r)
+        run_child(job, out_w, err_w, parent)
+
+    try:
+        os.setpgid(pid, pid)
+    except OSError:
+        pass
+    if on_start:
+        on_start(pid)
+    os.close(out_w)
+    os.close(err_w)
+
+    chunks: dict[int, list[bytes]] = {out_r: [], err_r: []}
+    # Keeps a character split across two reads whole
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    deadline = time.monotonic() + job["timeout"]
+    timed_out = False
+
+    with selectors.DefaultSelector() as selector:
+        selector.register(out_r, selectors.EVENT_READ)
+        selector.register(err_r, selectors.EVENT_READ)
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timed_out = True
+                break
+            for key, _ in selector.select(remaining):
+                data = os.read(key.fd, 65536)
+                if data:
+                    chunks[key.fd].append(data)
+                    if on_stdout and key.fd == out_r:
+                        on_stdout(decoder.decode(data))
+                else:
+                    selector.unregister(key.fd)
+
+    if timed_out:
+        kill_group(pid)
+    os.waitpid(pid, 0)
+    # Whatever the submission forked is still in its group; it must not outlive the job
+    kill_group(pid)
+    os.close(out_r)
+    os.close(err_r)
+
+    return {
+        "stdout": b"".join(chunks[out_r]).decode(errors="replace"),
+        "stderr": b"".join(chunks[err_r]).decode(errors="replace"),
+        "timed_out": timed_out
+    }
+
+
+def main() -> None:
+    reader = sys.stdin.buffer
+    writer = sys.stdout.buffer
+
+    def send_chunk(text: str) -> None:
+        if text:
+            writer.write(encode_frame({"chunk": text}))
+            writer.flush()
+
+    def send_pid(pid: int) -> None:
+        writer.write(encode_frame({"pid": pid}))
+        writer.flush()
+
+    while True:
+        job = read_frame(reader)
+        if job is None:
+            return
+        writer.write(encode_frame(run_job(job, send_chunk if job.get("stream") else None, send_pid)))
+        writer.flush()
+
+
+if __name__ == "__main__":
+    main()
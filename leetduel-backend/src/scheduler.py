@@ -0,0 +1,214 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+
+class SubmissionRejected(Exception):
+    """The submission was not run: rate limited, queue full or the round ended first."""
+
+
+class RoundEnded(SubmissionRejected):
+    """The party's round ended before the submission was judged; running it again can't help."""
+
+
+@dataclass
+class Submitter:
+    # Stable across reconnects (uid, or party and username), so the bucket follows the person
+    player: str
+    party: str
+    ranked: bool = False
+    # Told the 1-based queue position when the submission has to wait
+    on_queued: Optional[Callable[[int], Awaitable[None]]] = None
+
+
+@dataclass
+class Job:
+    submitter: Submitter
+    run: Callable[[], Awaitable[Any]]
+    future: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+
+class TokenBucket:
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+
+    def refill(self, now: float) -> None:
+        # `now` may have been read just before this bucket was created
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+
+    def take(self, now: float) -> bool:
+        self.refill(now)
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+    def wait_time(self, now: float) -> float:
+        self.refill(now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class SubmissionScheduler:
+    """Decides which submission gets the next execution slot.
+
+    Each player has a token bucket. Waiting submissions are grouped per party and
+    served round-robin across parties, FIFO within one, and ranked parties are always
+    served before casual ones. At most `max_queued` wait at once; past that, and past a
+    player's bucket, submissions are rejected straight away instead of piling up.
+    Buckets are only dropped once they have refilled, so leaving doesn't reset one.
+    """
+
+    def __init__(self, slots: int, max_queued: int, rate: float, burst: float):
+        self.slots = slots
+        self.max_queued = max_queued
+        self.rate = rate
+        self.burst = burst
+        self.buckets: dict[str, TokenBucket] = {}
+        # ranked first; party -> waiting jobs, in round-robin order
+        self.queues: dict[bool, OrderedDict[str, deque[Job]]] = {True: OrderedDict(), False: OrderedDict()}
+        self.queued = 0
+        # Running jobs by their task; holding the task also keeps it from being collected
+        self.tasks: dict[asyncio.Task, Job] = {}
+        self.pruned = time.monotonic()
+
+
+    @property
+    def running(self) -> int:
+        return len(self.tasks)
+
+
+    def admit(self, submitter: Submitter) -> None:
+        # A full queue is checked first so turning a player away doesn't also cost them a token
+        if self.queued >= self.max_queued:
+            raise SubmissionRejected("The judge is busy. Please try again in a few seconds.")
+        now = time.monotonic()
+        self.prune(now)
+        bucket = self.buckets.get(submitter.player)
+        if bucket is None:
+            bucket = self.buckets[submitter.player] = TokenBucket(self.rate, self.burst)
+        if not bucket.take(now):
+            raise SubmissionRejected(f"Rate limited! Please wait {math.ceil(bucket.wait_time(now))} seconds and try again.")
+
+
+    def prune(self, now: float) -> None:
+        """Drops buckets that are full again; a fresh one would behave the same."""
+        if now - self.pruned < self.burst / self.rate:
+            return
+        self.pruned = now
+        for player, bucket in list(self.buckets.items()):
+            bucket.refill(now)
+            if bucket.tokens >= bucket.capacity:
+                del self.buckets[player]
+
+
+    async def submit(self, run: Callable[[], Awaitable[Any]], submitter: Optional[Submitter] = None) -> Any:
+        """Run `run()` once a slot is free and this submission's turn comes."""
+        if submitter is None:
+            submitter = Submitter("", "")
+        else:
+            self.admit(submitter)
+
+        job = Job(submitter, run)
+        if self.running < self.slots and self.queued == 0:
+            self.start(job)
+        else:
+            self.queues[submitter.ranked].setdefault(submitter.party, deque()).append(job)
+            self.queued += 1
+            if submitter.on_queued:
+                await submitter.on_queued(self.position(job))
+        return await job.future
+
+
+    def start(self, job: Job) -> None:
+        task = asyncio.create_task(self.execute(job))
+        self.tasks[task] = job
+        task.add_done_callback(self.finished)
+
+
+    def finished(self, task: asyncio.Task) -> None:
+        self.tasks.pop(task, None)
+        self.dispatch()
+
+
+    async def execute(self, job: Job) -> None:
+        try:
+            result = await job.run()
+            if not job.future.done():
+                job.future.set_result(result)
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+
+
+    def next_job(self) -> Optional[Job]:
+        for ranked in (True, False):
+            parties = self.queues[ranked]
+            if not parties:
+                continue
+            party, jobs = next(iter(parties.items()))
+            job = jobs.popleft()
+            # Rotate the party to the back so every party gets a turn
+            del parties[party]
+            if jobs:
+                parties[party] = jobs
+            self.queued -= 1
+            return job
+        return None
+
+
+    def dispatch(self) -> None:
+        while self.running < self.slots:
+            job = self.next_job()
+            if job is None:
+                return
+            self.start(job)
+
+
+    def position(self, job: Job) -> int:
+        """1-based place in the order next_job would serve the current queue."""
+        position = 0
+        for ranked in (True, False):
+            lanes = [list(jobs) for jobs in self.queues[ranked].values()]
+            depth = 0
+            while any(depth < len(lane) for lane in lanes):
+                for lane in lanes:
+                    if depth < len(lane):
+                        position += 1
+                        if lane[depth] is job:
+                            return position
+                depth += 1
+        return position
+
+
+    def cancel_party(self, party: str, reason: str = "The round ended before your submission was judged.") -> None:
+        """Fails the party's waiting submissions and stops the ones already running."""
+        for parties in self.queues.values():
+            jobs = parties.pop(party, None)
+            if not jobs:
+                continue
+            self.queued -= len(jobs)
+            for job in jobs:
+                if not job.future.done():
+                    job.future.set_exception(RoundEnded(reason))
+
+        for task, job in list(self.tasks.items()):
+            if job.submitter.party == party:
+                if not job.future.done():
+                    job.future.set_exception(RoundEnded(reason))
+                task.cancel()
+
+
+    def stats(self) -> dict:
+        return {"running": self.running, "queued": self.queued, "slots": self.slots}
@@ -0,0 +1,56 @@
+"""Socket payloads: cheap message-to-dict conversion and an orjson codec for python-socketio.
+
+The module itself is passed as `json=` to socketio.AsyncServer, which only needs
+`dumps(obj, **kwargs) -> str` and `loads(s, **kwargs)`.
+"""
+import dataclasses
+import functools
+from typing import Any
+
+import orjson
+
+from src.dataclass import ProblemData
+
+
+def problem_payload(problem: ProblemData) -> dict:
+    """What clients see of a problem, built once and cached on the ProblemData.
+
+    Test cases are judged server-side only, so none of them are sent.
+    """
+    if problem.payload is None:
+        problem.payload = {
+            "name": problem.name,
+            "description": problem.description,
+            "function_signature": problem.function_signature,
+            "difficulty": problem.difficulty,
+            "test_cases": []
+        }
+    return problem.payload
+
+
+@functools.cache
+def field_names(cls: type) -> tuple[str, ...]:
+    return tuple(f.name for f in dataclasses.fields(cls))
+
+
+def payload(value: Any) -> Any:
+    """JSON-ready form of a message, like dataclasses.asdict without its deep copies."""
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    if isinstance(value, ProblemData):
+        return problem_payload(value)
+    if isinstance(value, list):
+        return [payload(v) for v in value]
+    if isinstance(value, dict):
+        return {k: payload(v) for k, v in value.items()}
+    return {name: payload(getattr(value, name)) for name in field_names(type(value))}
+
+
+def dumps(obj: Any, **kwargs) -> str:
+    # socketio passes separators=(',', ':'); orjson output is always compact. Dataclasses
+    # go through payload() so a ProblemData handed over directly is still stripped.
+    return orjson.dumps(obj, default=payload, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS).decode()
+
+
+def loads(s: str | bytes, **kwargs) -> Any:
+    return orjson.loads(s)
@@ -0,0 +1,55 @@
+from typing import Optional
+
+
+class SessionRegistry:
+    """Active users and party membership with sid/uid/party indexes kept in step.
+
+    Every method runs without awaiting, so on the event loop each update is atomic.
+    """
+
+    def __init__(self):
+        self.users: dict[str, dict] = {}  # uid -> {"sid", "username", "email"}
+        self.uid_by_sid: dict[str, str] = {}
+        self.party_by_sid: dict[str, str] = {}
+
+
+    def is_active(self, uid: str) -> bool:
+        return uid in self.users
+
+
+    def add_user(self, uid: str, sid: str, username: str, email: str) -> None:
+        self.remove_user(uid)
+        self.users[uid] = {"sid": sid, "username": username, "email": email}
+        self.uid_by_sid[sid] = uid
+
+
+    def remove_user(self, uid: str) -> Optional[dict]:
+        user = self.users.pop(uid, None)
+        if user is not None and self.uid_by_sid.get(user["sid"]) == uid:
+            del self.uid_by_sid[user["sid"]]
+        return user
+
+
+    def user(self, uid: str) -> Optional[dict]:
+        return self.users.get(uid)
+
+
+    def uid_for_sid(self, sid: str) -> Optional[str]:
+        return self.uid_by_sid.get(sid)
+
+
+    def sid_for_uid(self, uid: str) -> Optional[str]:
+        user = self.users.get(uid)
+        return user["sid"] if user else None
+
+
+    def join_party(self, sid: str, party_code: str) -> None:
+        self.party_by_sid[sid] = party_code
+
+
+    def leave_party(self, sid: str) -> None:
+        self.party_by_sid.pop(sid, None)
+
+
+    def party_for_sid(self, sid: str) -> Optional[str]:
+        return self.party_by_sid.get(sid)
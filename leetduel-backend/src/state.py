@@ -0,0 +1,162 @@
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class StateBackend(ABC):
+    """State shared between workers and nodes, as ownership leases.
+
+    Leases give a key (a party, an active user) a single owner until they expire,
+    which is how parties stay pinned to the node that runs their timers.
+    """
+
+    @abstractmethod
+    async def claim(self, key: str, owner: str, ttl: float) -> bool:
+        """Take the lease if it is free or already ours; True if we hold it afterwards."""
+        raise NotImplementedError
+
+
+    @abstractmethod
+    async def renew(self, key: str, owner: str, ttl: float) -> bool:
+        raise NotImplementedError
+
+
+    @abstractmethod
+    async def release(self, key: str, owner: str) -> None:
+        raise NotImplementedError
+
+
+    @abstractmethod
+    async def owner(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+
+    @abstractmethod
+    async def keys(self, prefix: str) -> list[str]:
+        """Every key under `prefix` currently leased by anyone."""
+        raise NotImplementedError
+
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryBackend(StateBackend):
+    """Single-process default: leases with expiry in a dict."""
+
+    def __init__(self):
+        self.values: dict[str, tuple[str, Optional[float]]] = {}
+
+
+    def get(self, key: str) -> Optional[str]:
+        item = self.values.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires is not None and expires <= time.monotonic():
+            del self.values[key]
+            return None
+        return value
+
+
+    def set(self, key: str, value: str, ttl: Optional[float]) -> None:
+        self.values[key] = (value, time.monotonic() + ttl if ttl is not None else None)
+
+
+    async def claim(self, key: str, owner: str, ttl: float) -> bool:
+        current = self.get(key)
+        if current is not None and current != owner:
+            return False
+        self.set(key, owner, ttl)
+        return True
+
+
+    async def renew(self, key: str, owner: str, ttl: float) -> bool:
+        if self.get(key) != owner:
+            return False
+        self.set(key, owner, ttl)
+        return True
+
+
+    async def release(self, key: str, owner: str) -> None:
+        if self.get(key) == owner:
+            del self.values[key]
+
+
+    async def owner(self, key: str) -> Optional[str]:
+        return self.get(key)
+
+
+    async def keys(self, prefix: str) -> list[str]:
+        return [key for key in list(self.values) if key.startswith(prefix) and self.get(key) is not None]
+
+
+class RedisBackend(StateBackend):
+    """Leases in Redis (or anything speaking its protocol), shared by every node.
+
+    `client` is a redis.asyncio.Redis created with decode_responses=True. Renew and
+    release check the owner inside WATCH/MULTI so a lease that expired and was taken
+    by another node is never extended or deleted by the old owner.
+    """
+
+    def __init__(self, client, prefix: str = "leetduel:"):
+        self.client = client
+        self.prefix = prefix
+
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBackend":
+        import redis.asyncio as redis
+        return cls(redis.from_url(url, decode_responses=True))
+
+
+    async def check_and_set(self, key: str, owner: str, ttl: Optional[float]) -> bool:
+        """Extend (ttl) or delete (None) the lease only while `owner` still holds it."""
+        from redis.exceptions import WatchError
+
+        async with self.client.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(key)
+                if await pipe.get(key) != owner:
+                    await pipe.unwatch()
+                    return False
+                pipe.multi()
+                if ttl is None:
+                    pipe.delete(key)
+                else:
+                    pipe.set(key, owner, px=int(ttl * 1000))
+                await pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+
+    async def claim(self, key: str, owner: str, ttl: float) -> bool:
+        key = self.prefix + key
+        if await self.client.set(key, owner, px=int(ttl * 1000), nx=True):
+            return True
+        return await self.check_and_set(key, owner, ttl)
+
+
+    async def renew(self, key: str, owner: str, ttl: float) -> bool:
+        return await self.check_and_set(self.prefix + key, owner, ttl)
+
+
+    async def release(self, key: str, owner: str) -> None:
+        await self.check_and_set(self.prefix + key, owner, None)
+
+
+    async def owner(self, key: str) -> Optional[str]:
+        return await self.client.get(self.prefix + key)
+
+
+    async def keys(self, prefix: str) -> list[str]:
+        return [key[len(self.prefix):] async for key in self.client.scan_iter(match=self.prefix + prefix + "*", count=1000)]
+
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def create_backend(redis_url: str) -> StateBackend:
+    return RedisBackend.from_url(redis_url) if redis_url else MemoryBackend()
@@ -1,11 +1,44 @@
-import json
-import subprocess
-import requests
-from ratelimit import limits, RateLimitException
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+from src.config import code_execution_url, code_execution_urls, executor_retries, executor_hedge_after, executor_health_path, executor_health_interval, executor_token, judge_mode, max_concurrent_submissions, max_queued_submissions, sandbox_pool_size, sandbox_memory_limit, submission_burst, submission_rate
+from src.dataclass import ProblemData, SubmissionData, TestCaseResultData
+from src.sandbox import SandboxPool
+from src.executor import ExecutorClient
+from src.comparators import literal
+from src.harness import HARNESS_PRELUDE, ResultStream, decode_results, harness_cache
+from src.result_cache import submission_cache
+from src.metrics import sandbox_wait_seconds, sandbox_run_seconds, judge_seconds
+from src.scheduler import SubmissionRejected, SubmissionScheduler, Submitter
+from src.log import logger
+
+
+# Caps how many submissions this node executes at once; the rest wait in the
+# scheduler instead of piling more interpreters or HTTP requests onto the host.
+scheduler = SubmissionScheduler(max_concurrent_submissions, max_queued_submissions, submission_rate, submission_burst)
+sandbox_pool = SandboxPool(sandbox_pool_size, sandbox_memory_limit)
+executor = ExecutorClient(code_execution_urls, max_concurrent_submissions, executor_retries, executor_hedge_after, executor_health_path, executor_health_interval, token=executor_token) if code_execution_urls else None
+
+
+async def run_local(code: str, stdinput: str, timeout: int, on_output: Optional[Callable[[str], Awaitable[None]]] = None) -> dict[str, str]:
+    # Pool workers already define the ListNode prelude, so only the program is shipped.
+    return await sandbox_pool.run(code, stdinput, timeout, on_output)
 
-from src.config import code_execution_url
-from src.dataclass import ProblemData, SubmissionData
 
+async def run_remote(code: str, stdinput: str, timeout: int, on_output: Optional[Callable[[str], Awaitable[None]]] = None) -> dict[str, str]:
+    result = await executor.run(HARNESS_PRELUDE + code, stdinput, timeout)
+    # Executors answer once at the end, so the progress all arrives together
+    if on_output and result.get("stdout"):
+        await on_output(result["stdout"])
+    return result
+
+
+def display_input(test_input: str) -> str:
+    value = literal(test_input)
+    return test_input if value is None else str(value)
 
 
 class Problem:
@@ -14,58 +47,28 @@ class Problem:
     def __init__(self, language_id: int, problem: ProblemData):
         self.language_id = language_id
         self.problem = problem
-        self.stdinput = json.dumps([test_case.input for test_case in problem.test_cases])
-
+        self.harness = harness_cache.get(problem)
 
-    def submit_code(self, code: str, timeout: int = 10, code_timeout: int = 2) -> SubmissionData:
-        function_name = self.problem.function_signature.split("(")[0][4:]
-        code = """
-import sys
-import json
-import time
-
-class ListNode(object):
-    def __init__(self, x=0, next=None):
-        self.val = x
-        self.next = next
 
-    def __repr__(self):
-        r = []
-        copy = self
-        while copy:
-            r.append(copy.val)
-            copy = copy.next
+    async def submit_code(self, code: str, timeout: int = 10, stop_on_failure: bool = judge_mode == "first_fail", submitter: Submitter | None = None, on_progress: Optional[Callable[[TestCaseResultData], Awaitable[None]]] = None) -> SubmissionData:
+        """Judge `code`; raises SubmissionRejected if the scheduler turns it away.
 
-        return str(r)
+        `on_progress` is awaited with each test case's result as the sandbox reports it.
+        Cached results, and double-clicks that join an identical run already in flight, get none.
+        """
+        key = submission_cache.key(harness_cache.key(self.problem), code, stop_on_failure)
+        # Only a player's own double-clicks share a run; nobody waits on someone else's
+        owner = submitter.player if submitter else None
+        return await submission_cache.get_or_run(key, lambda: self.execute(code, timeout, stop_on_failure, submitter, on_progress), owner)
 
 
-def linkedList(a):
-    if not a:
-        return None
-    
-    head = curr = ListNode(a[0])
-    for i in a[1:]:
-        curr.next = ListNode(i)
-        curr = curr.next
-
-    return head
-""" + f"""
-{code}
-input_data = sys.stdin.read().strip()
-test_cases = json.loads(input_data)
-start_time = time.time_ns()
-results = []
-for args in test_cases:
-    print("|")
-    results.append({function_name}(*eval(args)))
-
-for result in results:
-    print(result)
-print(int((time.time_ns() - start_time) / 1e6))
-        """
+    async def execute(self, code: str, timeout: int, stop_on_failure: bool, submitter: Submitter | None = None, on_progress: Optional[Callable[[TestCaseResultData], Awaitable[None]]] = None) -> SubmissionData:
+        code = self.harness.program(code)
+        stdinput = self.harness.judged_stdinput if stop_on_failure else self.harness.stdinput
+        on_output = self.progress_reporter(on_progress) if on_progress else None
 
         try:
-            result = self.run_subprocess(code, timeout)
+            result = await self.run_subprocess(code, stdinput, timeout, submitter, on_output)
 
             if not result:
                 return SubmissionData(False, "No response")
@@ -73,64 +76,75 @@ print(int((time.time_ns() - start_time) / 1e6))
             if result["stderr"]:
                 return SubmissionData(False, result["stderr"])
             
-            return self.check_test_cases(result["stdout"], code_timeout)
+            with judge_seconds.time():
+                return self.check_test_cases(result["stdout"])
 
-        except subprocess.TimeoutExpired:
+        except (asyncio.TimeoutError, httpx.TimeoutException):
             return SubmissionData(False, "Time limit exceeded")
         
-        except RateLimitException:
-            return SubmissionData(False, "Rate limited! Please wait 5 seconds and try again.")
+        except SubmissionRejected:
+            raise
         
         except Exception as e:
             return SubmissionData(False, str(e))
         
 
-    def check_test_cases(self, d: str, code_timeout: int) -> SubmissionData:
+    def progress_reporter(self, on_progress: Callable[[TestCaseResultData], Awaitable[None]]) -> Callable[[str], Awaitable[None]]:
+        """Judges records as the runner's stdout arrives and reports each to `on_progress`."""
         test_cases = self.problem.test_cases
-        any_order = self.problem.any_order
+        comparator = self.harness.comparator
+        expected_values = self.harness.expected
+        stream = ResultStream()
+        index = 0
+        passed_count = 0
+
+        async def on_output(chunk: str) -> None:
+            nonlocal index, passed_count
+            for record in stream.feed(chunk):
+                if index >= len(test_cases):
+                    return
+                passed = not record.get("time_limit_exceeded") and comparator.matches(record, test_cases[index].output, expected_values[index])
+                passed_count += passed
+                try:
+                    await on_progress(TestCaseResultData(index, passed, record["cpu"] / 1e6, passed_count, len(test_cases)))
+                except Exception as e:
+                    # Progress is best effort; the judged result is still sent at the end
+                    logger.warning("Failed to report test case progress: %s", e)
+                index += 1
+
+        return on_output
+
+
+    def check_test_cases(self, d: str) -> SubmissionData:
+        test_cases = self.problem.test_cases
+        comparator = self.harness.comparator
+        expected_values = self.harness.expected
 
         if not d:
             return SubmissionData(False, "No output")
 
-        data: list[str] = d.split("\n")[:-1]
-        time: str = data.pop()
+        records = decode_results(d)
+        # Scores are based on CPU time so they do not drift with the load on the node.
+        cpu_time = sum(record["cpu"] for record in records) / 1e6
+        time = str(int(cpu_time))
 
-        if int(time) > code_timeout * 1000:
+        if cpu_time > self.problem.cpu_time_limit or any(record.get("time_limit_exceeded") for record in records):
             return SubmissionData(False, "Time limit exceeded")
 
         count = 0
         failed_index = -1
 
         submission = SubmissionData(True, None, time, len(test_cases))
-        r = {"status": "Accepted", "total test cases": len(test_cases), "time": time}
-
-        n = len(test_cases)
-        output = "\n".join(data[:-n])
-        output_list = output.split("|\n")[1:]
-        data = data[-n:]
-
-        for i in range(len(data)):
-            
-            
-            user_output = data[i]
-            test_output = test_cases[i].output
+        submission.test_case_times = [record["cpu"] / 1e6 for record in records]
 
-            try:
-                if any_order and isinstance(eval(user_output), list) and isinstance(eval(test_output), list):
-                    user_output = eval(user_output)
-                    test_output = eval(test_output)
+        for i, test_case in enumerate(test_cases):
+            record = records[i] if i < len(records) else None
 
-                    user_output.sort()
-                    test_output.sort()
-
-            except Exception as e:
-                print(e)
-
-            if user_output != test_output:
+            if record is None or not comparator.matches(record, test_case.output, expected_values[i]):
                 submission.accepted = False
                 if failed_index == -1:
                     failed_index = i
-                    submission.stdout = output_list[i]
+                    submission.stdout = record["stdout"] if record else ""
 
                 continue
 
@@ -139,22 +153,22 @@ print(int((time.time_ns() - start_time) / 1e6))
         submission.passed_test_cases = count
         
         if failed_index != -1:
-            submission.failed_test = f"Input: {str(eval(test_cases[failed_index].input))}\nExpected {test_cases[failed_index].output}, got {data[failed_index]}"
+            got = records[failed_index]["output"] if failed_index < len(records) else "nothing"
+            submission.failed_test = f"Input: {display_input(test_cases[failed_index].input)}\nExpected {test_cases[failed_index].output}, got {got}"
 
         return submission
     
 
-    @limits(calls=5, period=10)
-    def run_subprocess(self, code: str, timeout: int) -> dict[str, str]:
-        if code_execution_url == "":
-            p = subprocess.run(
-                ["python3", "-c", code],
-                input=self.stdinput,
-                capture_output=True,
-                text=True,
-                timeout=timeout
-            )
-            return {"stderr": p.stderr, "stdout": p.stdout}
-        
-        response = requests.post(code_execution_url, json={"code": code, "timeout": timeout, "stdinput": self.stdinput})
-        return response.json()
+    async def run_subprocess(self, code: str, stdinput: str, timeout: int, submitter: Submitter | None = None, on_output: Optional[Callable[[str], Awaitable[None]]] = None) -> dict[str, str]:
+        queued = time.perf_counter()
+
+        async def run() -> dict[str, str]:
+            sandbox_wait_seconds.observe(time.perf_counter() - queued)
+            if code_execution_url == "":
+                with sandbox_run_seconds.time("local"):
+                    return await run_local(code, stdinput, timeout, on_output)
+
+            with sandbox_run_seconds.time("remote"):
+                return await run_remote(code, stdinput, timeout, on_output)
+
+        return await scheduler.submit(run, submitter)
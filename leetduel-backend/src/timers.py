@@ -0,0 +1,109 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable, Optional
+
+from src.log import logger
+
+
+class DeadlineScheduler:
+    """Every party's round deadline in one heap, served by a single task.
+
+    Rescheduling or cancelling a key leaves its old heap entry behind; entries whose
+    token no longer matches are skipped when they surface. Deadlines are wall-clock
+    (time.time()) so they line up with Party.end_time. Between deadlines the task wakes
+    every `tick_interval` seconds to call `on_tick` with all scheduled keys.
+    """
+
+    def __init__(self, on_expire: Callable[[str], Awaitable[None]], on_tick: Optional[Callable[[list[str]], Awaitable[None]]] = None, tick_interval: float = 10):
+        self.on_expire = on_expire
+        self.on_tick = on_tick
+        self.tick_interval = tick_interval
+        self.heap: list[tuple[float, int, str]] = []
+        self.deadlines: dict[str, tuple[float, int]] = {}
+        self.tokens = itertools.count()
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task | None = None
+        # Running expiries; the loop only keeps weak references to tasks
+        self.expiring: set[asyncio.Task] = set()
+
+
+    def __len__(self) -> int:
+        return len(self.deadlines)
+
+
+    def schedule(self, key: str, deadline: float) -> None:
+        token = next(self.tokens)
+        self.deadlines[key] = (deadline, token)
+        heapq.heappush(self.heap, (deadline, token, key))
+        if self.heap[0][1] == token:
+            self.wakeup.set()
+
+
+    def cancel(self, key: str) -> None:
+        self.deadlines.pop(key, None)
+
+
+    def remaining(self, key: str, now: Optional[float] = None) -> Optional[float]:
+        entry = self.deadlines.get(key)
+        if entry is None:
+            return None
+        return max(0.0, entry[0] - (time.time() if now is None else now))
+
+
+    def pop_expired(self, now: float) -> list[str]:
+        expired = []
+        while self.heap and self.heap[0][0] <= now:
+            deadline, token, key = heapq.heappop(self.heap)
+            if self.deadlines.get(key) == (deadline, token):
+                del self.deadlines[key]
+                expired.append(key)
+        # Drop cancelled entries at the top so the next sleep isn't cut short by them
+        while self.heap and self.deadlines.get(self.heap[0][2]) != self.heap[0][:2]:
+            heapq.heappop(self.heap)
+        return expired
+
+
+    async def run(self) -> None:
+        next_tick = time.time() + self.tick_interval
+        while True:
+            now = time.time()
+            for key in self.pop_expired(now):
+                # Each expiry runs on its own so a slow one can't hold up the rest
+                task = asyncio.create_task(self.expire(key))
+                self.expiring.add(task)
+                task.add_done_callback(self.expiring.discard)
+
+            if self.on_tick and now >= next_tick:
+                next_tick = now + self.tick_interval
+                try:
+                    await self.on_tick(list(self.deadlines))
+                except Exception as e:
+                    logger.warning("Timer tick failed: %s", e)
+                continue
+
+            wake_at = min(self.heap[0][0], next_tick) if self.heap else next_tick
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), max(0.0, wake_at - time.time()))
+            except asyncio.TimeoutError:
+                pass
+
+
+    async def expire(self, key: str) -> None:
+        try:
+            await self.on_expire(key)
+        except Exception as e:
+            logger.warning("Timer for %s failed: %s", key, e)
+
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+
+    def stop(self) -> None:
+        if self.task:
+            self.task.cancel()
+            self.task = None
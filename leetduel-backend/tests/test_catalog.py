@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from src import crud
+from src.catalog import ProblemCatalog
+from src.models import Base
+
+
+@compiles(JSONB, "sqlite")
+def jsonb_as_json(type_, compiler, **kw):
+    return "JSON"
+
+
+@pytest.fixture
+def db(monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine, tables=[Base.metadata.tables["problems"]])
+    monkeypatch.setattr(crud, "catalog", ProblemCatalog(2))
+    with sessionmaker(bind=engine)() as session:
+        for name, difficulty in [("Two Sum", "Easy"), ("Add", "Easy"), ("LRU Cache", "Medium")]:
+            crud.create_problem(session, name, "", difficulty, [{"input": "[1]", "output": "1"}], "def f(x):", False)
+        yield session
+
+
+def test_random_problem_respects_difficulty(db):
+    catalog = crud.catalog
+    for _ in range(20):
+        assert catalog.random_problem(db, [False, True, False]).name == "LRU Cache"
+        assert catalog.random_problem(db, [True, False, False]).difficulty == "Easy"
+    assert catalog.random_problem(db, [False, False, True]) is None
+
+
+def test_lru_keeps_problems_shared_while_parties_hold_them(db):
+    catalog = crud.catalog
+    held = catalog.get(db, 1)
+    assert catalog.get(db, 1) is held
+    catalog.get(db, 2)
+    catalog.get(db, 3)
+    assert list(catalog.problems) == [2, 3]
+
+    # Reloaded from the row, but the copy a party still holds is the one handed out
+    assert catalog.get(db, 1) is held
+
+
+def test_new_problems_and_reports_reach_the_catalog(db):
+    catalog = crud.catalog
+    assert catalog.random_problem(db, [False, False, True]) is None
+    crud.create_problem(db, "Median", "", "Hard", [{"input": "[1]", "output": "1"}], "def f(x):", False)
+    assert catalog.random_problem(db, [False, False, True]).name == "Median"
+
+    assert catalog.get(db, 1).reports == 0
+    crud.increment_reports(db, "Two Sum")
+    assert catalog.get(db, 1).reports == 1
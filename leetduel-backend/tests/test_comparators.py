@@ -0,0 +1,41 @@
+from src.comparators import get_comparator, parsed_outputs
+from src.dataclass import ProblemData
+
+
+def make_problem(outputs: list[str], any_order: bool = False, comparator: str = "") -> ProblemData:
+    test_cases = [{"input": "[]", "output": output} for output in outputs]
+    return ProblemData("p", "", "def f()", "Easy", test_cases, any_order, 0, comparator=comparator)
+
+
+def test_any_order():
+    problem = make_problem(["[[1, 2], [3]]"], any_order=True)
+    comparator = get_comparator(problem)
+    expected = parsed_outputs(problem)[0]
+
+    assert comparator.matches({"output": "[[3], [1, 2]]", "value": [[3], [1, 2]]}, "[[1, 2], [3]]", expected)
+    assert not comparator.matches({"output": "[[3], [2, 1]]", "value": [[3], [2, 1]]}, "[[1, 2], [3]]", expected)
+    assert not comparator.matches({"output": "[[3]]", "value": [[3]]}, "[[1, 2], [3]]", expected)
+
+
+def test_float_tolerance():
+    problem = make_problem(["[0.333333, 2.0]"], comparator="float")
+    comparator = get_comparator(problem)
+    expected = parsed_outputs(problem)[0]
+
+    assert comparator.matches({"output": "[0.3333333333, 2]", "value": [0.3333333333, 2]}, "[0.333333, 2.0]", expected)
+    assert not comparator.matches({"output": "[0.34, 2]", "value": [0.34, 2]}, "[0.333333, 2.0]", expected)
+    assert not comparator.matches({"output": "oops", "value": None}, "[0.333333, 2.0]", expected)
+
+
+def test_linked_list():
+    problem = make_problem(["[]"], comparator="linked_list")
+    comparator = get_comparator(problem)
+    expected = parsed_outputs(problem)[0]
+
+    assert comparator.matches({"output": "None"}, "[]", expected)
+    assert not comparator.matches({"output": "[1]"}, "[]", expected)
+
+
+def test_outputs_parsed_once():
+    problem = make_problem(["[1]"], any_order=True)
+    assert parsed_outputs(problem) is parsed_outputs(problem)
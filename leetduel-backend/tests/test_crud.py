@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src import crud
+from src.database import Base, UserRank
+from src.dataclass import RatingUpdate
+from src.ranking import RankIndex
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ranks.db'}", connect_args={"timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(crud, "rank_index", RankIndex())
+    return sessionmaker(bind=engine)
+
+
+def test_rating_updates_upsert_in_one_statement(session):
+    with session() as db:
+        assert crud.apply_rating_updates(db, []) == {}
+        assert crud.apply_rating_updates(db, [
+            RatingUpdate("a", "alice", "a@example.com", 5, True),
+            RatingUpdate("b", "bob", "b@example.com", 1.5, False),
+        ]) == {"a": 5, "b": 1.5}
+        # Two updates for one player in a batch fold into one row update
+        assert crud.apply_rating_updates(db, [
+            RatingUpdate("a", "alice2", "a@example.com", 2, False),
+            RatingUpdate("a", "alice2", "a@example.com", 1, True),
+        ]) == {"a": 8}
+
+        alice = crud.get_user_rank(db, "a")
+        assert (alice.username, alice.total_score, alice.games_played, alice.games_won) == ("alice2", 8, 3, 2)
+        assert crud.rank_index.top(2) == [("a", 8), ("b", 1.5)]
+
+
+def test_concurrent_rating_updates_are_not_lost(session):
+    def play(_):
+        with session() as db:
+            crud.apply_rating_updates(db, [RatingUpdate("a", "alice", "", 1, False)])
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(play, range(40)))
+
+    with session() as db:
+        row = db.query(UserRank).filter(UserRank.uid == "a").one()
+        assert (row.total_score, row.games_played) == (40, 40)
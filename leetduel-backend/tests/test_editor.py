@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from src.editor import Coalescer, EditorSync, StaleEdit, apply_ops
+
+
+def test_apply_ops_in_sequence():
+    ops = [{"offset": 4, "delete": 1, "insert": "solve"}, {"offset": 0, "insert": "# "}]
+    assert apply_ops("def f(): pass", ops, 100) == "# def solve(): pass"
+
+    with pytest.raises(ValueError):
+        apply_ops("abc", [{"offset": 2, "delete": 5}], 100)
+    with pytest.raises(ValueError):
+        apply_ops("abc", [{"insert": "x" * 10}], 5)
+
+
+def test_versions():
+    editors = EditorSync(100)
+    text = editors.apply("sid", "code", "", {"code": "abc", "version": 3}, "code")
+    text = editors.apply("sid", "code", text, {"version": 3, "ops": [{"offset": 3, "insert": "d"}]}, "code")
+    assert (text, editors.version("sid", "code")) == ("abcd", 4)
+
+    with pytest.raises(StaleEdit) as e:
+        editors.apply("sid", "code", text, {"version": 3, "ops": [{"insert": "x"}]}, "code")
+    assert e.value.version == 4
+
+
+def test_malformed_updates_are_rejected():
+    editors = EditorSync(100)
+    editors.apply("sid", "code", "", {"code": "abc"}, "code")
+    for data in (
+        {"code": "x", "version": None},
+        {"code": "x", "version": "two"},
+        {"code": "x", "version": -1},
+        {"ops": [{"insert": "x"}]},
+        {"version": 1, "ops": "x"},
+        {"version": 1, "ops": ["x"]},
+    ):
+        with pytest.raises(ValueError):
+            editors.apply("sid", "code", "abc", data, "code")
+    assert editors.version("sid", "code") == 1
+
+
+def test_coalescer_sends_latest_once_per_interval():
+    sent = []
+    state = {"text": ""}
+
+    async def send(key):
+        sent.append(state["text"])
+
+    async def scenario():
+        updates = Coalescer(0.05, send)
+        for text in ["a", "ab", "abc"]:
+            state["text"] = text
+            updates.mark("sid")
+        await asyncio.sleep(0.01)
+        for text in ["abcd", "abcde"]:
+            state["text"] = text
+            updates.mark("sid")
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    assert sent == ["abc", "abcde"]
@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from src.executor import ExecutorClient, ExecutorUnavailable
+
+
+def stand_in(down: set[str], slow: dict[str, float], seen: list[str]) -> FastAPI:
+    """An executor that echoes stdin, answering per host: 503 if down, after a delay if slow."""
+    app = FastAPI()
+
+    @app.post("/run")
+    async def run(request: Request):
+        host = request.headers["host"]
+        seen.append(host)
+        if host in down:
+            return JSONResponse({"detail": "unavailable"}, status_code=503)
+        await asyncio.sleep(slow.get(host, 0.01))
+        body = await request.json()
+        return {"stdout": f"{host}:{body['stdinput']}", "stderr": ""}
+
+    @app.get("/health")
+    async def health(request: Request):
+        if request.headers["host"] in down:
+            return JSONResponse({}, status_code=503)
+        return {}
+
+    return app
+
+
+def client_for(app: FastAPI, hosts: list[str], **kwargs) -> ExecutorClient:
+    return ExecutorClient([f"http://{host}/run" for host in hosts], 8, transport=httpx.ASGITransport(app=app), **kwargs)
+
+
+def test_spreads_load_over_endpoints():
+    seen = []
+
+    async def scenario():
+        executor = client_for(stand_in(set(), {}, seen), ["a", "b"])
+        results = await asyncio.gather(*(executor.run("print()", str(i), 5) for i in range(10)))
+        await executor.close()
+        return results
+
+    results = asyncio.run(scenario())
+    assert [result["stdout"].split(":")[1] for result in results] == [str(i) for i in range(10)]
+    assert seen.count("a") == seen.count("b") == 5
+
+
+def test_retries_on_other_endpoint_and_recovers_after_health_check():
+    seen = []
+    down = {"a"}
+
+    async def scenario():
+        executor = client_for(stand_in(down, {}, seen), ["a", "b"], max_failures=1)
+        executor.endpoints[1].in_flight = 1  # make "a" the first choice
+        assert (await executor.run("", "x", 5))["stdout"] == "b:x"
+        assert not executor.endpoints[0].healthy
+
+        executor.endpoints[1].in_flight = 0
+        await executor.check_health()
+        assert not executor.endpoints[0].healthy
+        down.clear()
+        await executor.check_health()
+        assert executor.endpoints[0].healthy
+
+        down.update({"a", "b"})
+        with pytest.raises(ExecutorUnavailable):
+            await executor.run("", "x", 5)
+        await executor.close()
+
+    asyncio.run(scenario())
+    assert seen[:2] == ["a", "b"]
+
+
+def test_hedges_slow_runs_to_a_second_endpoint():
+    seen = []
+
+    async def scenario():
+        executor = client_for(stand_in(set(), {"slow": 2}, seen), ["slow", "fast"], hedge_after=0.05)
+        executor.endpoints[1].latency = 1  # make "slow" the first choice
+        start = time.perf_counter()
+        result = await executor.run("", "x", 5)
+        elapsed = time.perf_counter() - start
+        stats = executor.stats()
+        await executor.close()
+        return result, elapsed, stats
+
+    result, elapsed, stats = asyncio.run(scenario())
+    assert result["stdout"] == "fast:x"
+    assert elapsed < 1
+    assert stats["hedges"] == 1
+    assert all(endpoint["in_flight"] == 0 for endpoint in stats["endpoints"])
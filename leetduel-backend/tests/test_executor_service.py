@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+import httpx
+
+from src import executor_service
+from src.executor import ExecutorClient
+from src.sandbox import SandboxPool
+
+
+async def with_service(scenario):
+    await executor_service.pool.start()
+    try:
+        transport = httpx.ASGITransport(app=executor_service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://executor") as client:
+            return await scenario(client)
+    finally:
+        await executor_service.pool.close()
+
+
+def test_execute_contract_and_time_limit():
+    async def scenario(client):
+        echo = await client.post("/execute", json={"code": "print(input()[::-1])", "timeout": 5, "stdinput": "abc"})
+        slow = await client.post("/execute", json={"code": "while True: pass", "timeout": 1, "stdinput": ""})
+        invalid = await client.post("/execute", json={"code": "", "timeout": 10_000})
+        return echo.json(), slow.json(), invalid.status_code
+
+    echo, slow, invalid = asyncio.run(with_service(scenario))
+    assert echo == {"stdout": "cba\n", "stderr": ""}
+    assert slow["timed_out"] and slow["stderr"] == "Time limit exceeded"
+    assert invalid == 422
+
+
+def test_batch_streams_results_as_they_finish(monkeypatch):
+    monkeypatch.setattr(executor_service, "pool", SandboxPool(3, 512))
+    jobs = [
+        {"code": "import time; time.sleep(0.5); print('slow')", "timeout": 5},
+        {"code": "print('fast')", "timeout": 5},
+        {"code": "raise ValueError('boom')", "timeout": 5},
+    ]
+
+    async def scenario(client):
+        lines = []
+        async with client.stream("POST", "/batch", json={"jobs": jobs}) as response:
+            async for line in response.aiter_lines():
+                if line:
+                    lines.append(json.loads(line))
+        return lines
+
+    lines = asyncio.run(with_service(scenario))
+    assert sorted(line["index"] for line in lines) == [0, 1, 2]
+    assert lines[-1] == {"index": 0, "stdout": "slow\n", "stderr": ""}
+    assert "ValueError: boom" in next(line for line in lines if line["index"] == 2)["stderr"]
+
+
+def test_backend_client_speaks_the_contract():
+    async def scenario(_):
+        executor = ExecutorClient(["http://executor/execute"], 4, transport=httpx.ASGITransport(app=executor_service.app))
+        try:
+            return await executor.run("print(sum(map(int, input().split())))", "1 2 3", 5)
+        finally:
+            await executor.close()
+
+    assert asyncio.run(with_service(scenario)) == {"stdout": "6\n", "stderr": ""}
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src import crud
+from src.database import Base, UserRank
+from src.dataclass import RatingUpdate
+from src.ranking import RankIndex
+from src.routes import ladder
+
+
+@pytest.fixture
+def client(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)
+
+    def get_db():
+        db = session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setattr(crud, "rank_index", RankIndex(block_size=2))
+    monkeypatch.setattr(crud, "ladder_sync_interval", 60)
+    monkeypatch.setattr(ladder, "snapshots", {})
+    monkeypatch.setattr(ladder, "snapshot_version", None)
+    app = FastAPI()
+    app.include_router(ladder.router)
+    app.dependency_overrides[ladder.get_db] = get_db
+
+    with session() as db:
+        now = datetime.utcnow()
+        for uid, score in [("a", 10), ("b", 10), ("c", 10), ("d", 7.5), ("e", 12)]:
+            db.add(UserRank(uid=uid, username=uid.upper(), email="", total_score=score, games_played=1, games_won=0, updated_at=now))
+        db.commit()
+
+    test_client = TestClient(app)
+    test_client.session = session
+    return test_client
+
+
+def test_cursor_pages_through_tied_scores(client):
+    names, ranks, cursor = [], [], None
+    while True:
+        params = {"limit": 2} | ({"cursor": cursor} if cursor else {})
+        page = client.get("/ladder", params=params).json()
+        names += [entry["username"] for entry in page["entries"]]
+        ranks += [entry["rank"] for entry in page["entries"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert names == ["E", "C", "B", "A", "D"]
+    assert ranks == [1, 2, 3, 4, 5]
+
+
+def test_bad_cursor_is_a_400(client):
+    assert client.get("/ladder", params={"cursor": "not a cursor"}).status_code == 400
+
+
+def test_polling_checks_the_database_once_per_interval(client, monkeypatch):
+    checks = []
+    get_ladder_version = crud.get_ladder_version
+    monkeypatch.setattr(crud, "get_ladder_version", lambda db: checks.append(1) or get_ladder_version(db))
+
+    etag = client.get("/ladder").headers["etag"]
+    for _ in range(5):
+        assert client.get("/ladder", headers={"If-None-Match": etag}).status_code == 304
+    assert len(checks) == 1
+
+    # This worker's own writes show up without waiting for the next check
+    with client.session() as db:
+        crud.apply_rating_updates(db, [RatingUpdate("d", "D", "", 10, True)])
+    page = client.get("/ladder", headers={"If-None-Match": etag})
+    assert page.status_code == 200 and page.json()["entries"][0]["username"] == "D"
+    assert len(checks) == 1
+
+
+def test_etag_round_trip_and_another_workers_write(client, monkeypatch):
+    monkeypatch.setattr(crud, "ladder_sync_interval", 0)
+    first = client.get("/ladder")
+    etag = first.headers["etag"]
+
+    assert client.get("/ladder", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/ladder", headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+    assert client.get("/ladder", headers={"If-None-Match": etag[:-2] + '"'}).status_code == 200
+
+    # Written straight to the table, as a different worker would, without touching this index
+    with client.session() as db:
+        db.query(UserRank).filter(UserRank.uid == "d").update({"total_score": 20, "updated_at": datetime.utcnow() + timedelta(seconds=1)})
+        db.commit()
+
+    second = client.get("/ladder", headers={"If-None-Match": etag})
+    assert second.status_code == 200
+    assert second.json()["entries"][0]["username"] == "D"
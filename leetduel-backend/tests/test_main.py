@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from src import main
+from src.dataclass import Party, Player
+from src.editor import Coalescer, EditorSync
+from src.matchmaking import MatchmakingQueue
+from src.sessions import SessionRegistry
+from src.state import MemoryBackend
+
+
+@pytest.fixture
+def server(monkeypatch):
+    emitted = []
+
+    async def emit(event, data=None, to=None, room=None, **kwargs):
+        emitted.append((event, data, to or room))
+
+    monkeypatch.setattr(main.sio, "emit", emit)
+    monkeypatch.setattr(main, "parties", {})
+    monkeypatch.setattr(main, "sessions", SessionRegistry())
+    monkeypatch.setattr(main, "state", MemoryBackend())
+    monkeypatch.setattr(main, "matchmaking", MatchmakingQueue(100, 100, 25))
+    monkeypatch.setattr(main, "editors", EditorSync(1000))
+    monkeypatch.setattr(main, "spectate_updates", Coalescer(60, main.send_spectate_update))
+    return emitted
+
+
+def waiting_party(*sids: str) -> Party:
+    party = Party(sids[0], {sid: Player(sid, False, "", "", 0, 0, None) for sid in sids}, None, "waiting", 1, 0, 0, [True, True, True], 15, 0)
+    main.parties["ABC"] = party
+    for sid in sids:
+        main.sessions.join_party(sid, "ABC")
+    return party
+
+
+def test_disconnect_while_reading_the_rating_leaves_no_claim(server, monkeypatch):
+    async def scenario():
+        reading = asyncio.Event()
+        read = asyncio.Event()
+
+        async def run_db(fn, *args, **kwargs):
+            if fn is main.get_user_score:
+                reading.set()
+                await read.wait()
+            return 0.0
+
+        monkeypatch.setattr(main, "run_db", run_db)
+        sid = await main.sio.manager.connect("eio-1", "/")
+        task = asyncio.create_task(main.start_matchmaking(sid, {"username": "alice", "email": "", "uid": "u1"}))
+        await reading.wait()
+        await main.sio.manager.disconnect(sid, "/")
+        await main.disconnect(sid)
+        read.set()
+        await task
+        return await main.state.owner("user:u1")
+
+    assert asyncio.run(scenario()) is None
+    assert len(main.matchmaking) == 0
+    assert not main.sessions.is_active("u1")
+
+
+def test_leaving_or_removing_a_party_drops_editor_state(server):
+    async def edit(sid):
+        await main.code_update(sid, {"party_code": "ABC", "code": "print(1)"})
+
+    async def scenario():
+        waiting_party("host", "guest")
+        await edit("host")
+        await edit("guest")
+        assert set(main.editors.versions) == {("host", "code"), ("guest", "code")}
+
+        await main.leave_party("guest", {"party_code": "ABC", "username": "guest"})
+        assert set(main.editors.versions) == {("host", "code")}
+        assert set(main.spectate_updates.pending) == {("host", "code")}
+
+        await main.remove_party("ABC")
+        assert not main.editors.versions and not main.spectate_updates.pending
+
+    asyncio.run(scenario())
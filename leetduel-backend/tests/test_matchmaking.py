@@ -0,0 +1,34 @@
+from src.matchmaking import MatchmakingQueue, QueueEntry
+
+
+def entry(sid: str, rating: float, joined: float = 0) -> QueueEntry:
+    return QueueEntry(sid, f"uid-{sid}", sid, "", rating, joined)
+
+
+def test_pairs_by_rating_and_widens_with_wait():
+    queue = MatchmakingQueue(bucket_width=100, base_window=100, window_growth=50)
+    for sid, rating in [("a", 0), ("b", 1000), ("c", 50), ("d", 1300)]:
+        queue.add(entry(sid, rating))
+
+    pairs = queue.match(now=0)
+    assert [(x.sid, y.sid) for x, y in pairs] == [("a", "c")]
+    assert len(queue) == 2
+
+    # 300 apart: out of range until both have waited (300 - 100) / 50 = 4 seconds
+    assert queue.match(now=3) == []
+    pairs = queue.match(now=4)
+    assert [(x.sid, y.sid) for x, y in pairs] == [("b", "d")]
+
+    stats = queue.stats(now=4)
+    assert stats["depth"] == 0
+    assert stats["matched"] == 4
+
+
+def test_remove_leaves_queue():
+    queue = MatchmakingQueue()
+    queue.add(entry("a", 10))
+    queue.add(entry("b", 20))
+    assert queue.remove("a").sid == "a"
+    assert queue.remove("a") is None
+    assert queue.match(now=0) == []
+    assert "b" in queue
@@ -0,0 +1,40 @@
+from src.metrics import Registry, timed
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram("event_seconds", "Handler latency", ("event",), buckets=(0.1, 1))
+    registry.gauge("parties", "Parties", lambda: 3)
+
+    for value in (0.05, 0.5, 0.5, 7):
+        latency.observe(value, "submit_code")
+    with latency.time("join_party"):
+        pass
+
+    lines = registry.render().splitlines()
+    assert 'event_seconds_bucket{event="submit_code",le="0.1"} 1' in lines
+    assert 'event_seconds_bucket{event="submit_code",le="1"} 3' in lines
+    assert 'event_seconds_bucket{event="submit_code",le="+Inf"} 4' in lines
+    assert 'event_seconds_sum{event="submit_code"} 8.05' in lines
+    assert 'event_seconds_count{event="join_party"} 1' in lines
+    assert "parties 3" in lines
+
+
+def test_nested_timed_calls_are_counted_once():
+    registry = Registry()
+    db_seconds = registry.histogram("db_seconds", "Query time", ("query",))
+
+    @timed(db_seconds)
+    def get_row():
+        return 1
+
+    @timed(db_seconds)
+    def get_page():
+        return [get_row(), get_row()]
+
+    assert get_page() == [1, 1]
+    assert get_row() == 1
+
+    lines = registry.render().splitlines()
+    assert 'db_seconds_count{query="get_page"} 1' in lines
+    assert 'db_seconds_count{query="get_row"} 1' in lines
@@ -0,0 +1,68 @@
+import asyncio
+import importlib.util
+
+import fakeredis
+import httpx
+import pytest
+
+from src import main
+from src.metrics import registry
+from src.state import RedisBackend
+
+
+def start_node(name: str, server: fakeredis.FakeServer, monkeypatch):
+    """A second copy of the app with its own parties and sockets, as another worker would run it"""
+    spec = importlib.util.spec_from_file_location(f"src.main_{name}", main.__file__)
+    node = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(node)
+    node.node_id = f"{name}.internal:8000"
+    node.state = RedisBackend(fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+    node.emitted = []
+
+    async def emit(event, data=None, to=None, room=None, **kwargs):
+        node.emitted.append((event, data, to or room))
+
+    monkeypatch.setattr(node.sio, "emit", emit)
+    return node
+
+
+@pytest.fixture
+def nodes(monkeypatch):
+    monkeypatch.setattr(registry, "metrics", list(registry.metrics))
+    server = fakeredis.FakeServer()
+    return start_node("a", server, monkeypatch), start_node("b", server, monkeypatch)
+
+
+def test_joins_on_the_wrong_node_are_sent_to_the_owner(nodes):
+    a, b = nodes
+
+    async def scenario():
+        host = await a.sio.manager.connect("eio-host", "/")
+        await a.create_party(host, {"username": "alice"})
+        party_code = a.emitted[-1][1]["party_code"]
+
+        guest = await b.sio.manager.connect("eio-guest", "/")
+        await b.join_party(guest, {"party_code": party_code, "username": "bob"})
+        by_code = b.emitted[-1]
+        # No party on b, so a random join has to find a's
+        await b.join_party(guest, {"party_code": "", "username": "bob"})
+        by_random = b.emitted[-1]
+        await b.join_party(guest, {"party_code": "NOPE12", "username": "bob"})
+        missing = b.emitted[-1]
+
+        transport = httpx.ASGITransport(app=b.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://b") as client:
+            node = (await client.get(f"/parties/{party_code}/node")).json()
+
+        # Reconnected through the load balancer with ?node=, the guest lands on a
+        rejoined = await a.sio.manager.connect("eio-guest-2", "/")
+        await a.join_party(rejoined, {"party_code": party_code, "username": "bob"})
+        return party_code, guest, by_code, by_random, missing, node, {host, rejoined}
+
+    party_code, guest, by_code, by_random, missing, node, sids = asyncio.run(scenario())
+    redirect = ("party_elsewhere", {"party_code": party_code, "username": "bob", "node": "a.internal:8000"}, guest)
+    assert by_code == by_random == redirect
+    assert missing[0] == "error" and missing[1]["message"] == "Party not found"
+    assert node == {"node": "a.internal:8000"}
+    assert set(a.parties[party_code].players) == sids
+    assert not b.parties
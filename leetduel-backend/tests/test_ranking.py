@@ -0,0 +1,61 @@
+import random
+
+from src.ranking import RankIndex
+
+
+def test_matches_brute_force():
+    rng = random.Random(7)
+    index = RankIndex(block_size=4)
+    scores: dict[str, float] = {}
+
+    for _ in range(2000):
+        uid = f"u{rng.randrange(60)}"
+        if rng.random() < 0.1:
+            index.remove(uid)
+            scores.pop(uid, None)
+        else:
+            score = rng.choice([0, rng.randrange(100), rng.random() * 1000])
+            index.update(uid, score)
+            scores[uid] = float(score)
+
+    for uid, score in scores.items():
+        assert index.rank(uid) == 1 + sum(1 for s in scores.values() if s > score)
+
+    ordered = [(uid, score) for score, uid in sorted(((s, u) for u, s in scores.items()), reverse=True)]
+    assert index.top(len(scores)) == ordered
+    assert index.top(10, 5) == ordered[5:15]
+
+
+def test_ties_share_rank():
+    index = RankIndex()
+    index.load([("a", 10), ("b", 10), ("c", 3)])
+
+    assert index.rank("a") == index.rank("b") == 1
+    assert index.rank("c") == 3
+    assert index.rank("missing") is None
+
+
+def test_ties_page_by_uid_and_resume_after_a_cursor():
+    index = RankIndex(block_size=2)
+    index.load([("a", 10), ("b", 10), ("c", 10), ("d", 7.5), ("e", 12)])
+
+    assert index.top(10) == [("e", 12), ("c", 10), ("b", 10), ("a", 10), ("d", 7.5)]
+    # A keyset page after (10, "c") starts at b, not after the whole tie
+    assert index.offset_after(10, "c") == 2
+    assert index.top(2, index.offset_after(10, "c")) == [("b", 10), ("a", 10)]
+    assert index.offset_after(10, "a") == 4
+
+
+def test_fractional_and_huge_scores_cost_one_entry_each():
+    index = RankIndex(block_size=4)
+    index.load([("low", 0.25), ("mid", 1.5), ("mid2", 1.25)])
+    index.update("whale", 1e12)
+    index.update("low", 0.3)
+
+    assert index.rank("whale") == 1
+    assert index.rank("mid") == 2
+    assert index.rank("mid2") == 3
+    assert index.rank("low") == 4
+    assert index.count_above(1.25) == 2
+    # Storage follows the number of players, not the size of the top score
+    assert sum(len(block) for block in index.blocks) == 4 and len(index.blocks) == 1
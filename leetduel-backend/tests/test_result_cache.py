@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+import pytest
+
+from src.dataclass import SubmissionData
+from src.result_cache import SubmissionCache
+from src.scheduler import RoundEnded, SubmissionRejected
+
+
+def test_key_ignores_trailing_whitespace():
+    cache = SubmissionCache(8, 60)
+    assert cache.key(("p", "r"), "def f():\n    return 1  \n\n", False) == cache.key(("p", "r"), "def f():\n    return 1", False)
+    assert cache.key(("p", "r"), "def f():\n    return 1", False) != cache.key(("p", "r"), "def f():\n    return 1", True)
+
+
+def test_ttl_and_lru_eviction(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = SubmissionCache(2, 60)
+    for name in ("a", "b"):
+        cache.put((name,), SubmissionData(True), 0.1)
+    assert cache.get(("a",)) is not None  # a is now the most recent
+    cache.put(("c",), SubmissionData(True), 0.1)
+    assert cache.get(("b",)) is None and cache.get(("a",)) is not None
+
+    now[0] += 61
+    assert cache.get(("a",)) is None
+    assert cache.get(("c",)) is None
+
+
+def test_double_click_shares_a_judged_result():
+    runs = []
+
+    async def scenario():
+        cache = SubmissionCache(8, 60)
+
+        async def run():
+            runs.append(1)
+            await asyncio.sleep(0.01)
+            return SubmissionData(True, None, "5", 1, 1)
+
+        first, second = await asyncio.gather(cache.get_or_run(("k",), run, "A"), cache.get_or_run(("k",), run, "A"))
+        third = await cache.get_or_run(("k",), run, "B")
+        return first, second, third, cache.stats()
+
+    first, second, third, stats = asyncio.run(scenario())
+    assert first is second is third
+    assert len(runs) == 1
+    assert stats["hits"] == 2 and stats["misses"] == 1
+
+
+def test_waiter_runs_its_own_job_after_a_rejection_or_error():
+    async def scenario():
+        cache = SubmissionCache(8, 60)
+
+        async def rejected():
+            await asyncio.sleep(0.01)
+            raise SubmissionRejected("Rate limited!")
+
+        async def timed_out():
+            await asyncio.sleep(0.01)
+            return SubmissionData(False, "Time limit exceeded")
+
+        async def judged():
+            return SubmissionData(True, None, "5", 1, 1)
+
+        leader = asyncio.create_task(cache.get_or_run(("k",), rejected, "A"))
+        await asyncio.sleep(0)
+        follower = await cache.get_or_run(("k",), judged, "A")
+        with pytest.raises(SubmissionRejected):
+            await leader
+
+        leader = asyncio.create_task(cache.get_or_run(("j",), timed_out, "A"))
+        await asyncio.sleep(0)
+        other = await cache.get_or_run(("j",), judged, "A")
+        assert (await leader).message == "Time limit exceeded"
+        return follower, other
+
+    follower, other = asyncio.run(scenario())
+    assert follower.accepted and other.accepted
+
+
+def test_round_end_fails_the_waiter_without_a_second_run():
+    runs = []
+
+    async def scenario():
+        cache = SubmissionCache(8, 60)
+
+        async def cancelled():
+            runs.append(1)
+            await asyncio.sleep(0.01)
+            raise RoundEnded("The round ended before your submission was judged.")
+
+        leader = asyncio.create_task(cache.get_or_run(("k",), cancelled, "alice"))
+        await asyncio.sleep(0)
+        with pytest.raises(RoundEnded):
+            await cache.get_or_run(("k",), cancelled, "alice")
+        with pytest.raises(RoundEnded):
+            await leader
+
+    asyncio.run(scenario())
+    assert len(runs) == 1
+
+
+def test_other_players_do_not_wait_on_each_other():
+    started = []
+
+    async def scenario():
+        cache = SubmissionCache(8, 60)
+        gate = asyncio.Event()
+
+        async def run(player):
+            started.append(player)
+            await gate.wait()
+            return SubmissionData(True, None, "5", 1, 1)
+
+        tasks = [asyncio.create_task(cache.get_or_run(("k",), lambda player=player: run(player), player)) for player in ("alice", "bob")]
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert started == ["alice", "bob"]
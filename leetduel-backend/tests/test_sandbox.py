@@ -0,0 +1,93 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from src.sandbox import SandboxPool
+
+
+def alive(pid: int) -> bool:
+    # A killed child reparented to a PID 1 that doesn't reap lingers as a zombie
+    try:
+        with open(f"/proc/{pid}/stat") as stat:
+            return stat.read().split(")")[-1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+def wait_for_pid(path: str) -> int:
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        if os.path.exists(path) and open(path).read().strip():
+            return int(open(path).read())
+        time.sleep(0.02)
+    raise AssertionError("job never started")
+
+
+def test_runs_jobs_and_kills_at_the_deadline():
+    async def scenario():
+        pool = SandboxPool(1, 512)
+        try:
+            echo = await pool.run("print(input())", "hello", 5)
+            with pytest.raises(asyncio.TimeoutError):
+                await pool.run("while True: pass", "", 1)
+            after = await pool.run("print('still serving')", "", 5)
+        finally:
+            await pool.close()
+        return echo, after
+
+    echo, after = asyncio.run(scenario())
+    assert echo == {"stdout": "hello\n", "stderr": ""}
+    assert after["stdout"] == "still serving\n"
+
+
+def test_cancelled_job_takes_its_child_and_forks_down(tmp_path):
+    pid_file = tmp_path / "pid"
+    code = f"""
+import os, time
+if os.fork() == 0:
+    open({str(pid_file)!r} + ".grandchild", "w").write(str(os.getpid()))
+    time.sleep(1000)
+open({str(pid_file)!r}, "w").write(str(os.getpid()))
+time.sleep(1000)
+"""
+
+    async def scenario():
+        pool = SandboxPool(1, 512)
+        try:
+            task = asyncio.create_task(pool.run(code, "", 30))
+            child = await asyncio.to_thread(wait_for_pid, str(pid_file))
+            grandchild = await asyncio.to_thread(wait_for_pid, str(pid_file) + ".grandchild")
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            # The cancelled worker was replaced, so the pool keeps serving
+            result = await pool.run("print(1)", "", 5)
+        finally:
+            await pool.close()
+        return child, grandchild, result
+
+    child, grandchild, result = asyncio.run(scenario())
+    time.sleep(0.2)
+    assert not alive(child)
+    assert not alive(grandchild)
+    assert result["stdout"] == "1\n"
+
+
+def test_dead_worker_is_respawned():
+    async def scenario():
+        pool = SandboxPool(1, 512)
+        try:
+            await pool.start()
+            worker = pool.idle.get_nowait()
+            worker.process.kill()
+            await worker.process.wait()
+            pool.idle.put_nowait(worker)
+            with pytest.raises(Exception):
+                await pool.run("print(1)", "", 5)
+            return await pool.run("print(2)", "", 5)
+        finally:
+            await pool.close()
+
+    assert asyncio.run(scenario())["stdout"] == "2\n"
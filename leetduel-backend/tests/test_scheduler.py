@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+
+from src.scheduler import SubmissionRejected, SubmissionScheduler, Submitter
+
+
+def test_round_robin_across_parties_and_ranked_first():
+    order = []
+
+    async def scenario():
+        scheduler = SubmissionScheduler(1, 10, rate=1, burst=10)
+        gate = asyncio.Event()
+        positions = {}
+
+        def job(name):
+            async def run():
+                order.append(name)
+                if name == "blocker":
+                    await gate.wait()
+                return name
+            return run
+
+        def submitter(player, party, ranked=False):
+            async def on_queued(position):
+                positions[player] = position
+            return Submitter(player, party, ranked, on_queued)
+
+        blocker = asyncio.create_task(scheduler.submit(job("blocker"), submitter("x", "X")))
+        await asyncio.sleep(0)
+        waiting = [
+            scheduler.submit(job("a1"), submitter("a1", "A")),
+            scheduler.submit(job("a2"), submitter("a2", "A")),
+            scheduler.submit(job("b1"), submitter("b1", "B")),
+            scheduler.submit(job("r1"), submitter("r1", "R", ranked=True)),
+        ]
+        tasks = [asyncio.create_task(w) for w in waiting]
+        await asyncio.sleep(0)
+        assert positions == {"a1": 1, "a2": 2, "b1": 2, "r1": 1}
+        assert scheduler.stats() == {"running": 1, "queued": 4, "slots": 1}
+
+        gate.set()
+        await asyncio.gather(blocker, *tasks)
+        assert scheduler.stats()["queued"] == 0
+
+    asyncio.run(scenario())
+    # The lone party B is not stuck behind both of A's submissions
+    assert order == ["blocker", "r1", "a1", "b1", "a2"]
+
+
+def test_bucket_and_queue_bound_reject():
+    async def scenario():
+        scheduler = SubmissionScheduler(1, 1, rate=0.1, burst=2)
+        gate = asyncio.Event()
+
+        async def slow():
+            await gate.wait()
+
+        first = asyncio.create_task(scheduler.submit(slow, Submitter("p", "A")))
+        second = asyncio.create_task(scheduler.submit(slow, Submitter("p", "A")))
+        await asyncio.sleep(0)
+
+        with pytest.raises(SubmissionRejected, match="busy"):
+            await scheduler.submit(slow, Submitter("q", "B"))
+
+        gate.set()
+        await asyncio.gather(first, second)
+        with pytest.raises(SubmissionRejected, match="wait 10 seconds"):
+            await scheduler.submit(slow, Submitter("p", "A"))
+        assert await scheduler.submit(slow, Submitter("q", "B")) is None
+
+    asyncio.run(scenario())
+
+
+def test_cancel_party_stops_its_queued_and_running_submissions():
+    async def scenario():
+        scheduler = SubmissionScheduler(1, 10, rate=1, burst=10)
+        gate = asyncio.Event()
+        stopped = []
+
+        async def slow():
+            try:
+                await gate.wait()
+            except asyncio.CancelledError:
+                stopped.append(True)
+                raise
+            return "ran"
+
+        running = asyncio.create_task(scheduler.submit(slow, Submitter("p", "A")))
+        queued = asyncio.create_task(scheduler.submit(slow, Submitter("q", "A")))
+        other = asyncio.create_task(scheduler.submit(slow, Submitter("r", "B")))
+        for _ in range(2):
+            await asyncio.sleep(0)
+        assert scheduler.stats() == {"running": 1, "queued": 2, "slots": 1}
+
+        scheduler.cancel_party("A")
+        for task in (running, queued):
+            with pytest.raises(SubmissionRejected, match="round ended"):
+                await task
+        await asyncio.sleep(0)
+        # The freed slot went to the other party
+        assert scheduler.stats() == {"running": 1, "queued": 0, "slots": 1}
+        gate.set()
+        assert await other == "ran"
+        assert stopped == [True]
+
+    asyncio.run(scenario())
+
+
+def test_buckets_survive_until_refilled():
+    async def scenario():
+        scheduler = SubmissionScheduler(1, 10, rate=20, burst=1)
+
+        async def run():
+            return None
+
+        await scheduler.submit(run, Submitter("p", "A"))
+        with pytest.raises(SubmissionRejected, match="Rate limited"):
+            await scheduler.submit(run, Submitter("p", "A"))
+        assert "p" in scheduler.buckets
+
+        await asyncio.sleep(0.1)
+        await scheduler.submit(run, Submitter("q", "B"))
+        # p refilled and was dropped; q just spent its token and is kept
+        assert list(scheduler.buckets) == ["q"]
+
+    asyncio.run(scenario())
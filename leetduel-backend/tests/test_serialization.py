@@ -0,0 +1,27 @@
+from dataclasses import asdict
+
+from src.dataclass import GameData, LeaderboardData, ProblemData, Score
+from src.serialization import dumps, loads, payload
+
+
+def test_payload_matches_asdict_without_test_cases():
+    problem = ProblemData("p", "desc", "def f()", "Easy", [{"input": "[1]", "output": "1"}], False, 0)
+    game = GameData(problem, "ABC", 15, 1, 1)
+
+    expected = {
+        "problem": {"name": "p", "description": "desc", "function_signature": "def f()", "difficulty": "Easy", "test_cases": []},
+        "party_code": "ABC",
+        "time_limit": 15,
+        "round": 1,
+        "total_rounds": 1
+    }
+
+    assert payload(game) == expected
+    assert payload(game)["problem"] is payload(GameData(problem, "XYZ", 15, 1, 1))["problem"]
+    # A message handed to the codec directly is stripped the same way
+    assert loads(dumps(game)) == expected
+
+
+def test_roundtrip():
+    leaderboard = LeaderboardData([Score("a", 1.5), Score("b", 0)])
+    assert loads(dumps(["final_leaderboard", payload(leaderboard)])) == ["final_leaderboard", asdict(leaderboard)]
@@ -0,0 +1,31 @@
+from src.sessions import SessionRegistry
+
+
+def test_indexes_follow_users_and_parties():
+    sessions = SessionRegistry()
+    sessions.add_user("u1", "s1", "alice", "a@example.com")
+    sessions.join_party("s1", "ABC")
+
+    assert sessions.is_active("u1")
+    assert (sessions.uid_for_sid("s1"), sessions.sid_for_uid("u1"), sessions.party_for_sid("s1")) == ("u1", "s1", "ABC")
+    assert sessions.user("u1") == {"sid": "s1", "username": "alice", "email": "a@example.com"}
+
+    sessions.leave_party("s1")
+    assert sessions.party_for_sid("s1") is None
+    assert sessions.uid_for_sid("s1") == "u1"
+
+    assert sessions.remove_user("u1")["sid"] == "s1"
+    assert not sessions.is_active("u1")
+    assert sessions.uid_for_sid("s1") is None and sessions.sid_for_uid("u1") is None
+    assert sessions.remove_user("u1") is None
+
+
+def test_reconnect_moves_the_user_to_the_new_sid():
+    sessions = SessionRegistry()
+    sessions.add_user("u1", "old", "alice", "")
+    sessions.add_user("u1", "new", "alice", "")
+
+    assert sessions.sid_for_uid("u1") == "new"
+    assert sessions.uid_for_sid("new") == "u1"
+    assert sessions.uid_for_sid("old") is None
+    assert len(sessions.users) == len(sessions.uid_by_sid) == 1
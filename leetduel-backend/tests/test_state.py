@@ -0,0 +1,46 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+from src.state import MemoryBackend, RedisBackend, StateBackend
+
+
+async def check_single_owner(state: StateBackend) -> None:
+    assert await state.claim("party:ABC", "node-a", 0.2)
+    assert not await state.claim("party:ABC", "node-b", 0.2)
+    assert await state.owner("party:ABC") == "node-a"
+    assert not await state.renew("party:ABC", "node-b", 0.2)
+    assert await state.renew("party:ABC", "node-a", 0.2)
+
+    # node-a stops renewing, e.g. it died; node-b takes over once the lease expires
+    await asyncio.sleep(0.3)
+    assert await state.claim("party:ABC", "node-b", 0.2)
+    assert not await state.renew("party:ABC", "node-a", 0.2)
+
+    await state.release("party:ABC", "node-a")
+    assert await state.owner("party:ABC") == "node-b"
+    await state.release("party:ABC", "node-b")
+    assert await state.owner("party:ABC") is None
+
+    await state.claim("party:XYZ", "node-a", 0.2)
+    await state.claim("user:u1", "sid", 0.2)
+    assert await state.keys("party:") == ["party:XYZ"]
+
+
+def test_backends_must_implement_leases():
+    class Partial(StateBackend):
+        async def claim(self, key: str, owner: str, ttl: float) -> bool:
+            return True
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_memory_lease():
+    asyncio.run(check_single_owner(MemoryBackend()))
+
+
+def test_redis_lease():
+    # Local stand-in for the Redis server both nodes would share
+    asyncio.run(check_single_owner(RedisBackend(fakeredis.FakeAsyncRedis(decode_responses=True))))
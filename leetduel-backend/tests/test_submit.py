@@ -1,4 +1,11 @@
-from src.submit import Problem
+import asyncio
+import time
+
+import pytest
+
+from src.submit import Problem, sandbox_pool
+from src.dataclass import ProblemData
+from src.harness import HarnessCache, ResultStream, decode_results
 from src.crud import get_problem
 from src.database import SessionLocal
 
@@ -29,8 +36,186 @@ def twoSum(nums: list[int], target: int) -> list[int]:
     return []
 """
 
-    r = problem.submit_code(code)
+    r = asyncio.run(problem.submit_code(code))
 
     print(r)
     assert "status" in r
-    assert r["status"] == "Accepted"
\ No newline at end of file
+    assert r["status"] == "Accepted"
+
+def test_progress_is_reported_per_test_case():
+    problem_data = ProblemData("Add", "", "def add(a, b):", "Easy", [
+        {"input": "[1, 2]", "output": "3"},
+        {"input": "[2, 2]", "output": "4"},
+        {"input": "[5, 5]", "output": "11"},
+    ], False, 0)
+    code = """
+def add(a, b):
+    print("debug")
+    return a + b
+"""
+    progress = []
+
+    async def on_progress(result):
+        progress.append(result)
+
+    async def scenario():
+        try:
+            return await Problem(100, problem_data).submit_code(code, stop_on_failure=False, on_progress=on_progress)
+        finally:
+            await sandbox_pool.close()
+
+    submission = asyncio.run(scenario())
+    assert [(r.index, r.passed, r.passed_test_cases, r.total_test_cases) for r in progress] == [(0, True, 1, 3), (1, True, 2, 3), (2, False, 2, 3)]
+    assert [r.time for r in progress] == submission.test_case_times
+    assert submission.passed_test_cases == 2
+
+
+def test_first_fail_stops_at_the_first_wrong_answer():
+    problem_data = ProblemData("Add", "", "def add(a, b):", "Easy", [
+        {"input": "[1, 2]", "output": "3"},
+        {"input": "[5, 5]", "output": "11"},
+        {"input": "[0, 0]", "output": "0"},
+    ], False, 0)
+    code = """
+import time
+
+def add(a, b):
+    if a == 0:
+        time.sleep(3)
+    return a + b
+"""
+
+    async def scenario():
+        try:
+            problem = Problem(100, problem_data)
+            start = time.perf_counter()
+            first_fail = await problem.submit_code(code, stop_on_failure=True)
+            elapsed = time.perf_counter() - start
+            full = await problem.submit_code(code, stop_on_failure=False)
+            return first_fail, elapsed, full
+        finally:
+            await sandbox_pool.close()
+
+    first_fail, elapsed, full = asyncio.run(scenario())
+    assert (first_fail.accepted, first_fail.passed_test_cases, len(first_fail.test_case_times)) == (False, 1, 2)
+    assert first_fail.failed_test == "Input: [5, 5]\nExpected 11, got 10"
+    assert elapsed < 2
+    assert (full.passed_test_cases, len(full.test_case_times)) == (2, 3)
+
+
+def test_cpu_time_limit_is_enforced_in_the_sandbox():
+    problem_data = ProblemData("Spin", "", "def spin(n):", "Easy", [
+        {"input": "[0]", "output": "0"},
+        {"input": "[1]", "output": "1"},
+    ], False, 0, cpu_time_limit=200)
+    code = """
+import time
+
+def spin(n):
+    if n == 0:
+        time.sleep(0.5)  # Waiting isn't CPU time
+        return 0
+    while True:
+        pass
+"""
+
+    async def scenario():
+        try:
+            problem = Problem(100, problem_data)
+            start = time.perf_counter()
+            submission = await problem.submit_code(code, stop_on_failure=False)
+            elapsed = time.perf_counter() - start
+            sleeper = await problem.submit_code(code.replace("while True:\n        pass", "return 1"), stop_on_failure=False)
+            return submission, elapsed, sleeper
+        finally:
+            await sandbox_pool.close()
+
+    submission, elapsed, sleeper = asyncio.run(scenario())
+    assert (submission.accepted, submission.message) == (False, "Time limit exceeded")
+    assert sleeper.accepted
+    # Killed at the 200ms CPU limit, not at the 10s sandbox timeout
+    assert elapsed < 3
+
+
+def test_harness_cache_is_lru_and_keyed_by_revision():
+    def problem(problem_id: int, output: str = "3") -> ProblemData:
+        return ProblemData("Add", "", "def add(a, b):", "Easy", [{"input": "[1, 2]", "output": output}], False, 0, problem_id=problem_id)
+
+    cache = HarnessCache(2)
+    first = cache.get(problem(1))
+    assert cache.get(problem(1)) is first
+    assert first.function_name == "add" and first.expected == ["3"]
+
+    cache.get(problem(2))
+    cache.get(problem(1))  # 1 is now the most recent, so 2 goes next
+    cache.get(problem(3))
+    assert [key[0] for key in cache.entries] == [1, 3]
+
+    # An edited problem keeps its id but gets a fresh harness
+    edited = cache.get(problem(1, "4"))
+    assert edited is not first and edited.expected == ["4"]
+    assert len(cache.entries) == 2
+
+
+def test_result_stream_handles_split_frames():
+    body = '{"output": "3"}'
+    framed = f"{len(body)}:{body}\n" * 2
+    stream = ResultStream()
+    records = [record for piece in (framed[:3], framed[3:20], framed[20:]) for record in stream.feed(piece)]
+    assert records == [{"output": "3"}, {"output": "3"}]
+    assert stream.feed("garbage") == [] and stream.broken
+
+
+def test_decode_results_reads_frames_by_length():
+    bodies = ['{"output": "a:b\\nc", "stdout": "1:{}\\n"}', '{"output": ""}']
+    records = decode_results("".join(f"{len(body)}:{body}\n" for body in bodies))
+    assert records == [{"output": "a:b\nc", "stdout": "1:{}\n"}, {"output": ""}]
+
+    with pytest.raises(ValueError):
+        decode_results("Traceback (most recent call last):")
+
+
+def test_results_and_prints_with_newlines_and_fake_frames():
+    problem_data = ProblemData("Lines", "", "def lines(n):", "Easy", [
+        {"input": "[2]", "output": "0\n1"},
+        {"input": "[1]", "output": "x"},
+    ], False, 0)
+    code = """
+def lines(n):
+    print('2:{}')
+    print('7:{"a": 1}|')
+    return "\\n".join(str(i) for i in range(n))
+"""
+
+    async def scenario():
+        try:
+            return await Problem(100, problem_data).submit_code(code, stop_on_failure=False)
+        finally:
+            await sandbox_pool.close()
+
+    submission = asyncio.run(scenario())
+    assert (submission.accepted, submission.passed_test_cases, submission.total_test_cases) == (False, 1, 2)
+    assert submission.stdout == '2:{}\n7:{"a": 1}|\n'
+    assert len(submission.test_case_times) == 2
+
+
+def test_unsortable_any_order_is_judged_on_the_host_in_first_fail_mode():
+    problem_data = ProblemData("Dicts", "", "def f(x):", "Easy", [
+        {"input": "[1]", "output": "[{'b': 2}, {'a': 1}]"},
+        {"input": "[2]", "output": "[{'b': 2}, {'a': 1}]"},
+    ], True, 0)
+    code = """
+def f(x):
+    return [{'a': 1}, {'b': 2}]
+"""
+
+    async def scenario():
+        try:
+            problem = Problem(100, problem_data)
+            return [await problem.submit_code(code, stop_on_failure=mode) for mode in (False, True)]
+        finally:
+            await sandbox_pool.close()
+
+    full, first_fail = asyncio.run(scenario())
+    assert (full.accepted, full.passed_test_cases) == (True, 2)
+    assert (first_fail.accepted, first_fail.passed_test_cases) == (True, 2)
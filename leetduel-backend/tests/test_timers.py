@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+from src.timers import DeadlineScheduler
+
+
+def test_fires_once_in_order_and_honours_cancel():
+    fired = []
+    ticks = []
+
+    async def on_expire(key):
+        fired.append(key)
+
+    async def on_tick(keys):
+        ticks.append(sorted(keys))
+
+    async def scenario():
+        timers = DeadlineScheduler(on_expire, on_tick, tick_interval=0.05)
+        timers.start()
+        now = time.time()
+        timers.schedule("late", now + 0.12)
+        timers.schedule("early", now + 0.02)
+        timers.schedule("cancelled", now + 0.04)
+        timers.schedule("moved", now + 0.01)
+        timers.schedule("moved", now + 0.08)
+        timers.cancel("cancelled")
+        assert 0 < timers.remaining("late") <= 0.12
+        await asyncio.sleep(0.2)
+        timers.stop()
+        assert len(timers) == 0
+
+    asyncio.run(scenario())
+    assert fired == ["early", "moved", "late"]
+    assert ticks and ticks[0] == ["late", "moved"]
+
+
+def test_many_deadlines_one_task():
+    fired = []
+
+    async def on_expire(key):
+        fired.append(key)
+
+    async def scenario():
+        timers = DeadlineScheduler(on_expire)
+        timers.start()
+        now = time.time()
+        for i in range(5000):
+            timers.schedule(f"party-{i}", now + 0.05 + (i % 50) / 1000)
+        assert len(asyncio.all_tasks()) == 2  # this coroutine and the scheduler
+        await asyncio.sleep(0.2)
+        timers.stop()
+
+    asyncio.run(scenario())
+    assert len(fired) == 5000
+
+
+def test_running_expiries_are_held_until_they_finish():
+    async def scenario():
+        release = asyncio.Event()
+        timers = DeadlineScheduler(lambda key: release.wait())
+        timers.start()
+        timers.schedule("party", time.time())
+        await asyncio.sleep(0.02)
+        held = len(timers.expiring)
+        release.set()
+        await asyncio.sleep(0.01)
+        timers.stop()
+        return held, len(timers.expiring)
+
+    assert asyncio.run(scenario()) == (1, 0)
@@ -10,6 +10,7 @@ import {
   PlayerData,
   LeaderboardData,
   RoundData,
+  TestCaseResultData,
 } from "../../types";
 import socket from "../../socket";
 import Editor from "@monaco-editor/react";
@@ -150,6 +151,16 @@ function GameContent() {
       setButtonDisabled(false);
     });
 
+    socket.on("submission_queued", (data: MessageData) => {
+      setConsoleOutput(data.message);
+    });
+
+    socket.on("test_case_result", (data: TestCaseResultData) => {
+      setConsoleOutput(
+        `Running... ${data.passed_test_cases}/${data.total_test_cases} passed`
+      );
+    });
+
     socket.on("message_received", (data: MessageData) => {
       setChatMessages((prevMessages) => [...prevMessages, data]);
     });
@@ -226,6 +237,8 @@ function GameContent() {
 
     return () => {
       socket.off("code_submitted");
+      socket.off("submission_queued");
+      socket.off("test_case_result");
       socket.off("message_received");
       socket.off("game_over");
       socket.off("leave_party");
@@ -3,4 +3,15 @@ import { io } from "socket.io-client";
 
 console.log(process.env.NEXT_PUBLIC_SERVER_URL);
 const socket = io(process.env.NEXT_PUBLIC_SERVER_URL);
+
+// Parties live on one backend worker; reconnect through the load balancer to the one
+// hosting this party (it routes on ?node=) and join again there.
+socket.on("party_elsewhere", (data: { party_code: string; username: string; node: string }) => {
+  socket.io.opts.query = { node: data.node };
+  socket.once("connect", () => {
+    socket.emit("join_party", { party_code: data.party_code, username: data.username });
+  });
+  socket.disconnect().connect();
+});
+
 export default socket;
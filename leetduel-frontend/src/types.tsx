@@ -43,6 +43,14 @@ export interface MessageData {
   username?: string;
 }
 
+export interface TestCaseResultData {
+  index: number;
+  passed: boolean;
+  time: number;
+  passed_test_cases: number;
+  total_test_cases: number;
+}
+
 export interface TimeData {
   time_left: number;
 }